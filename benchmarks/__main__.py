@@ -0,0 +1,104 @@
+"""Run the benchmarks: `python -m benchmarks [--save FILE] [--compare FILE]`.
+
+`python -m benchmarks --idle 1000` measures the memory of idle connections and
+`python -m benchmarks --encoding` compares the websocket codecs.
+"""
+import argparse
+import json
+import sys
+
+from .encoding import measure_encoding
+from .harness import compare, run_scenario
+from .idle import measure_idle_memory
+from .scenarios import SCENARIOS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="graphene-asgi benchmarks")
+    parser.add_argument(
+        "scenarios", nargs="*", help="scenario names, all scenarios by default"
+    )
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--save", help="write the results to a JSON file")
+    parser.add_argument("--compare", help="compare with results saved with --save")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="fail when a metric is worse than the baseline by this fraction",
+    )
+    parser.add_argument(
+        "--metrics",
+        nargs="+",
+        default=["ops_per_sec", "peak_kib"],
+        help="metrics compared with the baseline",
+    )
+    parser.add_argument(
+        "--encoding",
+        action="store_true",
+        help="only compare the codecs on subscription payloads",
+    )
+    parser.add_argument(
+        "--idle",
+        type=int,
+        metavar="CONNECTIONS",
+        help="only measure the memory of this many idle graphql-ws connections",
+    )
+    args = parser.parse_args(argv)
+    if args.encoding:
+        print(
+            "{:<12} {:<20} {:>10} {:>12}".format(
+                "payload", "codec", "bytes", "encode us"
+            )
+        )
+        for result in measure_encoding(args.iterations):
+            print(
+                "{:<12} {:<20} {:>10} {:>12.2f}".format(
+                    result.payload, result.codec, result.size, result.encode_us
+                )
+            )
+        return 0
+    if args.idle:
+        memory = measure_idle_memory(args.idle)
+        for name, value in memory._asdict().items():
+            print("{:<28} {:>12.0f}".format(name, value))
+        return 0
+    factories = [
+        factory
+        for factory in SCENARIOS
+        if not args.scenarios or factory.name in args.scenarios
+    ]
+    results = []
+    print(
+        "{:<28} {:>12} {:>10} {:>10} {:>12}".format(
+            "scenario", "ops/sec", "p50 ms", "p99 ms", "peak KiB"
+        )
+    )
+    for factory in factories:
+        result = run_scenario(factory, args.iterations)
+        results.append(result)
+        print(
+            "{:<28} {:>12.1f} {:>10.3f} {:>10.3f} {:>12.1f}".format(
+                result.name,
+                result.ops_per_sec,
+                result.p50_ms,
+                result.p99_ms,
+                result.peak_kib,
+            )
+        )
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({r.name: r._asdict() for r in results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.metrics)
+        for regression in regressions:
+            print("regression: " + regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
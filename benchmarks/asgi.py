@@ -0,0 +1,89 @@
+"""Fake ASGI transports calling `Application.__call__` directly."""
+import asyncio
+import json
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+Headers = Sequence[Tuple[bytes, bytes]]
+
+
+async def http_post(
+    app, body: bytes, chunk_size: Optional[int] = None, headers: Headers = ()
+) -> Tuple[int, bytes]:
+    """Send a POST request, in chunks of `chunk_size` bytes if given."""
+    if chunk_size:
+        chunks: List[bytes] = []
+        for start in range(0, len(body), chunk_size):
+            end = start + chunk_size
+            chunks.append(body[start:end])
+        headers = [(b"transfer-encoding", b"chunked"), *headers]
+    else:
+        chunks = [body]
+        headers = [(b"content-length", str(len(body)).encode()), *headers]
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), *headers],
+    }
+    messages = iter(
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    )
+    status = 0
+    parts = []
+    responded = asyncio.Event()
+
+    async def receive():
+        message = next(messages, None)
+        if message is not None:
+            return message
+        # the client stays connected until the whole response is sent
+        await responded.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        else:
+            parts.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                responded.set()
+
+    await app(scope, receive, send)
+    return status, b"".join(parts)
+
+
+class WebsocketConnection:
+    def __init__(self, app, subprotocols: Iterable[str] = ()):
+        self.app = app
+        self.scope = {
+            "type": "websocket",
+            "path": "/",
+            "query_string": b"",
+            "headers": [],
+            "subprotocols": list(subprotocols),
+        }
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Future] = None
+
+    async def connect(self):
+        self.task = asyncio.ensure_future(
+            self.app(self.scope, self.inbox.get, self.outbox.put)
+        )
+        await self.inbox.put({"type": "websocket.connect"})
+        message = await self.outbox.get()
+        assert message["type"] == "websocket.accept", message
+
+    async def send_json(self, data):
+        await self.inbox.put({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def receive_json(self):
+        message = await self.outbox.get()
+        return json.loads(message["text"])
+
+    async def close(self):
+        await self.inbox.put({"type": "websocket.disconnect", "code": 1000})
+        await self.task
@@ -0,0 +1,55 @@
+"""Size and encode time of graphql-ws data messages for each codec."""
+from time import perf_counter
+from typing import Any, Dict, List, NamedTuple
+
+from graphene_asgi.codec import JSONCodec, MsgpackCodec, OrjsonCodec, msgpack, orjson
+
+
+def _rows(count: int) -> List[dict]:
+    return [
+        {"id": i, "name": "row {}".format(i), "value": i / 2, "active": i % 2 == 0}
+        for i in range(count)
+    ]
+
+
+# shapes of subscription events: a counter, a small update and a list
+PAYLOADS: Dict[str, Any] = {
+    "tick": {"data": {"ticks": 42}},
+    "update": {"data": {"row": _rows(1)[0], "changed": ["value", "active"]}},
+    "rows_200": {"data": {"rows": _rows(200)}},
+}
+
+
+class EncodingResult(NamedTuple):
+    payload: str
+    codec: str
+    size: int
+    encode_us: float
+
+
+def codecs() -> Dict[str, Any]:
+    available = {"json": JSONCodec()}
+    if orjson is not None:
+        available["orjson"] = OrjsonCodec()
+    available["msgpack_pure_python"] = MsgpackCodec(pure_python=True)
+    if msgpack is not None:
+        available["msgpack"] = MsgpackCodec()
+    return available
+
+
+def measure_encoding(iterations: int = 1000) -> List[EncodingResult]:
+    """Encode each payload as a graphql-ws data message `iterations` times."""
+    results = []
+    for name, payload in PAYLOADS.items():
+        message = {"type": "data", "id": "1", "payload": payload}
+        for codec_name, codec in codecs().items():
+            frame = codec.dumps_frame(message)
+            size = len(frame.encode() if isinstance(frame, str) else frame)
+            start = perf_counter()
+            for _ in range(iterations):
+                codec.dumps_frame(message)
+            elapsed = perf_counter() - start
+            results.append(
+                EncodingResult(name, codec_name, size, elapsed / iterations * 1e6)
+            )
+    return results
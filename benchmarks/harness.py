@@ -0,0 +1,128 @@
+import asyncio
+import gc
+import tracemalloc
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+# how each metric is compared with the baseline: 1 if higher is better
+DIRECTIONS = {"ops_per_sec": 1, "p50_ms": -1, "p99_ms": -1, "peak_kib": -1}
+
+
+class Result(NamedTuple):
+    name: str
+    ops_per_sec: float
+    p50_ms: float
+    p99_ms: float
+    peak_kib: float
+
+
+class Scenario:
+    """A benchmark operation run `iterations` times by `concurrency` workers.
+
+    `operation(worker)` returns the number of operations it performed, so a
+    subscription delivering many events counts each of them.
+    """
+
+    name = ""
+    concurrency = 1
+
+    async def setup(self):
+        pass
+
+    async def teardown(self):
+        pass
+
+    async def operation(self, worker: int) -> int:
+        raise NotImplementedError
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(int(len(values) * fraction), len(values) - 1)
+    return values[index]
+
+
+async def _measure(scenario: Scenario, iterations: int):
+    await scenario.setup()
+    latencies: List[float] = []
+    remaining = [iterations]
+    ops = [0]
+
+    async def worker(index: int):
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = perf_counter()
+            count = await scenario.operation(index)
+            latencies.append(perf_counter() - start)
+            ops[0] += count
+
+    try:
+        start = perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(scenario.concurrency)))
+        elapsed = perf_counter() - start
+    finally:
+        await scenario.teardown()
+    return ops[0], elapsed, latencies
+
+
+def _run(coro: Awaitable):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def run_scenario(
+    factory: Callable[[], Scenario], iterations: int, warmup: int = 10
+) -> Result:
+    """Measure throughput and latency, then peak memory in a separate pass."""
+    scenario = factory()
+    if warmup:
+        _run(_measure(scenario, warmup))
+    gc.collect()
+    ops, elapsed, latencies = _run(_measure(scenario, iterations))
+    # tracing allocations slows execution down, so it is not timed
+    gc.collect()
+    tracemalloc.start()
+    try:
+        _run(_measure(factory(), max(iterations // 10, 1)))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return Result(
+        name=scenario.name,
+        ops_per_sec=ops / elapsed if elapsed else 0.0,
+        p50_ms=percentile(latencies, 0.5) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        peak_kib=peak / 1024,
+    )
+
+
+def compare(
+    results: List[Result],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+    metrics: Optional[List[str]] = None,
+) -> List[str]:
+    """Regressions larger than `threshold` (a fraction) against the baseline."""
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        for metric in metrics or list(DIRECTIONS):
+            old = base.get(metric)
+            new = getattr(result, metric)
+            if not old:
+                continue
+            change = (new - old) / old * DIRECTIONS[metric]
+            if change < -threshold:
+                regressions.append(
+                    "{} {}: {:.2f} -> {:.2f} ({:+.1%})".format(
+                        result.name, metric, old, new, change * DIRECTIONS[metric]
+                    )
+                )
+    return regressions
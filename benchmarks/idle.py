@@ -0,0 +1,72 @@
+"""Memory held by idle websocket connections and subscriptions."""
+import asyncio
+import gc
+import json
+import tracemalloc
+from typing import List, NamedTuple
+
+from graphene_asgi import Application
+
+from .asgi import WebsocketConnection
+from .harness import _run
+from .schema import schema
+
+SUBSCRIPTION = {
+    "id": "1",
+    "type": "start",
+    "payload": {"query": "subscription { idle }"},
+}
+
+
+class IdleMemory(NamedTuple):
+    connection_bytes: float
+    subscription_bytes: float
+    shared_subscription_bytes: float
+
+
+def _traced() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def _measure(app: Application, count: int):
+    """Bytes per connection and per subscription of `count` graphql-ws clients.
+
+    Every subscription receives one event before it goes idle, so both
+    measurements are taken once the server has nothing left to do.
+    """
+    connections: List[WebsocketConnection] = [
+        WebsocketConnection(app, ["graphql-ws"]) for _ in range(count)
+    ]
+    before = _traced()
+    for connection in connections:
+        await connection.connect()
+        await connection.send_json({"type": "connection_init", "payload": {}})
+        assert (await connection.receive_json())["type"] == "connection_ack"
+    connected = _traced()
+    for connection in connections:
+        await connection.inbox.put(
+            {"type": "websocket.receive", "text": json.dumps(SUBSCRIPTION)}
+        )
+    for connection in connections:
+        assert (await connection.receive_json())["type"] == "data"
+    await asyncio.sleep(0)
+    subscribed = _traced()
+    for connection in connections:
+        await connection.close()
+    return (connected - before) / count, (subscribed - connected) / count
+
+
+def measure_idle_memory(connections: int = 1000) -> IdleMemory:
+    """Measure with a subscription per connection, then with a shared one."""
+    tracemalloc.start()
+    try:
+        connection_bytes, subscription_bytes = _run(
+            _measure(Application(schema), connections)
+        )
+        _, shared_bytes = _run(
+            _measure(Application(schema, shared_subscriptions=True), connections)
+        )
+    finally:
+        tracemalloc.stop()
+    return IdleMemory(connection_bytes, subscription_bytes, shared_bytes)
@@ -0,0 +1,144 @@
+import json
+from typing import Dict, List
+
+from graphene_asgi import Application
+
+from .asgi import WebsocketConnection, http_post
+from .harness import Scenario
+from .schema import schema
+
+
+class HTTPSmallQuery(Scenario):
+    name = "http_small_query"
+    concurrency = 8
+
+    def __init__(self):
+        self.app = Application(schema)
+        self.body = json.dumps({"query": "{ small }"}).encode()
+
+    async def operation(self, worker):
+        status, _ = await http_post(self.app, self.body)
+        assert status == 200
+        return 1
+
+
+class HTTPLargeList(Scenario):
+    name = "http_large_list"
+    concurrency = 2
+    rows = 1000
+
+    def __init__(self):
+        self.app = Application(schema)
+        self.body = json.dumps(
+            {"query": "{ rows(count: %d) { id name value } }" % self.rows}
+        ).encode()
+
+    async def operation(self, worker):
+        status, _ = await http_post(self.app, self.body)
+        assert status == 200
+        return 1
+
+
+class HTTPLargeListCompiled(HTTPLargeList):
+    name = "http_large_list_compiled"
+
+    def __init__(self):
+        super().__init__()
+        self.app = Application(schema, compile_operations=True)
+
+
+class HTTPChunkedBody(Scenario):
+    name = "http_chunked_body"
+    concurrency = 8
+    chunk_size = 256
+
+    def __init__(self):
+        self.app = Application(schema)
+        # a 16 KiB request body, as sent with large input variables
+        self.body = json.dumps(
+            {
+                "query": "query($num: Int) { small(num: $num) }",
+                "variables": {"num": 2},
+                "extensions": {"padding": ["x" * 64] * 256},
+            }
+        ).encode()
+
+    async def operation(self, worker):
+        status, _ = await http_post(self.app, self.body, chunk_size=self.chunk_size)
+        assert status == 200
+        return 1
+
+
+class WebsocketConcurrentConnections(Scenario):
+    name = "ws_concurrent_connections"
+    concurrency = 200
+
+    def __init__(self):
+        self.app = Application(schema)
+        self.connections: List[WebsocketConnection] = []
+
+    async def setup(self):
+        self.connections = [
+            WebsocketConnection(self.app) for _ in range(self.concurrency)
+        ]
+        for connection in self.connections:
+            await connection.connect()
+
+    async def teardown(self):
+        for connection in self.connections:
+            await connection.close()
+
+    async def operation(self, worker):
+        connection = self.connections[worker]
+        await connection.send_json({"query": "{ small }", "id": worker})
+        reply = await connection.receive_json()
+        assert reply["data"] == {"small": 1}
+        return 1
+
+
+class GraphqlWSSubscription(Scenario):
+    name = "graphql_ws_subscription"
+    concurrency = 4
+    events = 1000
+
+    def __init__(self):
+        self.app = Application(schema)
+        self.connections: Dict[int, WebsocketConnection] = {}
+        self.next_id = 0
+
+    async def setup(self):
+        for worker in range(self.concurrency):
+            connection = WebsocketConnection(self.app, ["graphql-ws"])
+            await connection.connect()
+            await connection.send_json({"type": "connection_init", "payload": {}})
+            assert (await connection.receive_json())["type"] == "connection_ack"
+            self.connections[worker] = connection
+
+    async def teardown(self):
+        for connection in self.connections.values():
+            await connection.close()
+
+    async def operation(self, worker):
+        connection = self.connections[worker]
+        self.next_id += 1
+        query = "subscription { ticks(count: %d) }" % self.events
+        await connection.send_json(
+            {"id": str(self.next_id), "type": "start", "payload": {"query": query}}
+        )
+        events = 0
+        while True:
+            message = await connection.receive_json()
+            if message["type"] == "complete":
+                return events
+            assert message["type"] == "data", message
+            events += 1
+
+
+SCENARIOS = [
+    HTTPSmallQuery,
+    HTTPLargeList,
+    HTTPLargeListCompiled,
+    HTTPChunkedBody,
+    WebsocketConcurrentConnections,
+    GraphqlWSSubscription,
+]
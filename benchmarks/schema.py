@@ -0,0 +1,45 @@
+import asyncio
+
+import graphene
+
+
+class Row(graphene.ObjectType):
+    id = graphene.Int()
+    name = graphene.String()
+    value = graphene.Float()
+
+
+class Query(graphene.ObjectType):
+    small = graphene.Int(num=graphene.Int(default_value=1))
+    rows = graphene.List(Row, count=graphene.Int(required=True))
+
+    def resolve_small(self, info, num):
+        return num
+
+    def resolve_rows(self, info, count):
+        return [Row(id=i, name="row {}".format(i), value=i / 2) for i in range(count)]
+
+
+class Subscription(graphene.ObjectType):
+    ticks = graphene.Int(count=graphene.Int(required=True))
+    idle = graphene.Int()
+
+    def resolve_ticks(self, info, count):
+        return self
+
+    async def subscribe_ticks(self, info, count):
+        for i in range(count):
+            yield i
+            if i % 100 == 0:
+                await asyncio.sleep(0)
+
+    def resolve_idle(self, info):
+        return self
+
+    async def subscribe_idle(self, info):
+        # one event to know the subscription is set up, then nothing
+        yield 0
+        await asyncio.get_event_loop().create_future()
+
+
+schema = graphene.Schema(query=Query, subscription=Subscription)
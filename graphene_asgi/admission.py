@@ -0,0 +1,165 @@
+import asyncio
+from heapq import heappop, heappush
+from itertools import count
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from .errors import Overloaded, TooManyOperations
+from .metrics import Metrics
+
+DEFAULT_PRIORITIES = {"mutation": 0, "query": 1, "subscription": 1}
+
+
+class AdmissionController:
+    """Limits the number of operations executing at once.
+
+    At most `max_concurrent` operations execute in total and at most
+    `max_per_connection` per connection. Operations over the global limit wait
+    in a queue of `max_queue` entries, lower priority numbers first, for at
+    most `queue_timeout` seconds. When the queue is full, a new operation
+    replaces the waiting operation of the lowest priority if its own priority
+    is higher. Rejected operations fail with `Overloaded` (HTTP 503) or
+    `TooManyOperations` (HTTP 429), both suggesting a `retry_after` delay.
+
+    Priorities are taken from `priorities` by operation type; override
+    `Application.operation_priority` to decide per context. When
+    `max_loop_lag` is set, the event loop lag is measured every
+    `lag_interval` seconds, and while it exceeds `max_loop_lag` operations of
+    priority above 0 are rejected right away. Call `close` to stop measuring.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 64,
+        max_per_connection: Optional[int] = None,
+        max_queue: int = 256,
+        queue_timeout: float = 1.0,
+        retry_after: int = 1,
+        priorities: Optional[Dict[str, int]] = None,
+        max_loop_lag: Optional[float] = None,
+        lag_interval: float = 0.1,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_connection = max_per_connection
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.priorities = {**DEFAULT_PRIORITIES, **(priorities or {})}
+        self.max_loop_lag = max_loop_lag
+        self.lag_interval = lag_interval
+        self.metrics = metrics
+        self.active = 0
+        self.queued = 0
+        self.lag = 0.0
+        self.connections: Dict[Hashable, int] = {}
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = count()
+        self._monitor: Optional[asyncio.Future] = None
+
+    def priority(self, operation_type: str) -> int:
+        return self.priorities.get(operation_type, 1)
+
+    async def acquire(self, priority: int = 1, connection: Hashable = None):
+        """Wait for an execution slot, raising `Overloaded` if none is given."""
+        if connection is not None and self.max_per_connection is not None:
+            if self.connections.get(connection, 0) >= self.max_per_connection:
+                self._reject("admission_rejected_connection")
+                raise TooManyOperations(self.retry_after)
+        if self.max_loop_lag is not None:
+            self._start_monitor()
+            if self.lag > self.max_loop_lag and priority > 0:
+                self._reject("admission_rejected_lag")
+                raise Overloaded(self.retry_after)
+        if connection is not None:
+            # reserved before waiting, so queued operations count as well
+            self.connections[connection] = self.connections.get(connection, 0) + 1
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+            self._adjust("admission_active", 1)
+            return
+        try:
+            await self._wait(priority)
+        except BaseException:
+            self._unreserve(connection)
+            raise
+
+    def release(self, connection: Hashable = None):
+        self._unreserve(connection)
+        while self._waiters:
+            future = heappop(self._waiters)[2]
+            if not future.done():
+                # the slot is handed over to the first waiter
+                self._dequeued()
+                future.set_result(None)
+                return
+        self.active -= 1
+        self._adjust("admission_active", -1)
+
+    def _unreserve(self, connection: Hashable):
+        if connection is not None:
+            remaining = self.connections.pop(connection, 1) - 1
+            if remaining:
+                self.connections[connection] = remaining
+
+    async def _wait(self, priority: int):
+        if self.queued >= self.max_queue:
+            self._evict(priority)
+        future = asyncio.get_event_loop().create_future()
+        heappush(self._waiters, (priority, next(self._order), future))
+        self.queued += 1
+        self._adjust("admission_queued", 1)
+        try:
+            await asyncio.wait((future,), timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and not future.exception():
+                self.release()
+            elif not future.done():
+                self._dequeued()
+                future.cancel()
+            raise
+        if not future.done():
+            self._dequeued()
+            future.cancel()
+            self._reject("admission_queue_timeouts")
+            raise Overloaded(self.retry_after)
+        # raises Overloaded when evicted by an operation of higher priority
+        future.result()
+
+    def _evict(self, priority: int):
+        pending = [entry for entry in self._waiters if not entry[2].done()]
+        worst = max(pending) if pending else None
+        if worst is None or worst[0] <= priority:
+            self._reject("admission_rejected_queue")
+            raise Overloaded(self.retry_after)
+        self._dequeued()
+        self._reject("admission_rejected_queue")
+        worst[2].set_exception(Overloaded(self.retry_after))
+
+    def _dequeued(self):
+        self.queued -= 1
+        self._adjust("admission_queued", -1)
+
+    def _start_monitor(self):
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.ensure_future(self._measure_lag())
+
+    async def _measure_lag(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, loop.time() - start - self.lag_interval)
+            # spikes count right away and fade out over a few intervals
+            self.lag = max(lag, self.lag / 2)
+
+    def close(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+
+    def _reject(self, name: str):
+        if self.metrics is not None:
+            self.metrics.incr(name)
+
+    def _adjust(self, name: str, delta: int):
+        if self.metrics is not None:
+            self.metrics.adjust(name, delta)
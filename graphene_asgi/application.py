@@ -1,22 +1,150 @@
+import asyncio
 import json
-from typing import Any, Awaitable, Callable, Optional, Tuple
+from inspect import isawaitable
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 from graphene import Schema
 from graphene.types.schema import normalize_execute_kwargs
-from graphql import subscribe
-from graphql.execution.execute import ExecutionResult
-from graphql.language import parse
+from graphql import subscribe, validate, validate_schema
+from graphql.error import GraphQLError
+from graphql.execution.execute import ExecutionResult, execute
+from graphql.language import parse, print_ast
 from graphql.language.ast import OperationDefinitionNode, OperationType
 
+from .admission import AdmissionController
+from .cache import CachedDocument, DocumentCache, LRUCache
+from .codec import JSONCodec, MsgpackCodec, default_codec
+from .compiler import OperationCompiler
+from .compression import ResponseCompressor
+from .context import ConnectionContext
+from .cost import QueryCostAnalyzer
+from .dataloader import DataLoader, Loaders
+from .errors import OperationTimeout, Overloaded
+from .fanout import SubscriptionHub
+from .incremental import execute_incremental, with_incremental_directives
+from .metrics import Metrics
+from .persisted_queries import (
+    InMemoryPersistedQueryStore,
+    PersistedQueryStore,
+    load_persisted_query,
+)
 from .protocols import GraphqlWSHandler, HTTPPostHandler, WebsocketHandler
+from .protocols.graphql_ws import GRAPHQL_WS
+from .pubsub import PubSub
+from .response_cache import ResponseCache
+from .streams import BLOCK, DROP_OLDEST, POLICIES
+from .threads import ThreadPoolMiddleware
+from .timing import Timings
 
 
 class Application:
-    def __init__(self, schema: Schema, grapiql: bool = True):
+    def __init__(
+        self,
+        schema: Schema,
+        grapiql: bool = True,
+        document_cache_size: int = 1024,
+        persisted_queries: bool = True,
+        persisted_query_store: Optional[PersistedQueryStore] = None,
+        max_batch_size: int = 10,
+        batch_concurrency: int = 10,
+        codec: Optional[JSONCodec] = None,
+        binary_codecs: Optional[Dict[str, Any]] = None,
+        max_body_size: Optional[int] = 10 * 1024 * 1024,
+        max_inflight_operations: int = 16,
+        subscription_buffer_size: Optional[int] = None,
+        subscription_buffer_policy: str = BLOCK,
+        shared_subscriptions: bool = False,
+        pubsub: Optional[PubSub] = None,
+        cost_analyzer: Optional[QueryCostAnalyzer] = None,
+        response_cache: Optional[ResponseCache] = None,
+        compression: Optional[ResponseCompressor] = None,
+        incremental_delivery: bool = False,
+        stream_threshold: Optional[int] = None,
+        stream_chunk_size: int = 64 * 1024,
+        thread_pool: Optional[ThreadPoolMiddleware] = None,
+        loaders: Optional[Dict[str, Callable[[], DataLoader]]] = None,
+        server_timing: bool = False,
+        metrics_path: Optional[str] = None,
+        timing_callbacks: Sequence[Callable[[Timings], Any]] = (),
+        max_metric_operation_names: int = 100,
+        compile_operations: bool = False,
+        operation_timeout: Optional[float] = None,
+        admission: Optional[AdmissionController] = None,
+    ):
         self.schema = schema
+        self.graphql_schema = schema.graphql_schema
         self.graphiql = grapiql
+        self.document_cache = DocumentCache(document_cache_size)
+        if persisted_queries and persisted_query_store is None:
+            persisted_query_store = InMemoryPersistedQueryStore()
+        self.persisted_query_store = persisted_query_store
+        self.max_batch_size = max_batch_size
+        self.batch_concurrency = batch_concurrency
+        self.codec = codec or default_codec()
+        self.binary_codecs = (
+            {"msgpack": MsgpackCodec()} if binary_codecs is None else binary_codecs
+        )
+        self.max_body_size = max_body_size
+        self.max_inflight_operations = max_inflight_operations
+        if subscription_buffer_policy not in POLICIES:
+            raise ValueError(
+                "Unknown buffer policy {!r}".format(subscription_buffer_policy)
+            )
+        self.subscription_buffer_size = subscription_buffer_size
+        self.subscription_buffer_policy = subscription_buffer_policy
+        self.metrics = Metrics()
+        self.pubsub = pubsub
+        self.cost_analyzer = cost_analyzer
+        self.response_cache = response_cache
+        self.compression = compression
+        self.incremental_delivery = incremental_delivery
+        self.stream_threshold = stream_threshold
+        self.stream_chunk_size = stream_chunk_size
+        self.thread_pool = thread_pool
+        self.loaders = loaders
+        self.server_timing = server_timing
+        self.metrics_path = metrics_path
+        self.timing_callbacks = list(timing_callbacks)
+        self.max_metric_operation_names = max_metric_operation_names
+        self._metric_operation_names: Set[str] = set()
+        self.compiler = (
+            OperationCompiler(document_cache_size) if compile_operations else None
+        )
+        self.operation_timeout = operation_timeout
+        self.admission = admission
+        if admission is not None and admission.metrics is None:
+            admission.metrics = self.metrics
+        if thread_pool is not None and thread_pool.metrics is None:
+            thread_pool.metrics = self.metrics
+        if incremental_delivery:
+            self.graphql_schema = with_incremental_directives(self.graphql_schema)
+        self._normalized_sources = LRUCache(document_cache_size)
+        self.subscription_hub = None
+        if shared_subscriptions:
+            # a blocked subscriber would stall the upstream of all the others
+            self.subscription_hub = SubscriptionHub(
+                subscription_buffer_size or 100,
+                subscription_buffer_policy
+                if subscription_buffer_size is not None
+                and subscription_buffer_policy != BLOCK
+                else DROP_OLDEST,
+                self.metrics,
+            )
         # hack to attach subscribe_{field_name} methods to fields in the schema
-        for name in self.schema.subscription._meta.fields.keys():
+        subscription_fields = (
+            self.schema.subscription._meta.fields if self.schema.subscription else {}
+        )
+        for name in subscription_fields.keys():
             field = schema.graphql_schema.subscription_type.fields[
                 schema.graphql_schema.get_name(name)
             ]
@@ -26,20 +154,24 @@ class Application:
                 )
 
     async def get_context(self, scope, message):
-        return {
-            **scope,
-            "headers": {
-                k.decode("ascii"): v.decode("ascii") for k, v in scope["headers"]
-            },
-            "query_string": scope.get("query_string", b"").decode(),
-        }
+        if not isinstance(scope, ConnectionContext):
+            scope = ConnectionContext(scope)
+        context = scope.new_context()
+        if self.pubsub is not None:
+            context["pubsub"] = self.pubsub
+        if self.loaders:
+            context["loaders"] = Loaders(self.loaders)
+        return context
 
     async def parse_request(
         self, scope, message
-    ) -> Tuple[str, Optional[dict], Optional[str], dict]:
-        data = json.loads(message)
+    ) -> Tuple[Optional[str], Optional[dict], Optional[str], dict]:
+        if isinstance(message, (str, bytes)):
+            data = self.codec.loads(message)
+        else:
+            data = message
         return (
-            data.pop("query"),
+            data.pop("query", None),
             data.pop("variables", {}),
             data.pop("operationName", None),
             data,
@@ -53,38 +185,285 @@ class Application:
             del data["errors"]
         return data
 
+    def get_document(
+        self, source: str, timings: Optional[Timings] = None
+    ) -> CachedDocument:
+        graphql_schema = self.graphql_schema
+        key = self.document_cache.key(graphql_schema, source)
+        cached = self.document_cache.get(key)
+        if cached is None:
+            if timings is not None:
+                timings.start()
+            # parse errors are raised and not cached
+            document = parse(source)
+            if timings is not None:
+                timings.stop("parse")
+            errors = validate(graphql_schema, document)
+            if timings is not None:
+                timings.stop("validate")
+            cached = CachedDocument(
+                document=document,
+                errors=errors,
+                operation_defs={
+                    d.name.value if d.name else None: d
+                    for d in document.definitions
+                    if isinstance(d, OperationDefinitionNode)
+                },
+            )
+            self.document_cache.set(key, cached)
+        return cached
+
+    def normalize_source(self, source: str, cached: CachedDocument) -> str:
+        """The document printed in a canonical form, used in cache keys."""
+        normalized = self._normalized_sources.get(source)
+        if normalized is None:
+            normalized = print_ast(cached.document)
+            self._normalized_sources.set(source, normalized)
+        return normalized
+
+    async def load_query(
+        self, source: Optional[str], extensions: Optional[dict] = None
+    ) -> str:
+        if extensions and "persistedQuery" in extensions:
+            return await load_persisted_query(
+                self.persisted_query_store, source, extensions["persistedQuery"]
+            )
+        if source is None:
+            raise GraphQLError("Must provide query string.")
+        return source
+
     async def execute(self, **kwargs):
         default_kwargs = {}
         assert "source" in kwargs
-        document = parse(kwargs["source"])
-        operation_defs = {
-            d.name.value if d.name else None: d
-            for d in document.definitions
-            if isinstance(d, OperationDefinitionNode)
-        }
-        if len(operation_defs) == 1:
-            op = next(o for o in operation_defs.values())
-        # let it fail. Don't want to return error myself
-        elif None in operation_defs:
-            return await self.schema.execute_async(**default_kwargs, **kwargs)
+        extensions = kwargs.pop("extensions", None)
+        incremental = kwargs.pop("incremental", False)
+        timings = kwargs.pop("timings", None)
+        connection = kwargs.pop("connection", None)
+        schema_errors = validate_schema(self.graphql_schema)
+        if schema_errors:
+            return ExecutionResult(data=None, errors=schema_errors)
+        try:
+            source = await self.load_query(kwargs.pop("source"), extensions)
+            cached = self.get_document(source, timings)
+        except GraphQLError as error:
+            return ExecutionResult(data=None, errors=[error])
+        if cached.errors:
+            return ExecutionResult(data=None, errors=cached.errors)
+        kwargs["document"] = cached.document
+        kwargs = normalize_execute_kwargs({**default_kwargs, **kwargs})
+        op = get_operation(cached.operation_defs, kwargs.get("operation_name"))
+        if op is None:
+            # let it fail. Don't want to return error myself
+            return await self._execute_document(**kwargs)
+        if timings is not None:
+            timings.operation_name = op.name.value if op.name else None
+            timings.operation_type = op.operation.value
+            timings.start()
+        # rejected operations must not take an execution slot
+        if self.cost_analyzer is not None:
+            errors = self.cost_analyzer.check(
+                self.graphql_schema,
+                cached.document,
+                op,
+                kwargs.get("variable_values"),
+                key=(source, kwargs.get("operation_name")),
+            )
+            if errors:
+                return ExecutionResult(data=None, errors=errors)
+            if timings is not None:
+                timings.stop("validate")
+        admission = self.admission
+        if admission is not None:
+            priority = self.operation_priority(
+                op.operation.value, kwargs.get("context_value")
+            )
+            try:
+                await admission.acquire(priority, connection)
+            except Overloaded as error:
+                return ExecutionResult(data=None, errors=[error])
+            if timings is not None:
+                timings.stop("queue")
+        try:
+            return await self._execute_admitted(
+                source, cached, op, incremental, timings, **kwargs
+            )
+        finally:
+            if admission is not None:
+                admission.release(connection)
+
+    async def _execute_admitted(
+        self, source, cached, op, incremental, timings, **kwargs
+    ):
+        execution = self._execute_operation(source, cached, op, incremental, **kwargs)
+        if (
+            self.operation_timeout is None
+            or op.operation == OperationType.SUBSCRIPTION
+        ):
+            res = await execution
         else:
-            if (
-                "operation_name" not in kwargs
-                or kwargs["operation_name"] not in operation_defs
-            ):
-                # let it fail. Don't want to return error myself
-                return await self.schema.execute_async(**default_kwargs, **kwargs)
-            op = operation_defs[kwargs["operation_name"]]
+            try:
+                res = await asyncio.wait_for(execution, self.operation_timeout)
+            except asyncio.TimeoutError:
+                self.metrics.incr("operations_timed_out")
+                res = ExecutionResult(data=None, errors=[OperationTimeout()])
+        if timings is not None:
+            timings.stop("execute")
+        return res
+
+    async def _execute_operation(self, source, cached, op, incremental, **kwargs):
+        if self.thread_pool is not None and op.operation != OperationType.SUBSCRIPTION:
+            kwargs["middleware"] = [*(kwargs.get("middleware") or ()), self.thread_pool]
+        if self.response_cache is not None and op.operation == OperationType.QUERY:
+            return await self._execute_cached(source, cached, op, **kwargs)
         if op.operation == OperationType.SUBSCRIPTION:
-            kwargs["document"] = document
-            kwargs.pop("source")
             # graphene does not support subscribe yet
-            return await subscribe(
-                self.schema.graphql_schema,
-                **normalize_execute_kwargs({**default_kwargs, **kwargs})
-            )
+            res = await subscribe(self.graphql_schema, **kwargs)
+            context = kwargs.get("context_value")
+            loaders = context.get("loaders") if isinstance(context, dict) else None
+            if isinstance(loaders, Loaders) and not isinstance(res, ExecutionResult):
+                return clear_loaders_per_event(res, loaders)
+            return res
             # return await self.schema.subscribe(**default_kwargs, **kwargs)
-        return await self.schema.execute_async(**default_kwargs, **kwargs)
+        if incremental and self.incremental_delivery:
+            return await execute_incremental(self.graphql_schema, **kwargs)
+        return await self._execute_document(op, **kwargs)
+
+    async def _execute_cached(self, source, cached, op, **kwargs):
+        max_age = self.response_cache.get_max_age(
+            self.graphql_schema,
+            cached.document,
+            op,
+            key=(source, kwargs.get("operation_name")),
+        )
+        if max_age <= 0:
+            return await self._execute_document(op, **kwargs)
+        key = (
+            self.normalize_source(source, cached),
+            kwargs.get("operation_name"),
+            json.dumps(kwargs.get("variable_values"), sort_keys=True),
+            self.cache_partition(kwargs.get("context_value")),
+        )
+        res = self.response_cache.get(key)
+        if res is None:
+            res = await self._execute_document(op, **kwargs)
+            if not res.errors:
+                res = self.response_cache.set(key, res, max_age)
+        return res
+
+    async def _execute_document(self, op=None, **kwargs):
+        compiled = None
+        if self.compiler is not None and op is not None and "middleware" not in kwargs:
+            compiled = self.compiler.get(
+                self.graphql_schema, kwargs["document"], op
+            )
+        if compiled is not None:
+            res = compiled.execute(
+                kwargs.get("root_value"),
+                kwargs.get("context_value"),
+                kwargs.get("variable_values"),
+            )
+        else:
+            res = execute(self.graphql_schema, **kwargs)
+        if isawaitable(res):
+            res = await res
+        return res
+
+    def operation_priority(self, operation_type: str, context) -> int:
+        """Admission priority of an operation, lower numbers are admitted first.
+
+        Override to prioritize by context, e.g. by returning 0 for internal
+        clients.
+        """
+        return self.admission.priority(operation_type)
+
+    def cache_partition(self, context) -> Hashable:
+        """Identify contexts which may share cached responses.
+
+        Override when resolvers of cached fields depend on the context, e.g. by
+        returning the user or tenant id.
+        """
+        return None
+
+    def subscription_partition(self, context) -> Hashable:
+        """Identify contexts whose subscriptions may share one upstream.
+
+        Override to separate subscribers whose resolvers depend on the context,
+        e.g. by returning the user or tenant id.
+        """
+        return None
+
+    async def shared_subscription_key(
+        self,
+        source: Optional[str],
+        variables: Optional[dict],
+        operation_name: Optional[str],
+        extensions: Optional[dict],
+        context,
+    ) -> Optional[Hashable]:
+        """Key shared by identical subscriptions, or None if not shareable."""
+        try:
+            source = await self.load_query(source, extensions)
+            cached = self.get_document(source)
+        except GraphQLError:
+            return None
+        if cached.errors:
+            return None
+        op = get_operation(cached.operation_defs, operation_name)
+        if op is None or op.operation != OperationType.SUBSCRIPTION:
+            return None
+        return (
+            self.normalize_source(source, cached),
+            operation_name,
+            json.dumps(variables, sort_keys=True),
+            self.subscription_partition(context),
+        )
+
+    def record_timings(self, timings: Timings):
+        labels = (
+            ("operation_name", self.metric_operation_name(timings.operation_name)),
+            ("operation_type", timings.operation_type or ""),
+        )
+        for phase, seconds in timings.phases.items():
+            self.metrics.observe(
+                "graphql_phase_seconds", seconds, (("phase", phase),) + labels
+            )
+        for callback in self.timing_callbacks:
+            callback(timings)
+
+    def metric_operation_name(self, name: Optional[str]) -> str:
+        """The `operation_name` label of `name`.
+
+        Operation names are chosen by clients, so only the first
+        `max_metric_operation_names` names get their own series; later ones are
+        labeled `other`.
+        """
+        if not name:
+            return ""
+        names = self._metric_operation_names
+        if name not in names:
+            if len(names) >= self.max_metric_operation_names:
+                return "other"
+            names.add(name)
+        return name
+
+    def negotiate_subprotocol(self, scope) -> Tuple[Optional[str], Any]:
+        """The websocket subprotocol to accept and the codec of its frames.
+
+        graphql-ws is spoken as `graphql-ws` with `codec` and as
+        `graphql-ws.<name>` with the binary codec `name`, other clients may
+        ask for a binary codec by `name`. The first subprotocol offered by the
+        client which is supported wins.
+        """
+        for subprotocol in scope.get("subprotocols") or ():
+            if subprotocol == GRAPHQL_WS:
+                return subprotocol, self.codec
+            protocol, _, name = subprotocol.partition(".")
+            codec = self.binary_codecs.get(
+                name if protocol == GRAPHQL_WS else subprotocol
+            )
+            if codec is not None:
+                return subprotocol, codec
+        return None, self.codec
 
     async def check_access(self, scope):
         return True
@@ -96,6 +475,26 @@ class Application:
         send: Callable[[Any], Awaitable],
     ):
         if scope["type"] == "http":
+            if self.metrics_path is not None and scope["path"] == self.metrics_path:
+                resp_body = self.metrics.prometheus().encode()
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 200,
+                        "headers": [
+                            (b"content-type", b"text/plain; version=0.0.4"),
+                            (b"content-length", str(len(resp_body)).encode()),
+                        ],
+                    }
+                )
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": resp_body,
+                        "more_body": False,
+                    }
+                )
+                return
             if scope["method"].lower() == "get":
                 if not self.graphiql:
                     await send({"type": "http.response.start", "status": 405})
@@ -122,11 +521,36 @@ class Application:
             else:
                 return await HTTPPostHandler(scope, receive, send, app=self).run()
         if scope["type"] == "websocket":
-            if "graphql-ws" in scope["subprotocols"]:
+            subprotocol, _ = self.negotiate_subprotocol(scope)
+            if subprotocol is not None and subprotocol.startswith(GRAPHQL_WS):
                 return await GraphqlWSHandler(scope, receive, send, app=self).run()
             return await WebsocketHandler(scope, receive, send, app=self).run()
 
 
+async def clear_loaders_per_event(stream, loaders: Loaders):
+    # each event is executed when the next one is requested, so loads are
+    # memoized within one event only
+    try:
+        async for res in stream:
+            yield res
+            loaders.clear_all()
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def get_operation(
+    operation_defs: Dict[Optional[str], OperationDefinitionNode],
+    operation_name: Optional[str],
+) -> Optional[OperationDefinitionNode]:
+    if len(operation_defs) == 1:
+        return next(o for o in operation_defs.values())
+    if None in operation_defs:
+        return None
+    return operation_defs.get(operation_name)
+
+
 GRAPHIQL = """
 <!--
  *  Copyright (c) Facebook, Inc.
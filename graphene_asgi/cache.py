@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from graphql.error import GraphQLError
+from graphql.language import DocumentNode
+from graphql.language.ast import OperationDefinitionNode
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CachedDocument(NamedTuple):
+    document: DocumentNode
+    errors: List[GraphQLError]
+    operation_defs: Dict[Optional[str], OperationDefinitionNode]
+
+
+class DocumentCache(LRUCache):
+    """Parsed and validated documents keyed on schema identity and source text."""
+
+    def key(self, schema, source: str):
+        return (id(schema), source)
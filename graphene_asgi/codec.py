@@ -0,0 +1,163 @@
+import json
+from typing import Any, Dict, Iterator, Tuple, Union
+
+from . import msgpack_fallback
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+class JSONCodec:
+    """Standard library JSON codec.
+
+    `dumps` returns bytes ready to be sent as an HTTP body, `dumps_str` returns
+    text for websocket text frames.
+    """
+
+    binary = False
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    def dumps_str(self, obj: Any) -> str:
+        return json.dumps(obj)
+
+    def dumps_frame(self, obj: Any) -> Union[str, bytes]:
+        """Encode `obj` for a websocket frame, bytes if the codec is `binary`."""
+        return self.dumps_str(obj)
+
+    def envelope(self, fields: dict, key: str) -> Tuple[str, str]:
+        """Prefix and suffix making an encoded value the last field of `fields`.
+
+        `prefix + dumps_frame(value) + suffix` encodes `{**fields, key: value}`,
+        so a value encoded once can be sent in many messages.
+        """
+        # drop the encoded null and closing brace
+        return self.dumps_str({**fields, key: None})[:-5], "}"
+
+    def iter_dumps(self, obj: Any, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Encode `obj` in chunks of about `chunk_size` bytes.
+
+        Dicts and lists are walked down to their scalar values, so no large
+        list or nested object is held in encoded form as a whole.
+        """
+        buffer = []
+        size = 0
+        for piece in self._iter_pieces(obj):
+            buffer.append(piece)
+            size += len(piece)
+            if size >= chunk_size:
+                yield b"".join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield b"".join(buffer)
+
+    def _iter_pieces(self, obj: Any) -> Iterator[bytes]:
+        if isinstance(obj, dict):
+            separator = b"{"
+            for key, value in obj.items():
+                yield separator + self.dumps(str(key)) + b":"
+                yield from self._iter_pieces(value)
+                separator = b","
+            yield b"}" if separator == b"," else b"{}"
+        elif isinstance(obj, list):
+            separator = b"["
+            for item in obj:
+                if isinstance(item, (dict, list)):
+                    yield separator
+                    yield from self._iter_pieces(item)
+                else:
+                    yield separator + self.dumps(item)
+                separator = b","
+            yield b"]" if separator == b"," else b"[]"
+        else:
+            yield self.dumps(obj)
+
+
+def _orjson_default(obj):
+    # named tuples such as graphql's SourceLocation are serialized as lists by
+    # the standard library
+    if isinstance(obj, tuple):
+        return list(obj)
+    raise TypeError
+
+
+class OrjsonCodec(JSONCodec):
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        self.option = orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, default=_orjson_default, option=self.option)
+
+    def dumps_str(self, obj):
+        return orjson.dumps(obj, default=_orjson_default, option=self.option).decode()
+
+
+class MsgpackCodec:
+    """MessagePack codec for binary websocket frames.
+
+    Uses the msgpack package when installed, and a pure-Python implementation
+    otherwise or if `pure_python` is set.
+    """
+
+    binary = True
+
+    def __init__(self, pure_python: bool = False):
+        if msgpack is None or pure_python:
+            self._packb = msgpack_fallback.packb
+            self._unpackb = msgpack_fallback.unpackb
+        else:
+            self._packb = lambda obj: msgpack.packb(obj, use_bin_type=True)
+            self._unpackb = lambda data: msgpack.unpackb(data, raw=False)
+
+    def loads(self, data: bytes) -> Any:
+        return self._unpackb(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._packb(obj)
+
+    def dumps_frame(self, obj: Any) -> bytes:
+        return self._packb(obj)
+
+    def envelope(self, fields: dict, key: str) -> Tuple[bytes, bytes]:
+        # maps are a header and their keys and values, drop the packed nil
+        return self._packb({**fields, key: None})[:-1], b""
+
+
+class SharedPayload:
+    """A payload sent to many connections, encoded at most once per codec."""
+
+    __slots__ = ("value", "_frames")
+
+    def __init__(self, value: Any):
+        self.value = value
+        self._frames: Dict[Any, Union[str, bytes]] = {}
+
+    def frame(self, codec) -> Union[str, bytes]:
+        try:
+            return self._frames[codec]
+        except KeyError:
+            frame = self._frames[codec] = codec.dumps_frame(self.value)
+            return frame
+
+
+def default_codec() -> JSONCodec:
+    if orjson is not None:
+        return OrjsonCodec()
+    return JSONCodec()
@@ -0,0 +1,559 @@
+from asyncio import gather
+from collections.abc import Iterable
+from functools import partial
+from inspect import isawaitable
+from typing import Any, Callable, Dict, List, Optional
+
+from graphene.types import resolver as graphene_resolver
+from graphql.error import GraphQLError, located_error
+from graphql.execution.execute import (
+    ExecutionResult,
+    default_field_resolver,
+    get_field_entry_key,
+    response_path_as_list,
+)
+from graphql.execution.values import get_argument_values, get_variable_values
+from graphql.language import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    ListValueNode,
+    ObjectValueNode,
+    OperationDefinitionNode,
+    OperationType,
+    SelectionSetNode,
+    VariableNode,
+)
+from graphql.pyutils import inspect, is_invalid, is_nullish
+from graphql.type import (
+    GraphQLResolveInfo,
+    GraphQLSchema,
+    ResponsePath,
+    is_abstract_type,
+    is_leaf_type,
+    is_list_type,
+    is_non_null_type,
+    is_object_type,
+)
+
+from .cache import LRUCache
+
+
+class Unsupported(Exception):
+    """Raised while compiling constructs left to the standard executor."""
+
+
+class FieldPlan:
+    """Everything needed to resolve and complete one field of a selection."""
+
+    __slots__ = (
+        "key",
+        "name",
+        "field_nodes",
+        "field_def",
+        "parent_type",
+        "return_type",
+        "nullable",
+        "resolve",
+        "attname",
+        "default",
+        "lookup",
+        "args",
+        "complete",
+    )
+
+
+class _Execution:
+    __slots__ = (
+        "schema",
+        "fragments",
+        "root_value",
+        "operation",
+        "variable_values",
+        "context_value",
+        "errors",
+        "args",
+    )
+
+    def __init__(self, plan, root_value, context_value, variable_values):
+        self.schema = plan.schema
+        self.fragments = plan.fragments
+        self.root_value = root_value
+        self.operation = plan.operation
+        self.variable_values = variable_values
+        self.context_value = context_value
+        self.errors: List[GraphQLError] = []
+        self.args: Dict[int, Dict[str, Any]] = {}
+
+    def get_args(self, plan: FieldPlan) -> Dict[str, Any]:
+        # arguments using variables are coerced once per execution
+        args = self.args.get(id(plan))
+        if args is None:
+            args = self.args[id(plan)] = get_argument_values(
+                plan.field_def, plan.field_nodes[0], self.variable_values
+            )
+        return args
+
+    def handle_error(self, error, plan: FieldPlan, path: ResponsePath):
+        error = located_error(error, plan.field_nodes, response_path_as_list(path))
+        if not plan.nullable:
+            raise error
+        self.errors.append(error)
+        return None
+
+    def execute_fields(self, plans: List[FieldPlan], source, path):
+        results = {}
+        awaitable_keys = []
+        for plan in plans:
+            field_path = ResponsePath(path, plan.key)
+            try:
+                if plan.lookup is not None:
+                    value = plan.lookup(source, plan.attname, plan.default)
+                else:
+                    info = GraphQLResolveInfo(
+                        plan.name,
+                        plan.field_nodes,
+                        plan.return_type,
+                        plan.parent_type,
+                        field_path,
+                        self.schema,
+                        self.fragments,
+                        self.root_value,
+                        self.operation,
+                        self.variable_values,
+                        self.context_value,
+                    )
+                    args = plan.args if plan.args is not None else self.get_args(plan)
+                    value = plan.resolve(source, info, **args)
+                if isawaitable(value):
+                    completed = self.complete_async(plan, value, field_path)
+                else:
+                    if isinstance(value, Exception):
+                        raise value
+                    completed = plan.complete(self, value, field_path)
+                    if isawaitable(completed):
+                        completed = self.catch_async(plan, completed, field_path)
+            except Exception as error:
+                completed = self.handle_error(error, plan, field_path)
+            results[plan.key] = completed
+            if isawaitable(completed):
+                awaitable_keys.append(plan.key)
+        if not awaitable_keys:
+            return results
+
+        async def get_results():
+            values = await gather(*(results[key] for key in awaitable_keys))
+            results.update(zip(awaitable_keys, values))
+            return results
+
+        return get_results()
+
+    async def complete_async(self, plan: FieldPlan, value, path):
+        try:
+            value = await value
+            if isinstance(value, Exception):
+                raise value
+            completed = plan.complete(self, value, path)
+            if isawaitable(completed):
+                completed = await completed
+            return completed
+        except Exception as error:
+            return self.handle_error(error, plan, path)
+
+    async def catch_async(self, plan: FieldPlan, completed, path):
+        try:
+            return await completed
+        except Exception as error:
+            return self.handle_error(error, plan, path)
+
+
+def _lookup(source, attname, default):
+    if isinstance(source, dict):
+        return source.get(attname, default)
+    return getattr(source, attname, default)
+
+
+def _attr_lookup(source, attname, default):
+    return getattr(source, attname, default)
+
+
+def _dict_lookup(source, attname, default):
+    return source.get(attname, default)
+
+
+LOOKUPS = {
+    graphene_resolver.dict_or_attr_resolver: _lookup,
+    graphene_resolver.attr_resolver: _attr_lookup,
+    graphene_resolver.dict_resolver: _dict_lookup,
+}
+
+
+def _has_variables(node) -> bool:
+    if isinstance(node, VariableNode):
+        return True
+    if isinstance(node, ListValueNode):
+        return any(_has_variables(value) for value in node.values)
+    if isinstance(node, ObjectValueNode):
+        return any(_has_variables(field.value) for field in node.fields)
+    return False
+
+
+class CompiledOperation:
+    """An operation compiled to a tree of field plans.
+
+    Field definitions, resolvers, constant arguments and leaf serializers are
+    looked up once at compile time, and graphene's default resolvers are
+    replaced by direct attribute or key lookups. Errors and nulls propagate
+    as in the standard executor.
+    """
+
+    def __init__(self, schema: GraphQLSchema, document: DocumentNode, operation):
+        if operation.operation != OperationType.QUERY:
+            raise Unsupported("only queries are compiled")
+        self.schema = schema
+        self.document = document
+        self.operation = operation
+        self.fragments: Dict[str, FragmentDefinitionNode] = {
+            d.name.value: d
+            for d in document.definitions
+            if isinstance(d, FragmentDefinitionNode)
+        }
+        self.root_plans = self.compile_selections(
+            schema.query_type, [operation.selection_set]
+        )
+
+    def execute(self, root_value=None, context_value=None, variable_values=None):
+        errors, coerced = get_variable_values(
+            self.schema, self.operation.variable_definitions, variable_values or {}
+        )
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+        execution = _Execution(self, root_value, context_value, coerced)
+        try:
+            data = execution.execute_fields(self.root_plans, root_value, None)
+        except GraphQLError as error:
+            execution.errors.append(error)
+            data = None
+        if isawaitable(data):
+
+            async def await_data():
+                try:
+                    result = await data
+                except GraphQLError as error:
+                    execution.errors.append(error)
+                    result = None
+                return self.build_result(result, execution.errors)
+
+            return await_data()
+        return self.build_result(data, execution.errors)
+
+    @staticmethod
+    def build_result(data, errors: List[GraphQLError]) -> ExecutionResult:
+        if not errors:
+            return ExecutionResult(data, None)
+        errors.sort(key=lambda error: (error.locations, error.path, error.message))
+        return ExecutionResult(data, errors)
+
+    def compile_selections(
+        self, parent_type, selection_sets: List[SelectionSetNode]
+    ) -> List[FieldPlan]:
+        fields: Dict[str, List[FieldNode]] = {}
+        visited: set = set()
+        for selection_set in selection_sets:
+            self.collect_fields(parent_type, selection_set, fields, visited)
+        plans = []
+        for key, field_nodes in fields.items():
+            plan = self.compile_field(parent_type, key, field_nodes)
+            if plan is not None:
+                plans.append(plan)
+        return plans
+
+    def collect_fields(self, parent_type, selection_set, fields, visited):
+        for selection in selection_set.selections:
+            if selection.directives:
+                # @skip, @include and custom directives depend on execution
+                raise Unsupported("directives")
+            if isinstance(selection, FieldNode):
+                fields.setdefault(get_field_entry_key(selection), []).append(
+                    selection
+                )
+                continue
+            if isinstance(selection, InlineFragmentNode):
+                fragment = selection
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                if name in visited:
+                    continue
+                visited.add(name)
+                fragment = self.fragments.get(name)
+                if fragment is None:
+                    continue
+            else:  # pragma: no cover
+                continue
+            if not self.fragment_applies(fragment, parent_type):
+                continue
+            self.collect_fields(parent_type, fragment.selection_set, fields, visited)
+
+    def fragment_applies(self, fragment, parent_type) -> bool:
+        if not fragment.type_condition:
+            return True
+        condition = self.schema.get_type(fragment.type_condition.name.value)
+        if condition is parent_type:
+            return True
+        if is_abstract_type(condition):
+            return self.schema.is_possible_type(condition, parent_type)
+        return False
+
+    def compile_field(
+        self, parent_type, key: str, field_nodes: List[FieldNode]
+    ) -> Optional[FieldPlan]:
+        name = field_nodes[0].name.value
+        plan = FieldPlan()
+        plan.key = key
+        plan.name = name
+        plan.field_nodes = field_nodes
+        plan.parent_type = parent_type
+        plan.args = {}
+        plan.attname = None
+        plan.default = None
+        plan.lookup = None
+        if name == "__typename":
+            plan.field_def = None
+            plan.return_type = None
+            plan.nullable = False
+            plan.resolve = None
+            plan.attname = parent_type.name
+            plan.lookup = lambda source, type_name, default: type_name
+            plan.complete = lambda execution, value, path: value
+            return plan
+        if name.startswith("__"):
+            raise Unsupported("introspection")
+        field_def = parent_type.fields.get(name)
+        if field_def is None:
+            return None
+        plan.field_def = field_def
+        plan.return_type = field_def.type
+        plan.nullable = not is_non_null_type(field_def.type)
+        resolve = field_def.resolve or default_field_resolver
+        plan.resolve = resolve
+        if isinstance(resolve, partial) and not resolve.keywords:
+            lookup = LOOKUPS.get(resolve.func)
+            if lookup is not None and len(resolve.args) == 2:
+                plan.lookup = lookup
+                plan.attname, plan.default = resolve.args
+        node = field_nodes[0]
+        if any(_has_variables(argument.value) for argument in node.arguments or ()):
+            plan.args = None
+        else:
+            try:
+                plan.args = get_argument_values(field_def, node)
+            except GraphQLError:
+                # raised again for every execution
+                plan.args = None
+        plan.complete = self.compile_completer(field_def.type, plan)
+        return plan
+
+    def compile_completer(self, type_, plan: FieldPlan) -> Callable:
+        if is_non_null_type(type_):
+            return self.compile_non_null(type_, plan)
+        if is_list_type(type_):
+            return self.compile_list(type_, plan)
+        if is_leaf_type(type_):
+            return self.compile_leaf(type_)
+        if is_object_type(type_):
+            return self.compile_object(type_, plan)
+        raise Unsupported("abstract types")
+
+    def compile_non_null(self, type_, plan: FieldPlan) -> Callable:
+        complete_inner = self.compile_completer(type_.of_type, plan)
+        message = "Cannot return null for non-nullable field {}.{}.".format(
+            plan.parent_type.name, plan.name
+        )
+
+        def check(completed):
+            if completed is None:
+                raise TypeError(message)
+            return completed
+
+        async def check_async(completed):
+            return check(await completed)
+
+        def complete(execution, value, path):
+            completed = complete_inner(execution, value, path)
+            if isawaitable(completed):
+                return check_async(completed)
+            return check(completed)
+
+        return complete
+
+    def compile_leaf(self, type_) -> Callable:
+        serialize = type_.serialize
+
+        def complete(execution, value, path):
+            if is_nullish(value):
+                return None
+            serialized = serialize(value)
+            if is_invalid(serialized):
+                raise TypeError(
+                    "Expected a value of type '{}' but received: {}".format(
+                        inspect(type_), inspect(value)
+                    )
+                )
+            return serialized
+
+        return complete
+
+    def compile_object(self, type_, plan: FieldPlan) -> Callable:
+        plans = self.compile_selections(
+            type_, [node.selection_set for node in plan.field_nodes]
+        )
+        is_type_of = type_.is_type_of
+        execute_fields = _Execution.execute_fields
+        field_nodes = plan.field_nodes
+
+        def invalid(value):
+            return GraphQLError(
+                "Expected value of type '{}' but got: {}.".format(
+                    type_.name, inspect(value)
+                ),
+                field_nodes,
+            )
+
+        async def complete_after_check(execution, check, value, path):
+            if not await check:
+                raise invalid(value)
+            result = execute_fields(execution, plans, value, path)
+            if isawaitable(result):
+                result = await result
+            return result
+
+        def complete(execution, value, path):
+            if is_nullish(value):
+                return None
+            if is_type_of is not None:
+                info = GraphQLResolveInfo(
+                    plan.name,
+                    plan.field_nodes,
+                    plan.return_type,
+                    plan.parent_type,
+                    path,
+                    execution.schema,
+                    execution.fragments,
+                    execution.root_value,
+                    execution.operation,
+                    execution.variable_values,
+                    execution.context_value,
+                )
+                check = is_type_of(value, info)
+                if isawaitable(check):
+                    return complete_after_check(execution, check, value, path)
+                if not check:
+                    raise invalid(value)
+            return execute_fields(execution, plans, value, path)
+
+        return complete
+
+    def compile_list(self, type_, plan: FieldPlan) -> Callable:
+        item_type = type_.of_type
+        complete_item = self.compile_completer(item_type, plan)
+        item_nullable = not is_non_null_type(item_type)
+        message = "Expected Iterable, but did not find one for field {}.{}.".format(
+            plan.parent_type.name, plan.name
+        )
+
+        def handle_error(execution, error, path):
+            error = located_error(
+                error, plan.field_nodes, response_path_as_list(path)
+            )
+            if not item_nullable:
+                raise error
+            execution.errors.append(error)
+            return None
+
+        async def complete_async(execution, item, path):
+            try:
+                if isawaitable(item):
+                    item = await item
+                if isinstance(item, Exception):
+                    raise item
+                completed = complete_item(execution, item, path)
+                if isawaitable(completed):
+                    completed = await completed
+                return completed
+            except Exception as error:
+                return handle_error(execution, error, path)
+
+        async def catch_async(execution, completed, path):
+            try:
+                return await completed
+            except Exception as error:
+                return handle_error(execution, error, path)
+
+        def complete(execution, value, path):
+            if is_nullish(value):
+                return None
+            if not isinstance(value, Iterable) or isinstance(value, str):
+                raise TypeError(message)
+            results = []
+            awaitable_indices = []
+            for index, item in enumerate(value):
+                item_path = ResponsePath(path, index)
+                try:
+                    if isawaitable(item):
+                        completed = complete_async(execution, item, item_path)
+                    else:
+                        if isinstance(item, Exception):
+                            raise item
+                        completed = complete_item(execution, item, item_path)
+                        if isawaitable(completed):
+                            completed = catch_async(execution, completed, item_path)
+                except Exception as error:
+                    completed = handle_error(execution, error, item_path)
+                if isawaitable(completed):
+                    awaitable_indices.append(index)
+                results.append(completed)
+            if not awaitable_indices:
+                return results
+
+            async def get_results():
+                values = await gather(*(results[i] for i in awaitable_indices))
+                for index, completed in zip(awaitable_indices, values):
+                    results[index] = completed
+                return results
+
+            return get_results()
+
+        return complete
+
+
+class OperationCompiler:
+    """Compiles operations once per document and caches the plans.
+
+    `get` returns None for operations using constructs that are not compiled:
+    mutations, subscriptions, directives, abstract types and introspection
+    other than `__typename`; those run on the standard executor.
+    """
+
+    def __init__(self, cache_size: int = 1024):
+        self.cache = LRUCache(cache_size)
+
+    def get(
+        self,
+        schema: GraphQLSchema,
+        document: DocumentNode,
+        operation: OperationDefinitionNode,
+    ) -> Optional[CompiledOperation]:
+        key = (id(schema), id(document), id(operation))
+        entry = self.cache.get(key)
+        if entry is None:
+            try:
+                compiled = CompiledOperation(schema, document, operation)
+            except Unsupported:
+                compiled = None
+            # the entry references the document, so its id is not reused while
+            # the entry is cached
+            entry = (document, compiled)
+            self.cache.set(key, entry)
+        return entry[1]
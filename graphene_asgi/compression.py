@@ -0,0 +1,134 @@
+import zlib
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+DEFAULT_LEVELS = {"br": 4, "zstd": 3, "gzip": 6, "deflate": 6}
+
+
+class _ZlibCompressor:
+    def __init__(self, level: int, wbits: int):
+        self._compressobj = zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressobj.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressobj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressobj.compress(data)
+
+    def flush(self):
+        return self._compressobj.flush()
+
+
+def available_encodings() -> Sequence[str]:
+    encodings = []
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    return encodings + ["gzip", "deflate"]
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    accepted = {}
+    for item in value.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def iter_chunks(data: bytes, size: int) -> Iterator[memoryview]:
+    view = memoryview(data)
+    for start in range(0, len(view), size):
+        end = start + size
+        yield view[start:end]
+
+
+class ResponseCompressor:
+    """Compresses HTTP responses with the best encoding the client accepts.
+
+    `encodings` lists the encodings to offer in order of preference, by default
+    brotli and zstd when importable, then gzip and deflate. Bodies smaller than
+    `min_size` are sent as is. Bodies larger than `chunk_size` are compressed
+    and sent chunk by chunk so the compressed body is never held in full.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1024,
+        levels: Optional[Dict[str, int]] = None,
+        encodings: Optional[Sequence[str]] = None,
+        chunk_size: int = 64 * 1024,
+    ):
+        self.min_size = min_size
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.encodings = list(available_encodings() if encodings is None else encodings)
+        self.chunk_size = chunk_size
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        if not accept_encoding:
+            return None
+        accepted = parse_accept_encoding(accept_encoding)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def compressor(self, encoding: str):
+        level = self.levels[encoding]
+        if encoding == "gzip":
+            return _ZlibCompressor(level, 16 + zlib.MAX_WBITS)
+        if encoding == "deflate":
+            return _ZlibCompressor(level, zlib.MAX_WBITS)
+        if encoding == "br":
+            return _BrotliCompressor(level)
+        if encoding == "zstd":
+            return _ZstdCompressor(level)
+        raise ValueError("Unsupported encoding {!r}".format(encoding))
+
+    def compress(self, encoding: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        compressor = self.compressor(encoding)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
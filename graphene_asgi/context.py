@@ -0,0 +1,56 @@
+from collections.abc import Mapping
+from typing import Dict, Optional
+
+
+class ConnectionContext(Mapping):
+    """ASGI scope of a connection with its decoded headers and query string.
+
+    Reading it as a mapping gives the raw scope. Headers and the query string
+    are decoded on first access and cached for the lifetime of the connection,
+    so every operation of a websocket connection reuses them. The scope itself
+    is only referenced, never copied, as the server keeps it anyway.
+    """
+
+    __slots__ = ("scope", "_headers", "_query_string")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self._headers: Optional[Dict[str, str]] = None
+        self._query_string: Optional[str] = None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        if self._headers is None:
+            self._headers = {
+                k.decode("ascii"): v.decode("ascii") for k, v in self.scope["headers"]
+            }
+        return self._headers
+
+    @property
+    def query_string(self) -> str:
+        if self._query_string is None:
+            self._query_string = self.scope.get("query_string", b"").decode()
+        return self._query_string
+
+    def new_context(self) -> dict:
+        """A context for one operation, to be extended with per-operation fields.
+
+        Contexts stay plain dicts, which resolvers and JSON encoders expect.
+        Building one from the scope costs as much as copying a cached one, so
+        no copy of the scope is kept per connection. Headers are decoded once
+        but copied, so concurrent operations cannot modify each other's.
+        """
+        return {
+            **self.scope,
+            "headers": dict(self.headers),
+            "query_string": self.query_string,
+        }
+
+    def __getitem__(self, key):
+        return self.scope[key]
+
+    def __iter__(self):
+        return iter(self.scope)
+
+    def __len__(self):
+        return len(self.scope)
@@ -0,0 +1,256 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from graphql.error import GraphQLError
+from graphql.language import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    IntValueNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    VariableNode,
+)
+from graphql.execution.values import get_variable_values
+from graphql.pyutils import is_invalid
+from graphql.type import GraphQLSchema, get_named_type, is_list_type
+from graphql.utilities import get_operation_root_type
+
+from .cache import LRUCache
+
+COST_ATTRIBUTE = "_graphene_asgi_cost"
+
+# an argument or variable without a value, its default value applies
+_OMITTED = object()
+
+
+def cost(weight: float):
+    """Declare the cost of a field on its resolver::
+
+        @cost(10)
+        def resolve_search(root, info, query):
+            ...
+    """
+
+    def decorator(resolver):
+        setattr(resolver, COST_ATTRIBUTE, weight)
+        return resolver
+
+    return decorator
+
+
+class QueryCost(NamedTuple):
+    depth: int
+    fields: int
+    cost: float
+
+
+class _Entry:
+    __slots__ = ("variables", "costs")
+
+    def __init__(self, variables: Tuple[str, ...]):
+        self.variables = variables
+        self.costs = LRUCache(16)
+
+
+class QueryCostAnalyzer:
+    """Static depth, field count and cost analysis of validated operations.
+
+    The cost of a field is its weight plus the cost of its selections, which
+    is multiplied by the value of its list size argument (`first`, `last` or
+    `limit` by default) when the field returns a list. Weights default to
+    `default_field_cost` and can be set per `"Type.field"` in `field_costs` or
+    with the `cost` decorator on resolvers.
+
+    List sizes are read from coerced variables, so variable default values
+    count, and from the argument default value when it is omitted. Results are
+    cached per document and operation name, and per coerced value of the
+    variables used as list sizes.
+    """
+
+    def __init__(
+        self,
+        max_depth: Optional[int] = None,
+        max_fields: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        default_field_cost: float = 1,
+        default_list_size: int = 1,
+        list_size_arguments: Sequence[str] = ("first", "last", "limit"),
+        field_costs: Optional[Dict[str, float]] = None,
+        cache_size: int = 1024,
+    ):
+        self.max_depth = max_depth
+        self.max_fields = max_fields
+        self.max_cost = max_cost
+        self.default_field_cost = default_field_cost
+        self.default_list_size = default_list_size
+        self.list_size_arguments = frozenset(list_size_arguments)
+        self.field_costs = dict(field_costs or {})
+        self.cache = LRUCache(cache_size)
+
+    def check(
+        self,
+        schema: GraphQLSchema,
+        document: DocumentNode,
+        operation: OperationDefinitionNode,
+        variables: Optional[Dict[str, Any]],
+        key: Any = None,
+    ) -> List[GraphQLError]:
+        query_cost = self.get_cost(schema, document, operation, variables, key)
+        errors = []
+        for name, value, limit in (
+            ("depth", query_cost.depth, self.max_depth),
+            ("field count", query_cost.fields, self.max_fields),
+            ("cost", query_cost.cost, self.max_cost),
+        ):
+            if limit is not None and value > limit:
+                errors.append(
+                    GraphQLError(
+                        "Query {} {} exceeds the maximum of {}".format(
+                            name, value, limit
+                        ),
+                        extensions={"code": "QUERY_TOO_COMPLEX"},
+                    )
+                )
+        return errors
+
+    def get_cost(
+        self,
+        schema: GraphQLSchema,
+        document: DocumentNode,
+        operation: OperationDefinitionNode,
+        variables: Optional[Dict[str, Any]],
+        key: Any = None,
+    ) -> QueryCost:
+        coerced = get_variable_values(
+            schema, operation.variable_definitions or [], variables or {}
+        )
+        # invalid variables fail execution, the cost does not matter then
+        variables = coerced.coerced or {}
+        entry = self.cache.get(key) if key is not None else None
+        if entry is not None:
+            values = tuple(variables.get(name) for name in entry.variables)
+            try:
+                query_cost = entry.costs.get(values)
+            except TypeError:  # unhashable variable values
+                query_cost = None
+            if query_cost is not None:
+                return query_cost
+        used: Set[str] = set()
+        query_cost = self.analyze(schema, document, operation, variables, used)
+        if key is not None:
+            if entry is None:
+                entry = _Entry(tuple(sorted(used)))
+                self.cache.set(key, entry)
+            values = tuple(variables.get(name) for name in entry.variables)
+            try:
+                entry.costs.set(values, query_cost)
+            except TypeError:
+                pass
+        return query_cost
+
+    def analyze(
+        self,
+        schema: GraphQLSchema,
+        document: DocumentNode,
+        operation: OperationDefinitionNode,
+        variables: Dict[str, Any],
+        used_variables: Optional[Set[str]] = None,
+    ) -> QueryCost:
+        fragments = {
+            d.name.value: d
+            for d in document.definitions
+            if isinstance(d, FragmentDefinitionNode)
+        }
+        if used_variables is None:
+            used_variables = set()
+        walker = _Walker(self, schema, fragments, variables, used_variables)
+        root_type = get_operation_root_type(schema, operation)
+        depth, cost = walker.walk(operation.selection_set, root_type, 0)
+        return QueryCost(depth=depth, fields=walker.fields, cost=cost)
+
+    def field_cost(self, parent_type, name: str, field) -> float:
+        weight = self.field_costs.get("{}.{}".format(parent_type.name, name))
+        if weight is None:
+            weight = getattr(field.resolve, COST_ATTRIBUTE, self.default_field_cost)
+        return weight
+
+
+class _Walker:
+    def __init__(self, analyzer, schema, fragments, variables, used_variables):
+        self.analyzer = analyzer
+        self.schema = schema
+        self.fragments = fragments
+        self.variables = variables
+        self.used_variables = used_variables
+        self.fields = 0
+
+    def walk(self, selection_set: SelectionSetNode, parent_type, depth: int):
+        max_depth = depth
+        total = 0.0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                sub_depth, sub_cost = self.walk_field(selection, parent_type, depth)
+            else:
+                if isinstance(selection, FragmentSpreadNode):
+                    fragment = self.fragments[selection.name.value]
+                else:
+                    fragment = selection
+                type_condition = fragment.type_condition
+                fragment_type = (
+                    self.schema.get_type(type_condition.name.value)
+                    if type_condition
+                    else parent_type
+                )
+                sub_depth, sub_cost = self.walk(
+                    fragment.selection_set, fragment_type, depth
+                )
+            max_depth = max(max_depth, sub_depth)
+            total += sub_cost
+        return max_depth, total
+
+    def walk_field(self, node: FieldNode, parent_type, depth: int):
+        name = node.name.value
+        if name.startswith("__"):
+            # introspection is not counted
+            return depth, 0
+        self.fields += 1
+        depth += 1
+        field = getattr(parent_type, "fields", {}).get(name)
+        if field is None:
+            return depth, self.analyzer.default_field_cost
+        weight = self.analyzer.field_cost(parent_type, name, field)
+        if not node.selection_set:
+            return depth, weight
+        sub_depth, sub_cost = self.walk(
+            node.selection_set, get_named_type(field.type), depth
+        )
+        return sub_depth, weight + sub_cost * self.list_size(node, field)
+
+    def list_size(self, node: FieldNode, field) -> int:
+        field_type = field.type
+        if hasattr(field_type, "of_type") and not is_list_type(field_type):
+            field_type = field_type.of_type
+        if not is_list_type(field_type):
+            return 1
+        values = {a.name.value: a.value for a in node.arguments or ()}
+        for name, argument in field.args.items():
+            if name not in self.analyzer.list_size_arguments:
+                continue
+            value = values.get(name)
+            if isinstance(value, VariableNode):
+                self.used_variables.add(value.name.value)
+                value = self.variables.get(value.name.value, _OMITTED)
+            elif isinstance(value, IntValueNode):
+                value = value.value
+            elif value is None:
+                value = _OMITTED
+            if value is _OMITTED:
+                value = argument.default_value
+                if is_invalid(value):
+                    continue
+            try:
+                return max(int(value), 0)
+            except (TypeError, ValueError):
+                pass
+        return self.analyzer.default_list_size
@@ -0,0 +1,171 @@
+import asyncio
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+
+class DataLoader:
+    """Batches and memoizes loads of keys::
+
+        class UserLoader(DataLoader):
+            async def batch_load(self, keys):
+                users = await db.fetch_users(keys)
+                return [users.get(key) for key in keys]
+
+    Keys loaded during one event loop iteration are passed to `batch_load`
+    together, in batches of at most `max_batch_size` keys. `batch_load` returns
+    one value per key in the same order; an exception instance fails only the
+    load of its key. Loads are memoized for the lifetime of the loader unless
+    `cache` is false.
+
+    `load`, `load_many` and `prime` may also be called from resolvers running
+    in a thread pool; the loads are then made on the loader's event loop.
+    """
+
+    def __init__(
+        self,
+        batch_load_fn: Optional[Callable[[List[Hashable]], Awaitable[Sequence]]] = None,
+        max_batch_size: Optional[int] = None,
+        cache: bool = True,
+    ):
+        if batch_load_fn is not None:
+            self.batch_load = batch_load_fn
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Tuple[Hashable, asyncio.Future]] = []
+        self.loop = _running_loop()
+
+    async def batch_load(self, keys: List[Hashable]) -> Sequence:
+        raise NotImplementedError
+
+    def load(self, key: Hashable) -> "asyncio.Future":
+        loop = self._get_loop()
+        if _running_loop() is not loop:
+            return _run_on(loop, self._load(key))
+        future = self._cache.get(key) if self.cache else None
+        if future is not None:
+            return future
+        future = loop.create_future()
+        if self.cache:
+            self._cache[key] = future
+        self._queue.append((key, future))
+        if len(self._queue) == 1:
+            loop.call_soon(self._dispatch)
+        return future
+
+    async def _load(self, key: Hashable):
+        return await self.load(key)
+
+    def load_many(self, keys: Sequence[Hashable]) -> "asyncio.Future":
+        loop = self._get_loop()
+        if _running_loop() is not loop:
+            return _run_on(loop, self._load_many(keys))
+        return asyncio.gather(*(self.load(key) for key in keys))
+
+    async def _load_many(self, keys: Sequence[Hashable]):
+        return await self.load_many(keys)
+
+    def prime(self, key: Hashable, value: Any):
+        loop = self._get_loop()
+        if _running_loop() is not loop:
+            loop.call_soon_threadsafe(self.prime, key, value)
+            return
+        if self.cache and key not in self._cache:
+            future = loop.create_future()
+            future.set_result(value)
+            self._cache[key] = future
+
+    def clear(self, key: Hashable):
+        self._cache.pop(key, None)
+
+    def clear_all(self):
+        self._cache.clear()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        if self.loop is None:
+            self.loop = asyncio.get_event_loop()
+        return self.loop
+
+    def _dispatch(self):
+        queue, self._queue = self._queue, []
+        size = self.max_batch_size or len(queue)
+        for start in range(0, len(queue), size):
+            end = start + size
+            asyncio.ensure_future(self._load_batch(queue[start:end]))
+
+    async def _load_batch(self, batch: List[Tuple[Hashable, asyncio.Future]]):
+        keys = [key for key, _ in batch]
+        try:
+            values = await self.batch_load(keys)
+            if len(values) != len(keys):
+                raise ValueError(
+                    "batch_load returned {} values for {} keys".format(
+                        len(values), len(keys)
+                    )
+                )
+        except Exception as error:
+            for key, future in batch:
+                # failed loads are not memoized
+                self.clear(key)
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (key, future), value in zip(batch, values):
+            if future.done():
+                continue
+            if isinstance(value, Exception):
+                self.clear(key)
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+
+
+class Loaders:
+    """DataLoaders of one request, created on first access by name.
+
+    Available to resolvers as `info.context["loaders"]` when the application
+    is created with `loaders={"user": UserLoader}`.
+    """
+
+    __slots__ = ("factories", "loaders", "loop")
+
+    def __init__(self, factories: Dict[str, Callable[[], DataLoader]]):
+        self.factories = factories
+        self.loaders: Dict[str, DataLoader] = {}
+        self.loop = _running_loop()
+
+    def __getitem__(self, name: str) -> DataLoader:
+        loader = self.loaders.get(name)
+        if loader is None:
+            loader = self.factories[name]()
+            if loader.loop is None:
+                # created by a resolver running in a thread pool
+                loader.loop = self.loop
+            loader = self.loaders.setdefault(name, loader)
+        return loader
+
+    def clear_all(self):
+        for loader in self.loaders.values():
+            loader.clear_all()
+
+
+def _run_on(loop: asyncio.AbstractEventLoop, coro) -> "asyncio.Future":
+    return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop), loop=loop)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """The event loop running in this thread, if any."""
+    try:
+        loop = asyncio.get_event_loop()
+    except RuntimeError:
+        return None
+    return loop if loop.is_running() else None
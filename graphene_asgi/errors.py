@@ -0,0 +1,29 @@
+from graphql.error import GraphQLError
+
+
+class OperationTimeout(GraphQLError):
+    status = 504
+
+    def __init__(self):
+        super().__init__("Operation timed out", extensions={"code": "TIMEOUT"})
+
+
+class Overloaded(GraphQLError):
+    """Rejected by admission control, may be retried after `retry_after` seconds."""
+
+    status = 503
+    code = "OVERLOADED"
+    default_message = "Server is overloaded"
+
+    def __init__(self, retry_after: int = 1, message: str = None):
+        super().__init__(
+            message or self.default_message,
+            extensions={"code": self.code, "retryAfter": retry_after},
+        )
+        self.retry_after = retry_after
+
+
+class TooManyOperations(Overloaded):
+    status = 429
+    code = "TOO_MANY_OPERATIONS"
+    default_message = "Too many concurrent operations on this connection"
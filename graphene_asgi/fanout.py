@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from graphql.execution.execute import ExecutionResult
+
+from .metrics import Metrics
+from .streams import BLOCK, DROP_OLDEST, SubscriptionBuffer
+
+logger = logging.getLogger(__name__)
+
+DATA = "data"
+ERROR = "error"
+
+
+class SharedStream:
+    __slots__ = ("key", "subscribers", "latest", "task")
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.subscribers: Set["SharedSubscription"] = set()
+        self.latest = None
+        self.task = None
+
+
+class SharedSubscription:
+    """A subscriber of a shared upstream, fed without a task of its own.
+
+    Events are put in `buffer` and `notify(subscription)` is called when one
+    arrives or the upstream ends, after which the buffer is closed. The
+    subscriber reads them with `buffer.get_nowait()` and calls `cancel` to
+    leave the upstream.
+    """
+
+    __slots__ = ("hub", "shared", "buffer", "notify")
+
+    def __init__(
+        self,
+        hub: "SubscriptionHub",
+        shared: SharedStream,
+        buffer: SubscriptionBuffer,
+        notify: Optional[Callable[["SharedSubscription"], None]],
+    ):
+        self.hub = hub
+        self.shared = shared
+        self.buffer = buffer
+        self.notify = notify
+
+    def push(self, event):
+        self.buffer.put_nowait(event)
+        if self.notify is not None:
+            self.notify(self)
+
+    def finish(self):
+        self.buffer.close()
+        if self.notify is not None:
+            self.notify(self)
+
+    def cancel(self):
+        self.hub._leave(self)
+
+
+class SubscriptionHub:
+    """Runs one upstream subscription per key and fans its events out.
+
+    Every event is formatted and serialized once by `encode` and put in the
+    buffer of each subscriber as a `("data", text)` tuple. Subscribers joining
+    an upstream that is already running first receive its latest event. The
+    upstream is cancelled when its last subscriber leaves.
+
+    The `block` policy is not supported: one slow subscriber would stall the
+    upstream for all the others.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = 100,
+        buffer_policy: str = DROP_OLDEST,
+        metrics: Metrics = None,
+    ):
+        if buffer_policy == BLOCK:
+            raise ValueError("Shared subscriptions cannot use the block policy")
+        self.buffer_size = buffer_size
+        self.buffer_policy = buffer_policy
+        self.metrics = metrics
+        self.streams: Dict[Hashable, SharedStream] = {}
+
+    def attach(
+        self,
+        key: Hashable,
+        start: Callable[[], Awaitable[Any]],
+        encode: Callable[[ExecutionResult], str],
+        notify: Optional[Callable[[SharedSubscription], None]] = None,
+    ) -> SharedSubscription:
+        """Subscribe to the upstream of `key`, started with `start` if needed."""
+        shared = self.streams.get(key)
+        if shared is None:
+            shared = self.streams[key] = SharedStream(key)
+            shared.task = asyncio.ensure_future(self._run(shared, start, encode))
+            self._adjust("shared_subscription_upstreams", 1)
+        subscription = SharedSubscription(
+            self,
+            shared,
+            SubscriptionBuffer(self.buffer_size, self.buffer_policy, self.metrics),
+            notify,
+        )
+        if shared.latest is not None:
+            subscription.push(shared.latest)
+        shared.subscribers.add(subscription)
+        self._adjust("shared_subscription_subscribers", 1)
+        return subscription
+
+    async def subscribe(
+        self,
+        key: Hashable,
+        start: Callable[[], Awaitable[Any]],
+        encode: Callable[[ExecutionResult], str],
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Like `attach`, iterating the events."""
+        subscription = self.attach(key, start, encode)
+        try:
+            async for event in subscription.buffer:
+                yield event
+        finally:
+            subscription.cancel()
+
+    async def _run(self, shared: SharedStream, start, encode):
+        try:
+            res = await start()
+            if isinstance(res, ExecutionResult):
+                self._publish(shared, (ERROR, res))
+                return
+            async for item in res:
+                shared.latest = (DATA, encode(item))
+                self._publish(shared, shared.latest)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Shared subscription failed")
+        finally:
+            self._remove(shared)
+            for subscription in list(shared.subscribers):
+                subscription.finish()
+
+    def _publish(self, shared: SharedStream, event):
+        for subscription in list(shared.subscribers):
+            subscription.push(event)
+
+    def _leave(self, subscription: SharedSubscription):
+        shared = subscription.shared
+        if subscription not in shared.subscribers:
+            return
+        shared.subscribers.discard(subscription)
+        subscription.buffer.discard()
+        self._adjust("shared_subscription_subscribers", -1)
+        if not shared.subscribers:
+            shared.task.cancel()
+            self._remove(shared)
+
+    def _remove(self, shared: SharedStream):
+        if self.streams.get(shared.key) is shared:
+            del self.streams[shared.key]
+            self._adjust("shared_subscription_upstreams", -1)
+
+    def _adjust(self, name, delta):
+        if self.metrics is not None:
+            self.metrics.adjust(name, delta)
@@ -0,0 +1,371 @@
+import asyncio
+from copy import copy
+from inspect import isawaitable
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from graphql.error import GraphQLError
+from graphql.execution.execute import (
+    ExecutionContext,
+    ExecutionResult,
+    add_path,
+    assert_valid_execution_arguments,
+    get_field_entry_key,
+    response_path_as_list,
+)
+from graphql.execution.values import get_directive_values
+from graphql.language import (
+    DirectiveLocation,
+    FieldNode,
+    FragmentSpreadNode,
+    InlineFragmentNode,
+    OperationType,
+    SelectionSetNode,
+)
+from graphql.type import (
+    GraphQLArgument,
+    GraphQLBoolean,
+    GraphQLDirective,
+    GraphQLInt,
+    GraphQLNonNull,
+    GraphQLSchema,
+    GraphQLString,
+)
+
+GraphQLDeferDirective = GraphQLDirective(
+    name="defer",
+    locations=[DirectiveLocation.FRAGMENT_SPREAD, DirectiveLocation.INLINE_FRAGMENT],
+    args={
+        "if": GraphQLArgument(GraphQLNonNull(GraphQLBoolean), default_value=True),
+        "label": GraphQLArgument(GraphQLString),
+    },
+    description="Deliver the fragment after the initial payload.",
+)
+
+GraphQLStreamDirective = GraphQLDirective(
+    name="stream",
+    locations=[DirectiveLocation.FIELD],
+    args={
+        "if": GraphQLArgument(GraphQLNonNull(GraphQLBoolean), default_value=True),
+        "label": GraphQLArgument(GraphQLString),
+        "initialCount": GraphQLArgument(GraphQLNonNull(GraphQLInt), default_value=0),
+    },
+    description="Deliver list items after the first `initialCount` one by one.",
+)
+
+INCREMENTAL_DIRECTIVES = (GraphQLDeferDirective, GraphQLStreamDirective)
+
+
+def with_incremental_directives(schema: GraphQLSchema) -> GraphQLSchema:
+    """A copy of `schema` also declaring `@defer` and `@stream`.
+
+    The copy shares the types of `schema`, which is left unchanged.
+    """
+    names = {directive.name for directive in schema.directives}
+    missing = [d for d in INCREMENTAL_DIRECTIVES if d.name not in names]
+    if not missing:
+        return schema
+    derived = copy(schema)
+    derived.directives = [*schema.directives, *missing]
+    return derived
+
+
+class IncrementalExecutionResult:
+    """The initial result of an operation and an iterator of later payloads.
+
+    `subsequent` yields `{"incremental": [...], "hasNext": ...}` payloads; the
+    last one has `hasNext` false.
+    """
+
+    def __init__(self, initial: ExecutionResult, subsequent: AsyncIterator[dict]):
+        self.initial = initial
+        self.subsequent = subsequent
+
+
+class _Fields(dict):
+    """Collected fields and the fragments deferred while collecting them."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.deferred: List[tuple] = []
+
+
+class _Publisher:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.tasks: Set[asyncio.Future] = set()
+        self.pending = 0
+
+    def schedule(self, coro):
+        self.pending += 1
+        task = asyncio.ensure_future(self._run(coro))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, coro):
+        try:
+            await coro
+        except Exception as error:
+            self.queue.put_nowait({"errors": [GraphQLError(str(error)).formatted]})
+        finally:
+            # decremented in the same step as the last patch is published, so
+            # the consumer knows whether more payloads follow
+            self.pending -= 1
+            self.queue.put_nowait(None)
+
+    async def payloads(self):
+        has_next = True
+        try:
+            while self.pending or not self.queue.empty():
+                incremental = [await self.queue.get()]
+                while not self.queue.empty():
+                    incremental.append(self.queue.get_nowait())
+                incremental = [patch for patch in incremental if patch is not None]
+                if incremental:
+                    has_next = bool(self.pending) or not self.queue.empty()
+                    yield {"incremental": incremental, "hasNext": has_next}
+            if has_next:
+                yield {"hasNext": False}
+        finally:
+            for task in list(self.tasks):
+                task.cancel()
+
+
+class IncrementalExecutionContext(ExecutionContext):
+    """Executes `@defer` fragments and `@stream` list items after the rest.
+
+    Deferred work starts right away in separate tasks; the initial result does
+    not wait for it. Each task reports its own errors. Mutations are executed
+    without deferring.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.publisher = _Publisher()
+
+    def collect_fields(
+        self,
+        runtime_type,
+        selection_set: SelectionSetNode,
+        fields: Dict[str, List[FieldNode]],
+        visited_fragment_names: Set[str],
+    ) -> Dict[str, List[FieldNode]]:
+        if not isinstance(fields, _Fields):
+            fields = _Fields(fields)
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                if not self.should_include_node(selection):
+                    continue
+                name = get_field_entry_key(selection)
+                fields.setdefault(name, []).append(selection)
+                continue
+            if not self.should_include_node(selection):
+                continue
+            if isinstance(selection, InlineFragmentNode):
+                fragment = selection
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments.get(selection.name.value)
+                if not fragment or selection.name.value in visited_fragment_names:
+                    continue
+            else:  # pragma: no cover
+                continue
+            if not self.does_fragment_condition_match(fragment, runtime_type):
+                continue
+            defer = self.get_defer(selection)
+            if defer is not None:
+                fields.deferred.append((fragment.selection_set, defer.get("label")))
+                continue
+            if isinstance(selection, FragmentSpreadNode):
+                visited_fragment_names.add(selection.name.value)
+            self.collect_fields(
+                runtime_type, fragment.selection_set, fields, visited_fragment_names
+            )
+        return fields
+
+    def get_defer(self, node) -> Optional[Dict[str, Any]]:
+        if self.operation.operation == OperationType.MUTATION:
+            return None
+        defer = get_directive_values(GraphQLDeferDirective, node, self.variable_values)
+        if not defer or not defer["if"]:
+            return None
+        return defer
+
+    def execute_fields(self, parent_type, source_value, path, fields):
+        for selection_set, label in getattr(fields, "deferred", ()):
+            self.publisher.schedule(
+                self.execute_deferred(
+                    parent_type, source_value, path, selection_set, label
+                )
+            )
+        return super().execute_fields(parent_type, source_value, path, fields)
+
+    def child(self) -> "IncrementalExecutionContext":
+        context = copy(self)
+        context.errors = []
+        return context
+
+    async def execute_deferred(
+        self, parent_type, source_value, path, selection_set, label
+    ):
+        context = self.child()
+        fields = context.collect_fields(parent_type, selection_set, {}, set())
+        try:
+            data = context.execute_fields(parent_type, source_value, path, fields)
+            if isawaitable(data):
+                data = await data
+        except GraphQLError as error:
+            context.errors.append(error)
+            data = None
+        except Exception as error:
+            context.errors.append(GraphQLError(str(error), original_error=error))
+            data = None
+        patch = {"data": data, "path": response_path_as_list(path) if path else []}
+        context.publish(patch, label)
+
+    def publish(self, patch: dict, label: Optional[str]):
+        if label is not None:
+            patch["label"] = label
+        if self.errors:
+            patch["errors"] = [error.formatted for error in self.errors]
+        self.publisher.queue.put_nowait(patch)
+
+    def complete_list_value(self, return_type, field_nodes, info, path, result):
+        # only the outermost list of a field is streamed
+        stream = None
+        if isinstance(path.key, str):
+            stream = get_directive_values(
+                GraphQLStreamDirective, field_nodes[0], self.variable_values
+            )
+        if (
+            not stream
+            or not stream["if"]
+            or self.operation.operation == OperationType.MUTATION
+        ):
+            return super().complete_list_value(
+                return_type, field_nodes, info, path, result
+            )
+        initial_count = max(stream["initialCount"], 0)
+        if hasattr(result, "__aiter__"):
+            return self.complete_async_stream(
+                return_type, field_nodes, info, path, result, initial_count, stream
+            )
+        if not isinstance(result, list):
+            result = list(result)
+        if len(result) > initial_count:
+            self.publisher.schedule(
+                self.stream_items(
+                    return_type.of_type,
+                    field_nodes,
+                    info,
+                    path,
+                    iter(result[initial_count:]),
+                    initial_count,
+                    stream.get("label"),
+                )
+            )
+        return super().complete_list_value(
+            return_type, field_nodes, info, path, result[:initial_count]
+        )
+
+    async def complete_async_stream(
+        self, return_type, field_nodes, info, path, result, initial_count, stream
+    ):
+        iterator = result.__aiter__()
+        initial = []
+        while len(initial) < initial_count:
+            try:
+                initial.append(await iterator.__anext__())
+            except StopAsyncIteration:
+                break
+        else:
+            self.publisher.schedule(
+                self.stream_items(
+                    return_type.of_type,
+                    field_nodes,
+                    info,
+                    path,
+                    iterator,
+                    initial_count,
+                    stream.get("label"),
+                )
+            )
+        completed = super().complete_list_value(
+            return_type, field_nodes, info, path, initial
+        )
+        if isawaitable(completed):
+            completed = await completed
+        return completed
+
+    async def stream_items(
+        self, item_type, field_nodes, info, path, items, start, label
+    ):
+        index = start
+        while True:
+            if hasattr(items, "__anext__"):
+                try:
+                    item = await items.__anext__()
+                except StopAsyncIteration:
+                    break
+            else:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+            context = self.child()
+            item_path = add_path(path, index)
+            try:
+                completed = context.complete_value_catching_error(
+                    item_type, field_nodes, info, item_path, item
+                )
+                if isawaitable(completed):
+                    completed = await completed
+                patch = {"items": [completed]}
+            except GraphQLError as error:
+                # a non-null item failed, the stream has no value at this index
+                context.errors.append(error)
+                patch = {"items": None}
+            patch["path"] = response_path_as_list(item_path)
+            context.publish(patch, label)
+            if patch["items"] is None:
+                break
+            index += 1
+
+
+async def execute_incremental(
+    schema: GraphQLSchema,
+    document,
+    root_value=None,
+    context_value=None,
+    variable_values=None,
+    operation_name=None,
+    field_resolver=None,
+    type_resolver=None,
+    middleware=None,
+):
+    """Like `graphql.execute`, delivering `@defer` and `@stream` incrementally.
+
+    Returns an `IncrementalExecutionResult` when there is deferred work left
+    after the initial result, otherwise an `ExecutionResult`.
+    """
+    assert_valid_execution_arguments(schema, document, variable_values)
+    context = IncrementalExecutionContext.build(
+        schema,
+        document,
+        root_value,
+        context_value,
+        variable_values,
+        operation_name,
+        field_resolver,
+        type_resolver,
+        middleware,
+    )
+    if isinstance(context, list):
+        return ExecutionResult(data=None, errors=context)
+    res = context.build_response(
+        context.execute_operation(context.operation, root_value)
+    )
+    if isawaitable(res):
+        res = await res
+    publisher = context.publisher
+    if not publisher.pending and publisher.queue.empty():
+        return res
+    return IncrementalExecutionResult(res, publisher.payloads())
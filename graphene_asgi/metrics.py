@@ -0,0 +1,116 @@
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts: List[int] = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> List[int]:
+        total = 0
+        cumulative = []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+
+class Metrics:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.counters: Dict[str, float] = defaultdict(int)
+        self.gauges: Dict[str, float] = defaultdict(int)
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = defaultdict(dict)
+        self.buckets = buckets
+
+    def incr(self, name: str, value: float = 1):
+        self.counters[name] += value
+
+    def adjust(self, name: str, delta: float):
+        self.gauges[name] += delta
+
+    def observe(self, name: str, value: float, labels: Labels = ()):
+        histograms = self.histograms[name]
+        histogram = histograms.get(labels)
+        if histogram is None:
+            histogram = histograms[labels] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for kind, values in (("counter", self.counters), ("gauge", self.gauges)):
+            for name, value in sorted(values.items()):
+                lines.append("# TYPE {} {}".format(name, kind))
+                lines.append("{} {}".format(name, value))
+        for name, histograms in sorted(self.histograms.items()):
+            lines.append("# TYPE {} histogram".format(name))
+            for labels, histogram in sorted(histograms.items()):
+                bounds = [_format_float(b) for b in histogram.buckets] + ["+Inf"]
+                counts = histogram.cumulative_counts() + [histogram.count]
+                for bound, count in zip(bounds, counts):
+                    lines.append(
+                        "{}_bucket{} {}".format(
+                            name, _format_labels(labels + (("le", bound),)), count
+                        )
+                    )
+                lines.append(
+                    "{}_sum{} {}".format(name, _format_labels(labels), histogram.sum)
+                )
+                lines.append(
+                    "{}_count{} {}".format(
+                        name, _format_labels(labels), histogram.count
+                    )
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(
+                key,
+                value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+            )
+            for key, value in labels
+        )
+        + "}"
+    )
@@ -0,0 +1,241 @@
+"""Pure-Python MessagePack, used when the msgpack package is not installed.
+
+Encodes like `msgpack.packb(obj, use_bin_type=True)` and decodes like
+`msgpack.unpackb(data, raw=False)`: `str` as str, `bytes` as bin, tuples as
+arrays. Extension types are not supported.
+"""
+from struct import Struct
+from typing import Any, Callable, Dict, Tuple
+
+_uint8 = Struct(">B")
+_uint16 = Struct(">H")
+_uint32 = Struct(">I")
+_uint64 = Struct(">Q")
+_int8 = Struct(">b")
+_int16 = Struct(">h")
+_int32 = Struct(">i")
+_int64 = Struct(">q")
+_float32 = Struct(">f")
+_float64 = Struct(">d")
+
+
+def packb(obj: Any) -> bytes:
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+
+def _pack(obj: Any, out: bytearray):
+    # the most frequent types of GraphQL results are checked first
+    if isinstance(obj, str):
+        _pack_str(obj, out)
+    elif isinstance(obj, dict):
+        _pack_header(len(obj), 0x80, 16, 0xDE, out)
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    elif isinstance(obj, (list, tuple)):
+        _pack_header(len(obj), 0x90, 16, 0xDC, out)
+        for item in obj:
+            _pack(item, out)
+    elif obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        _pack_int(obj, out)
+    elif isinstance(obj, float):
+        out.append(0xCB)
+        out += _float64.pack(obj)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        obj = bytes(obj)
+        size = len(obj)
+        if size < 0x100:
+            out.append(0xC4)
+            out.append(size)
+        elif size < 0x10000:
+            out.append(0xC5)
+            out += _uint16.pack(size)
+        else:
+            out.append(0xC6)
+            out += _uint32.pack(size)
+        out += obj
+    else:
+        raise TypeError("Cannot serialize {!r}".format(obj))
+
+
+def _pack_str(obj: str, out: bytearray):
+    data = obj.encode("utf-8")
+    size = len(data)
+    if size < 32:
+        out.append(0xA0 | size)
+    elif size < 0x100:
+        out.append(0xD9)
+        out.append(size)
+    elif size < 0x10000:
+        out.append(0xDA)
+        out += _uint16.pack(size)
+    else:
+        out.append(0xDB)
+        out += _uint32.pack(size)
+    out += data
+
+
+def _pack_header(size: int, fix: int, fix_limit: int, code16: int, out: bytearray):
+    # maps and arrays: fixed size, 16 bits size (code16) or 32 bits (code16 + 1)
+    if size < fix_limit:
+        out.append(fix | size)
+    elif size < 0x10000:
+        out.append(code16)
+        out += _uint16.pack(size)
+    else:
+        out.append(code16 + 1)
+        out += _uint32.pack(size)
+
+
+def _pack_int(obj: int, out: bytearray):
+    if 0 <= obj < 0x80:
+        out.append(obj)
+    elif -0x20 <= obj < 0:
+        out.append(obj & 0xFF)
+    elif obj > 0:
+        if obj < 0x100:
+            out.append(0xCC)
+            out.append(obj)
+        elif obj < 0x10000:
+            out.append(0xCD)
+            out += _uint16.pack(obj)
+        elif obj < 0x100000000:
+            out.append(0xCE)
+            out += _uint32.pack(obj)
+        elif obj < 0x10000000000000000:
+            out.append(0xCF)
+            out += _uint64.pack(obj)
+        else:
+            raise OverflowError("Integer value out of range")
+    elif obj >= -0x80:
+        out.append(0xD0)
+        out += _int8.pack(obj)
+    elif obj >= -0x8000:
+        out.append(0xD1)
+        out += _int16.pack(obj)
+    elif obj >= -0x80000000:
+        out.append(0xD2)
+        out += _int32.pack(obj)
+    elif obj >= -0x8000000000000000:
+        out.append(0xD3)
+        out += _int64.pack(obj)
+    else:
+        raise OverflowError("Integer value out of range")
+
+
+def unpackb(data: bytes) -> Any:
+    data = bytes(data)
+    obj, offset = _unpack(data, 0)
+    if offset != len(data):
+        raise ValueError("Extra data after the MessagePack object")
+    return obj
+
+
+def _unpack(data: bytes, offset: int) -> Tuple[Any, int]:
+    try:
+        code = data[offset]
+    except IndexError:
+        raise ValueError("Truncated MessagePack data") from None
+    offset += 1
+    if code < 0x80:
+        return code, offset
+    if code >= 0xE0:
+        return code - 0x100, offset
+    if code < 0x90:
+        return _unpack_map(data, offset, code & 0x0F)
+    if code < 0xA0:
+        return _unpack_array(data, offset, code & 0x0F)
+    if code < 0xC0:
+        return _unpack_str(data, offset, code & 0x1F)
+    try:
+        read = _READERS[code]
+    except KeyError:
+        raise ValueError("Unsupported MessagePack type 0x{:02x}".format(code)) from None
+    return read(data, offset)
+
+
+def _unpack_str(data: bytes, offset: int, size: int) -> Tuple[str, int]:
+    end = offset + size
+    if end > len(data):
+        raise ValueError("Truncated MessagePack data")
+    return data[offset:end].decode("utf-8"), end
+
+
+def _unpack_bin(data: bytes, offset: int, size: int) -> Tuple[bytes, int]:
+    end = offset + size
+    if end > len(data):
+        raise ValueError("Truncated MessagePack data")
+    return data[offset:end], end
+
+
+def _unpack_array(data: bytes, offset: int, size: int) -> Tuple[list, int]:
+    items = []
+    for _ in range(size):
+        item, offset = _unpack(data, offset)
+        items.append(item)
+    return items, offset
+
+
+def _unpack_map(data: bytes, offset: int, size: int) -> Tuple[dict, int]:
+    result = {}
+    for _ in range(size):
+        key, offset = _unpack(data, offset)
+        value, offset = _unpack(data, offset)
+        if isinstance(key, list):
+            # lists are not hashable, like msgpack with strict_map_key=False
+            key = tuple(key)
+        result[key] = value
+    return result, offset
+
+
+def _sized(struct: Struct, then: Callable[[bytes, int, int], Tuple[Any, int]]):
+    def read(data: bytes, offset: int) -> Tuple[Any, int]:
+        end = offset + struct.size
+        if end > len(data):
+            raise ValueError("Truncated MessagePack data")
+        return then(data, end, struct.unpack_from(data, offset)[0])
+
+    return read
+
+
+def _value(struct: Struct):
+    return _sized(struct, lambda data, offset, value: (value, offset))
+
+
+def _constant(value: Any):
+    return lambda data, offset: (value, offset)
+
+
+_READERS: Dict[int, Callable[[bytes, int], Tuple[Any, int]]] = {
+    0xC0: _constant(None),
+    0xC2: _constant(False),
+    0xC3: _constant(True),
+    0xC4: _sized(_uint8, _unpack_bin),
+    0xC5: _sized(_uint16, _unpack_bin),
+    0xC6: _sized(_uint32, _unpack_bin),
+    0xCA: _value(_float32),
+    0xCB: _value(_float64),
+    0xCC: _value(_uint8),
+    0xCD: _value(_uint16),
+    0xCE: _value(_uint32),
+    0xCF: _value(_uint64),
+    0xD0: _value(_int8),
+    0xD1: _value(_int16),
+    0xD2: _value(_int32),
+    0xD3: _value(_int64),
+    0xD9: _sized(_uint8, _unpack_str),
+    0xDA: _sized(_uint16, _unpack_str),
+    0xDB: _sized(_uint32, _unpack_str),
+    0xDC: _sized(_uint16, _unpack_array),
+    0xDD: _sized(_uint32, _unpack_array),
+    0xDE: _sized(_uint16, _unpack_map),
+    0xDF: _sized(_uint32, _unpack_map),
+}
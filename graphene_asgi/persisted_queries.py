@@ -0,0 +1,64 @@
+from hashlib import sha256
+from typing import Optional
+
+from graphql.error import GraphQLError
+
+from .cache import LRUCache
+
+
+class PersistedQueryNotFound(GraphQLError):
+    def __init__(self):
+        super().__init__(
+            "PersistedQueryNotFound",
+            extensions={"code": "PERSISTED_QUERY_NOT_FOUND"},
+        )
+
+
+class PersistedQueryNotSupported(GraphQLError):
+    def __init__(self):
+        super().__init__(
+            "PersistedQueryNotSupported",
+            extensions={"code": "PERSISTED_QUERY_NOT_SUPPORTED"},
+        )
+
+
+class PersistedQueryStore:
+    async def get(self, sha256_hash: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, sha256_hash: str, query: str):
+        raise NotImplementedError
+
+
+class InMemoryPersistedQueryStore(PersistedQueryStore):
+    def __init__(self, maxsize: int = 1024):
+        self.cache = LRUCache(maxsize)
+
+    async def get(self, sha256_hash):
+        return self.cache.get(sha256_hash)
+
+    async def set(self, sha256_hash, query):
+        self.cache.set(sha256_hash, query)
+
+
+async def load_persisted_query(
+    store: Optional[PersistedQueryStore], query: Optional[str], extension: dict
+) -> str:
+    """Resolve the query of an automatic persisted query request.
+
+    See https://github.com/apollographql/apollo-link-persisted-queries
+    """
+    if store is None or extension.get("version", 1) != 1:
+        raise PersistedQueryNotSupported()
+    sha256_hash = extension.get("sha256Hash")
+    if not isinstance(sha256_hash, str):
+        raise GraphQLError("persistedQuery.sha256Hash must be a string")
+    if query is None:
+        query = await store.get(sha256_hash)
+        if query is None:
+            raise PersistedQueryNotFound()
+        return query
+    if sha256(query.encode()).hexdigest() != sha256_hash:
+        raise GraphQLError("provided sha does not match query")
+    await store.set(sha256_hash, query)
+    return query
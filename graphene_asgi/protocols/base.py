@@ -1,7 +1,16 @@
-from typing import Any, Awaitable, Callable
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional, Set, Union
+
+from ..context import ConnectionContext
+
+logger = logging.getLogger(__name__)
 
 
 class ProtocolBase:
+    # a server may hold many idle connections, keep their state compact
+    __slots__ = ("receive", "send", "app", "connection", "codec", "tasks", "inflight")
+
     def __init__(
         self,
         scope: dict,
@@ -9,7 +18,51 @@ class ProtocolBase:
         send: Callable[[Any], Awaitable],
         app,
     ):
-        self.scope = scope
         self.receive = receive
         self.send = send
         self.app = app
+        self.connection = ConnectionContext(scope)
+        # websocket handlers use the codec of the negotiated subprotocol
+        self.codec = app.codec
+        # created with the first operation, many connections only subscribe once
+        self.tasks: Optional[Set[asyncio.Future]] = None
+        self.inflight: Optional[asyncio.Semaphore] = None
+
+    @property
+    def scope(self) -> dict:
+        return self.connection.scope
+
+    async def send_frame(self, data: Union[str, bytes]):
+        if isinstance(data, str):
+            await self.send({"type": "websocket.send", "text": data})
+        else:
+            await self.send({"type": "websocket.send", "bytes": data})
+
+    async def spawn(self, coro: Awaitable) -> asyncio.Future:
+        """Run an operation as its own task.
+
+        Waits while the connection already has `max_inflight_operations` tasks
+        running, so a client sending faster than we execute is slowed down.
+        """
+        if self.inflight is None:
+            self.inflight = asyncio.Semaphore(self.app.max_inflight_operations)
+            self.tasks = set()
+        await self.inflight.acquire()
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Future):
+        self.tasks.discard(task)
+        self.inflight.release()
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Operation failed", exc_info=task.exception())
+
+    async def cancel_tasks(self):
+        tasks = list(self.tasks or ())
+        for task in tasks:
+            if task.cancel():
+                self.app.metrics.incr("operations_cancelled")
+        if tasks:
+            await asyncio.wait(tasks)
@@ -1,11 +1,18 @@
 import asyncio
-import json
-from typing import AsyncIterator
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Optional
 
 from graphql.execution.execute import ExecutionResult
 
+from ..codec import SharedPayload
+from ..fanout import ERROR, SharedSubscription
+from ..incremental import IncrementalExecutionResult
+from ..streams import SubscriptionBuffer, buffered
+from ..timing import Timings
 from .base import ProtocolBase
 
+GRAPHQL_WS = "graphql-ws"
+
 GQL_CONNECTION_INIT = "connection_init"
 GQL_CONNECTION_ACK = "connection_ack"
 GQL_CONNECTION_ERROR = "connection_error"
@@ -19,65 +26,135 @@ GQL_STOP = "stop"
 
 
 class GraphqlWSHandler(ProtocolBase):
+    __slots__ = ("subscriptions", "operations", "buffers", "_ready", "_writer")
+
     def __init__(self, scope, receive, send, app):
-        self.subscriptions = {}
+        # tasks, or `SharedSubscription`s which have no task of their own
+        self.subscriptions: Dict[str, Any] = {}
+        self.operations: Dict[str, asyncio.Future] = {}
+        self.buffers: Dict[str, SubscriptionBuffer] = {}
+        # shared subscriptions with events to send, by id, and their sender
+        self._ready: Dict[str, SharedSubscription] = {}
+        self._writer: Optional[asyncio.Future] = None
         super().__init__(scope, receive, send, app)
 
-    async def handle_message(self, text=None):
-        message = json.loads(text)
+    async def handle_message(self, text=None, bytes=None):
+        message = self.codec.loads(text if text is not None else bytes)
         type = message["type"]
         if type == GQL_CONNECTION_INIT:
             await self.on_connect(message.get("payload", {}))
         if type == GQL_START:
-            await self.on_operation(message["id"], message["payload"])
+            id = message["id"]
+            task = await self.spawn(self.on_operation(id, message["payload"]))
+            self.operations[id] = task
+            task.add_done_callback(partial(self._operation_done, id))
         if type == GQL_STOP:
             await self.on_stop(message["id"])
         if type == GQL_CONNECTION_TERMINATE:
             await self.send({"type": "websocket.close"})
 
     async def on_operation(self, id: str, payload: dict):
-        context = await self.app.get_context(self.scope, payload)
-        res = await self.app.execute(
-            source=payload["query"],
+        context = await self.app.get_context(self.connection, payload)
+        kwargs = dict(
+            source=payload.get("query"),
             context_value=context,
-            variable_values=payload["variables"],
+            variable_values=payload.get("variables"),
+            operation_name=payload.get("operationName"),
+            extensions=payload.get("extensions"),
+            incremental=True,
         )
-        if isinstance(res, AsyncIterator):
+        if self.app.subscription_hub is not None:
+            key = await self.app.shared_subscription_key(
+                kwargs["source"],
+                kwargs["variable_values"],
+                kwargs["operation_name"],
+                kwargs["extensions"],
+                context,
+            )
+            if key is not None:
+                self.subscriptions[id] = self.app.subscription_hub.attach(
+                    key,
+                    partial(self.app.execute, **kwargs),
+                    lambda item: SharedPayload(self.app.format_res(item)),
+                    partial(self._shared_ready, id),
+                )
+                return
+        timings = Timings()
+        res = await self.app.execute(timings=timings, connection=self, **kwargs)
+        if isinstance(res, IncrementalExecutionResult):
+            timings.start()
+            await self.send_incremental_result(id, res)
+            timings.stop("send")
+        elif isinstance(res, AsyncIterator):
             self.subscriptions[id] = asyncio.ensure_future(
                 self._consume_stream(res, id)
             )
         elif isinstance(res, ExecutionResult):
-            if res.errors:
-                await self.send_graphql_ws_message(
-                    GQL_ERROR,
-                    {"payload": [{"message": e.message} for e in res.errors], "id": id},
-                )
-            else:
+            await self.send_execution_result(id, res, timings)
+        self.app.record_timings(timings)
+
+    async def send_execution_result(
+        self, id, res: ExecutionResult, timings: Optional[Timings] = None
+    ):
+        if res.errors:
+            await self.send_graphql_ws_message(
+                GQL_ERROR,
+                {"payload": [{"message": e.message} for e in res.errors], "id": id},
+                timings,
+            )
+        else:
+            await self.send_graphql_ws_message(
+                GQL_DATA, {"payload": self.app.format_res(res), "id": id}, timings
+            )
+
+    async def send_incremental_result(self, id, res: IncrementalExecutionResult):
+        initial = {**self.app.format_res(res.initial), "hasNext": True}
+        try:
+            await self.send_graphql_ws_message(GQL_DATA, {"payload": initial, "id": id})
+            async for payload in res.subsequent:
                 await self.send_graphql_ws_message(
-                    GQL_DATA, {"payload": self.app.format_res(res), "id": id}
+                    GQL_DATA, {"payload": payload, "id": id}
                 )
+        finally:
+            await res.subsequent.aclose()
+        await self.send_graphql_ws_message(GQL_COMPLETE, {"id": id})
+
+    def _operation_done(self, id, task):
+        if self.operations.get(id) is task:
+            del self.operations[id]
 
     async def on_connect(self, payload: dict):
         return await self.send_graphql_ws_message(GQL_CONNECTION_ACK)
 
     async def on_stop(self, id):
-        fut = self.subscriptions.pop(id, None)
-        if fut:
-            fut.cancel()
+        for futures in (self.operations, self.subscriptions):
+            fut = futures.pop(id, None)
+            if fut:
+                fut.cancel()
 
-    async def send_graphql_ws_message(self, type, content=None):
+    async def send_graphql_ws_message(
+        self, type, content=None, timings: Optional[Timings] = None
+    ):
         if content is None:
             content = {}
-        return await self.send(
-            {"type": "websocket.send", "text": json.dumps({"type": type, **content})}
-        )
+        if timings is not None:
+            timings.start()
+        data = self.codec.dumps_frame({"type": type, **content})
+        if timings is not None:
+            timings.stop("encode")
+        await self.send_frame(data)
+        if timings is not None:
+            timings.stop("send")
 
     async def run(self):
-        assert "graphql-ws" in self.scope["subprotocols"]
+        subprotocol, self.codec = self.app.negotiate_subprotocol(self.scope)
         message = await self.receive()
         assert message["type"] == "websocket.connect"
+        if subprotocol is None or not subprotocol.startswith(GRAPHQL_WS):
+            # no graphql-ws variant we speak was offered
+            return await self.send({"type": "websocket.close"})
         if await self.app.check_access(self.scope):
-            await self.send({"type": "websocket.accept", "subprotocol": "graphql-ws"})
+            await self.send({"type": "websocket.accept", "subprotocol": subprotocol})
         else:
             await self.send({"type": "websocket.close"})
         while True:
@@ -86,11 +163,30 @@ class GraphqlWSHandler(ProtocolBase):
             if type == "websocket.disconnect":
                 for fut in self.subscriptions.values():
                     fut.cancel()
+                if self._writer is not None:
+                    self._writer.cancel()
+                await self.cancel_tasks()
                 break
             if type == "websocket.receive":
-                await self.handle_message(text=message.get("text"))
+                await self.handle_message(
+                    text=message.get("text"), bytes=message.get("bytes")
+                )
 
     async def _consume_stream(self, stream, id):
+        if self.app.subscription_buffer_size is not None:
+            buffer = SubscriptionBuffer(
+                self.app.subscription_buffer_size,
+                self.app.subscription_buffer_policy,
+                self.app.metrics,
+            )
+            self.buffers[id] = buffer
+            stream = buffered(stream, buffer)
+        try:
+            await self._send_stream(stream, id)
+        finally:
+            self.buffers.pop(id, None)
+
+    async def _send_stream(self, stream, id):
         async for item in stream:
             try:
                 await self.send_graphql_ws_message(
@@ -100,3 +196,41 @@ class GraphqlWSHandler(ProtocolBase):
                 break
         else:
             await self.send_graphql_ws_message(GQL_COMPLETE, {"id": id})
+
+    def _shared_ready(self, id: str, subscription: SharedSubscription):
+        self._ready[id] = subscription
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._send_shared())
+
+    async def _send_shared(self):
+        """Send the events of shared subscriptions, exiting once all are sent.
+
+        One task per connection, only while there are events to send, stands
+        in for a task per subscription.
+        """
+        while self._ready:
+            id = next(iter(self._ready))
+            subscription = self._ready.pop(id)
+            # events are serialized once per codec, only the id differs
+            prefix, suffix = self.codec.envelope(
+                {"type": GQL_DATA, "id": id}, "payload"
+            )
+            buffer = subscription.buffer
+            while self.subscriptions.get(id) is subscription:
+                try:
+                    type, event = buffer.get_nowait()
+                except asyncio.QueueEmpty:
+                    if buffer.closed:
+                        self._shared_done(id, subscription)
+                        await self.send_graphql_ws_message(GQL_COMPLETE, {"id": id})
+                    break
+                if type == ERROR:
+                    self._shared_done(id, subscription)
+                    await self.send_execution_result(id, event)
+                    break
+                await self.send_frame(prefix + event.frame(self.codec) + suffix)
+        self._writer = None
+
+    def _shared_done(self, id: str, subscription: SharedSubscription):
+        del self.subscriptions[id]
+        subscription.cancel()
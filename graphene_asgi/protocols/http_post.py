@@ -1,73 +1,400 @@
-import json
+import asyncio
+from itertools import chain
+from typing import Iterable, Iterator, Optional, Tuple
 
+from graphql.error import GraphQLError
+from graphql.execution.execute import ExecutionResult
+
+from ..compression import iter_chunks
+from ..errors import Overloaded
+from ..incremental import IncrementalExecutionResult
+from ..response_cache import CachedExecutionResult, encoded_etag, etag
+from ..timing import Timings
 from .base import ProtocolBase
 
+MULTIPART_CONTENT_TYPE = b'multipart/mixed; boundary="-"; deferSpec=20220824'
+MULTIPART_PART = b"\r\n---\r\ncontent-type: application/json; charset=utf-8\r\n\r\n"
+MULTIPART_END = b"\r\n-----\r\n"
+
+
+class RequestBodyTooLarge(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
 
 class HTTPPostHandler(ProtocolBase):
+    __slots__ = (
+        "http_body",
+        "http_body_chunks",
+        "http_has_more_body",
+        "http_received_body_length",
+        "timings",
+    )
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.http_body = b""
+        self.http_body = None
+        self.http_body_chunks = []
         self.http_has_more_body = True
         self.http_received_body_length = 0
+        self.timings = Timings()
 
     async def run(self):
-        body = await self.body
-        query_string, variables, operation_name, _params = await self.app.parse_request(
-            self.scope, body
+        timings = self.timings
+        timings.start()
+        try:
+            body = await self.body
+        except RequestBodyTooLarge:
+            res = ExecutionResult(
+                data=None, errors=[GraphQLError("Request body is too large")]
+            )
+            return await self.send_json(self.app.format_res(res), 413)
+        except ClientDisconnected:
+            return
+        data = self.app.codec.loads(body)
+        timings.stop("body")
+        if await self.run_until_disconnect(self.respond(body, data)):
+            timings.stop("send")
+            self.app.record_timings(timings)
+
+    async def respond(self, body, data):
+        if isinstance(data, list):
+            return await self.run_batch(body, data)
+        res = await self.execute_operation(
+            body, data, incremental=self.accepts_multipart(), timings=self.timings
         )
-        context = await self.app.get_context(self.scope, body)
-        res = await self.app.execute(
+        if isinstance(res, IncrementalExecutionResult):
+            self.timings.start()
+            await self.send_incremental(res)
+        else:
+            await self.send_result(res)
+
+    async def run_until_disconnect(self, coro) -> bool:
+        """Run `coro`, cancelling it if the client disconnects first.
+
+        Must be called after the body has been read, when the next message of
+        the server is `http.disconnect`. Returns whether `coro` completed.
+        """
+        task = asyncio.ensure_future(coro)
+        disconnect = asyncio.ensure_future(self.receive())
+        try:
+            await asyncio.wait((task, disconnect), return_when=asyncio.FIRST_COMPLETED)
+            if not task.done() and not self.is_disconnect(disconnect):
+                # not a disconnect, stop watching and just run it
+                await asyncio.wait((task,))
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            disconnect.cancel()
+        await asyncio.wait((disconnect,))
+        if task.done():
+            task.result()
+            return True
+        task.cancel()
+        self.app.metrics.incr("operations_cancelled")
+        await asyncio.wait((task,))
+        return False
+
+    @staticmethod
+    def is_disconnect(receive: asyncio.Future) -> bool:
+        if not receive.done() or receive.cancelled() or receive.exception():
+            return False
+        return receive.result().get("type") == "http.disconnect"
+
+    async def run_batch(self, body, operations: list):
+        if not self.app.max_batch_size:
+            error = GraphQLError("Batched operations are not supported")
+        elif not operations or len(operations) > self.app.max_batch_size:
+            error = GraphQLError(
+                "Batch must contain between 1 and {} operations".format(
+                    self.app.max_batch_size
+                )
+            )
+        else:
+            error = None
+        if error:
+            res = ExecutionResult(data=None, errors=[error])
+            return await self.send_json(self.app.format_res(res), 400)
+        semaphore = asyncio.Semaphore(self.app.batch_concurrency)
+        self.timings.operation_type = "batch"
+        self.timings.start()
+
+        async def run_one(data):
+            if not isinstance(data, dict):
+                error = GraphQLError("Batch items must be objects")
+                return self.app.format_res(ExecutionResult(data=None, errors=[error]))
+            async with semaphore:
+                res = await self.execute_operation(body, data)
+            return self.app.format_res(res)
+
+        results = await asyncio.gather(*(run_one(data) for data in operations))
+        self.timings.stop("execute")
+        await self.send_json(list(results), 200)
+
+    def accepts_multipart(self) -> bool:
+        return "multipart/mixed" in self.connection.headers.get("accept", "")
+
+    async def execute_operation(
+        self, body, data, incremental: bool = False, timings: Optional[Timings] = None
+    ) -> ExecutionResult:
+        query_string, variables, operation_name, params = await self.app.parse_request(
+            self.scope, data
+        )
+        context = await self.app.get_context(self.connection, body)
+        return await self.app.execute(
             source=query_string,
             context_value=context,
             variable_values=variables,
             operation_name=operation_name,
+            extensions=params.get("extensions"),
+            incremental=incremental,
+            timings=timings,
+            connection=self.scope.get("client"),
         )
-        resp = json.dumps(self.app.format_res(res)).encode()
-        headers = [
-            (b"content-type", b"application/json"),
-            (b"content-length", str(len(resp)).encode()),
-        ]
-        if not res.errors:
-            await self.send(
-                {"type": "http.response.start", "status": 200, "headers": headers}
+
+    async def send_result(self, res: ExecutionResult):
+        if res.errors:
+            return await self.send_errors(res)
+        headers = []
+        self.timings.start()
+        if isinstance(res, CachedExecutionResult):
+            if res.body is None:
+                res.body = self.app.codec.dumps(self.app.format_res(res))
+                res.etag = etag(res.body)
+            resp, tag = res.body, res.etag
+            max_age = int(self.app.response_cache.ttl(res))
+            headers.append(
+                (b"cache-control", "private, max-age={}".format(max_age).encode())
             )
         else:
+            resp, chunks = self.encode(self.app.format_res(res))
+            if chunks is not None:
+                self.timings.stop("encode")
+                return await self.send_stream(chunks, 200)
+            # only hashed when the client or the response cache can use it
+            tag = None
+            if (
+                self.app.response_cache is not None
+                or "if-none-match" in self.connection.headers
+            ):
+                tag = etag(resp)
+        self.timings.stop("encode")
+        encoding = self.negotiate_encoding(len(resp))
+        if tag is None:
+            return await self.send_body(resp, 200, headers, encoding)
+        tag = encoded_etag(tag, encoding)
+        headers.append((b"etag", tag))
+        if self.etag_matches(tag):
+            if self.app.compression is not None:
+                headers.append((b"vary", b"accept-encoding"))
+            headers.extend(self.timing_headers())
             await self.send(
-                {"type": "http.response.start", "status": 400, "headers": headers}
+                {"type": "http.response.start", "status": 304, "headers": headers}
             )
+            return await self.send(
+                {"type": "http.response.body", "body": b"", "more_body": False}
+            )
+        await self.send_body(resp, 200, headers, encoding)
+
+    async def send_errors(self, res: ExecutionResult):
+        status = 400
+        headers = []
+        for error in res.errors:
+            # timeouts and admission control rejections have their own status
+            if getattr(error, "status", None) is not None:
+                status = error.status
+                if isinstance(error, Overloaded):
+                    headers.append(
+                        (b"retry-after", str(error.retry_after).encode())
+                    )
+                break
+        await self.send_json(self.app.format_res(res), status, headers)
+
+    async def send_incremental(self, res: IncrementalExecutionResult):
+        await self.send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", MULTIPART_CONTENT_TYPE),
+                    *self.timing_headers(),
+                ],
+            }
+        )
+        dumps = self.app.codec.dumps
+        initial = {**self.app.format_res(res.initial), "hasNext": True}
+        try:
+            await self.send_part(MULTIPART_PART + dumps(initial))
+            async for payload in res.subsequent:
+                await self.send_part(MULTIPART_PART + dumps(payload))
+        finally:
+            await res.subsequent.aclose()
+        await self.send(
+            {"type": "http.response.body", "body": MULTIPART_END, "more_body": False}
+        )
+
+    async def send_part(self, part: bytes):
+        await self.send({"type": "http.response.body", "body": part, "more_body": True})
+
+    def etag_matches(self, tag: bytes) -> bool:
+        if_none_match = self.connection.headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        tag_str = tag.decode()
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip()
+            if candidate.startswith("W/"):
+                candidate = candidate[2:]
+            if candidate == tag_str:
+                return True
+        return False
+
+    def encode(self, data) -> Tuple[Optional[bytes], Optional[Iterator[bytes]]]:
+        """The encoded body, or chunks if it is larger than `stream_threshold`."""
+        threshold = self.app.stream_threshold
+        if threshold is None:
+            return self.app.codec.dumps(data), None
+        chunks = self.app.codec.iter_dumps(data, self.app.stream_chunk_size)
+        head = []
+        size = 0
+        for chunk in chunks:
+            head.append(chunk)
+            size += len(chunk)
+            if size > threshold:
+                return None, chain(head, chunks)
+        return b"".join(head), None
+
+    def timing_headers(self):
+        if not self.app.server_timing or not self.timings.phases:
+            return []
+        return [(b"server-timing", self.timings.server_timing().encode())]
+
+    async def send_json(self, data, status: int, headers=()):
+        self.timings.start()
+        resp, chunks = self.encode(data)
+        self.timings.stop("encode")
+        if chunks is not None:
+            return await self.send_stream(chunks, status, headers)
+        await self.send_body(resp, status, headers, self.negotiate_encoding(len(resp)))
+
+    async def send_stream(self, chunks: Iterator[bytes], status: int, headers=()):
+        # without content-length the server uses chunked transfer encoding
+        headers = [
+            (b"content-type", b"application/json"),
+            *headers,
+            *self.timing_headers(),
+        ]
+        encoding = self.negotiate_encoding()
+        if encoding is not None:
+            headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"vary", b"accept-encoding"))
+            chunks = self.app.compression.compress(encoding, chunks)
+        await self.send_chunks(chunks, status, headers)
+
+    def negotiate_encoding(self, size: Optional[int] = None) -> Optional[str]:
+        """The content-coding of a response body of `size` bytes, if any."""
+        compression = self.app.compression
+        if compression is None or (size is not None and size < compression.min_size):
+            return None
+        return compression.negotiate(self.connection.headers.get("accept-encoding"))
+
+    async def send_body(
+        self, resp: bytes, status: int, headers=(), encoding: Optional[str] = None
+    ):
+        headers = [
+            (b"content-type", b"application/json"),
+            *headers,
+            *self.timing_headers(),
+        ]
+        compression = self.app.compression
+        if encoding is not None:
+            headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"vary", b"accept-encoding"))
+            chunks = compression.compress(
+                encoding, iter_chunks(resp, compression.chunk_size)
+            )
+            if len(resp) > compression.chunk_size:
+                return await self.send_chunks(chunks, status, headers)
+            resp = b"".join(chunks)
+        headers.append((b"content-length", str(len(resp)).encode()))
+        await self.send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
         await self.send(
             {"type": "http.response.body", "body": resp, "more_body": False}
         )
 
+    async def send_chunks(self, chunks: Iterable[bytes], status: int, headers):
+        await self.send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        for chunk in chunks:
+            if chunk:
+                await self.send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+        await self.send({"type": "http.response.body", "body": b"", "more_body": False})
+
     @property
     async def body(self):
-        return b"".join([chunks async for chunks in self._body_iter()])
+        if self.http_body is None:
+            async for _chunk in self._body_iter():
+                pass
+            # a single join of all chunks, which is a no-op for one-chunk bodies
+            self.http_body = b"".join(self.http_body_chunks)
+            self.http_body_chunks = []
+        return self.http_body
 
     async def _body_iter(self, save=True):
         if self.http_received_body_length > 0 and self.http_has_more_body:
             raise RuntimeError("body iter is already started and is not finished")
-        if self.http_received_body_length > 0 and not self.http_has_more_body:
-            yield self.http_body
-        content_lenth = None
-        transfer_encoding = None
-        for k, v in self.scope["headers"]:
-            if k.decode("ascii").lower() == "content-length":
-                content_lenth = int(v)
-            elif k.decode("ascii").lower() == "transfer-encoding":
-                transfer_encoding = v.decode("ascii")
-        req_body_length = content_lenth if transfer_encoding != "chunked" else None
+        if not self.http_has_more_body:
+            if self.http_body is not None:
+                yield self.http_body
+            else:
+                for chunk in self.http_body_chunks:
+                    yield chunk
+            return
+        headers = self.connection.headers
+        req_body_length = None
+        chunked = headers.get("transfer-encoding") == "chunked"
+        if "content-length" in headers and not chunked:
+            req_body_length = int(headers["content-length"])
+        max_body_size = self.app.max_body_size
+        if (
+            max_body_size is not None
+            and req_body_length is not None
+            and req_body_length > max_body_size
+        ):
+            raise RequestBodyTooLarge()
         while self.http_has_more_body:
-            if req_body_length and self.http_received_body_length > req_body_length:
-                raise RuntimeError("body is longer than declared")
             message = await self.receive()
             message_type = message.get("type")
+            if message_type == "http.disconnect":
+                raise ClientDisconnected()
             if message_type != "http.request":
                 continue
             chunk = message.get("body", b"")
             if not isinstance(chunk, bytes):
                 raise RuntimeError("Chunk is not bytes")
-            if save:
-                self.http_body += chunk
             self.http_has_more_body = message.get("more_body", False) or False
             self.http_received_body_length += len(chunk)
+            if (
+                req_body_length is not None
+                and self.http_received_body_length > req_body_length
+            ):
+                raise RuntimeError("body is longer than declared")
+            if (
+                max_body_size is not None
+                and self.http_received_body_length > max_body_size
+            ):
+                raise RequestBodyTooLarge()
+            if save:
+                self.http_body_chunks.append(chunk)
             yield chunk
@@ -1,41 +1,61 @@
-import json
-
+from ..timing import Timings
 from .base import ProtocolBase
 
 
 class WebsocketHandler(ProtocolBase):
+    __slots__ = ()
+
     async def handle_message(self, bytes=None, text=None):
         if bytes is None and text is None:
             return
         if bytes is not None and text is not None:
             return
         message = text if text else bytes
+        if bytes is not None and self.codec.binary:
+            message = self.codec.loads(bytes)
         query_string, variables, operation_name, params = await self.app.parse_request(
             self.scope, message
         )
-        context = await self.app.get_context(self.scope, message)
+        context = await self.app.get_context(self.connection, message)
+        timings = Timings()
         res = await self.app.execute(
             source=query_string,
             context_value=context,
             variable_values=variables,
             operation_name=operation_name,
+            extensions=params.get("extensions"),
+            timings=timings,
+            connection=self,
+        )
+        timings.start()
+        reply = self.codec.dumps_frame(
+            {**self.app.format_res(res), "id": params.pop("id", None)}
         )
-        reply = json.dumps({**self.app.format_res(res), "id": params.pop("id", None)})
-        await self.send({"type": "websocket.send", "text": reply})
+        timings.stop("encode")
+        await self.send_frame(reply)
+        timings.stop("send")
+        self.app.record_timings(timings)
 
     async def run(self):
+        subprotocol, self.codec = self.app.negotiate_subprotocol(self.scope)
         message = await self.receive()
         assert message["type"] == "websocket.connect"
         if await self.app.check_access(self.scope):
-            await self.send({"type": "websocket.accept"})
+            accept = {"type": "websocket.accept"}
+            if subprotocol is not None:
+                accept["subprotocol"] = subprotocol
+            await self.send(accept)
         else:
             await self.send({"type": "websocket.close"})
         while True:
             message = await self.receive()
             type = message["type"]
             if type == "websocket.disconnect":
+                await self.cancel_tasks()
                 break
             if type == "websocket.receive":
-                await self.handle_message(
-                    bytes=message.get("bytes"), text=message.get("text")
+                await self.spawn(
+                    self.handle_message(
+                        bytes=message.get("bytes"), text=message.get("text")
+                    )
                 )
@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from .codec import JSONCodec, default_codec
+from .streams import DROP_OLDEST, SubscriptionBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class PubSub:
+    """Publish/subscribe interface for subscription resolvers.
+
+    Subscribe functions iterate `subscribe(channel)` to receive every message
+    published on `channel`::
+
+        async def subscribe_price(root, info, symbol):
+            async for price in info.context["pubsub"].subscribe(symbol):
+                yield price
+    """
+
+    async def publish(self, channel: str, message: Any):
+        raise NotImplementedError
+
+    def subscribe(self, channel: str) -> AsyncIterator[Any]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class InMemoryPubSub(PubSub):
+    """Delivers messages to subscribers of the current process."""
+
+    def __init__(self, buffer_size: int = 1000, buffer_policy: str = DROP_OLDEST):
+        self.buffer_size = buffer_size
+        self.buffer_policy = buffer_policy
+        self.subscribers: Dict[str, Set[SubscriptionBuffer]] = defaultdict(set)
+
+    async def publish(self, channel, message):
+        await self.dispatch(channel, message)
+
+    async def dispatch(self, channel: str, message: Any):
+        for buffer in list(self.subscribers.get(channel, ())):
+            await buffer.put(message)
+
+    async def subscribe(self, channel):
+        buffer = SubscriptionBuffer(self.buffer_size, self.buffer_policy)
+        if not self.subscribers[channel]:
+            await self.listen(channel)
+        self.subscribers[channel].add(buffer)
+        try:
+            async for message in buffer:
+                yield message
+        finally:
+            self.subscribers[channel].discard(buffer)
+            if not self.subscribers[channel]:
+                del self.subscribers[channel]
+                await self.unlisten(channel)
+
+    async def listen(self, channel: str):
+        pass
+
+    async def unlisten(self, channel: str):
+        pass
+
+
+class BrokerPubSub(InMemoryPubSub):
+    """Base class for backends relaying messages between processes.
+
+    Messages published during one event loop iteration are encoded together
+    and handed to `send_batch` as a single payload. Subclasses pass payloads
+    received from other processes to `receive_batch`, which decodes each of
+    them once and dispatches the messages to local subscribers.
+
+    A Redis or NATS backend implements `connect` (open the connection and
+    start reading), `send_batch` (publish the payload on a shared subject) and
+    optionally `listen`/`unlisten` to only receive channels with subscribers.
+    """
+
+    def __init__(self, codec: Optional[JSONCodec] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.codec = codec or default_codec()
+        self._pending: List[Tuple[str, Any]] = []
+        self._flush_task: Optional[asyncio.Future] = None
+        self._connected: Optional[asyncio.Future] = None
+
+    async def connect(self):
+        raise NotImplementedError
+
+    async def send_batch(self, payload: bytes):
+        raise NotImplementedError
+
+    async def ensure_connected(self):
+        if self._connected is None:
+            self._connected = asyncio.ensure_future(self.connect())
+        connected = self._connected
+        try:
+            await asyncio.shield(connected)
+        except Exception:
+            # a failed connection is retried by the next call
+            if connected.done() and self._connected is connected:
+                self._connected = None
+            raise
+
+    async def publish(self, channel, message):
+        await self.ensure_connected()
+        self._pending.append((channel, message))
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush())
+        await self.dispatch(channel, message)
+
+    async def subscribe(self, channel):
+        await self.ensure_connected()
+        async for message in super().subscribe(channel):
+            yield message
+
+    async def receive_batch(self, payload: bytes):
+        for channel, message in self.codec.loads(payload):
+            await self.dispatch(channel, message)
+
+    async def _flush(self):
+        try:
+            batch, self._pending = self._pending, []
+            await self.send_batch(self.codec.dumps(batch))
+        finally:
+            self._flush_task = None
+            if self._pending:
+                self._flush_task = asyncio.ensure_future(self._flush())
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(4)
+    return await reader.readexactly(int.from_bytes(header, "big"))
+
+
+def write_frame(writer: asyncio.StreamWriter, payload: bytes):
+    writer.write(len(payload).to_bytes(4, "big") + payload)
+
+
+class SocketPubSub(BrokerPubSub):
+    """Relays messages between processes through a `PubSubServer`.
+
+    Connects to a TCP `host`/`port` or to a unix socket `path`.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+        path: Optional[str] = None,
+        **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.path = path
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Future] = None
+
+    async def connect(self):
+        if self.path is not None:
+            reader, self.writer = await asyncio.open_unix_connection(self.path)
+        else:
+            reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self._reader_task = asyncio.ensure_future(self._read(reader))
+
+    async def send_batch(self, payload):
+        write_frame(self.writer, payload)
+        await self.writer.drain()
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self.writer is not None:
+            self.writer.close()
+
+    async def _read(self, reader):
+        try:
+            while True:
+                await self.receive_batch(await read_frame(reader))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.warning("Disconnected from pubsub server")
+            self._connected = None
+
+
+class PubSubServer:
+    """Forwards every batch received from a client to all other clients.
+
+    Batches for a client that has more than `max_buffer_size` bytes waiting to
+    be sent are dropped and counted in `dropped`, so a slow client does not
+    make the server buffer without limit.
+    """
+
+    def __init__(self, max_buffer_size: int = 16 * 1024 * 1024):
+        self.writers: Set[asyncio.StreamWriter] = set()
+        self.server = None
+        self.batches = 0
+        self.dropped = 0
+        self.max_buffer_size = max_buffer_size
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 0, path: Optional[str] = None
+    ):
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._handle, path)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        for writer in self.writers:
+            writer.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.writers.add(writer)
+        try:
+            while True:
+                payload = await read_frame(reader)
+                self.batches += 1
+                for other in self.writers:
+                    if other is not writer:
+                        self._forward(other, payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    def _forward(self, writer: asyncio.StreamWriter, payload: bytes):
+        if writer.transport.get_write_buffer_size() > self.max_buffer_size:
+            self.dropped += 1
+            return
+        write_frame(writer, payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="graphene-asgi pubsub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", help="listen on a unix socket instead of TCP")
+    parser.add_argument(
+        "--max-buffer-size",
+        type=int,
+        default=16 * 1024 * 1024,
+        help="bytes buffered per client before its batches are dropped",
+    )
+    args = parser.parse_args()
+    loop = asyncio.get_event_loop()
+    server = PubSubServer(args.max_buffer_size)
+    loop.run_until_complete(server.start(args.host, args.port, args.path))
+    loop.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import time
+from hashlib import blake2b
+from typing import Any, Callable, Dict, Optional
+
+from graphql.execution.execute import ExecutionResult
+from graphql.language import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+)
+from graphql.type import GraphQLSchema, get_named_type
+from graphql.utilities import get_operation_root_type
+
+from .cache import LRUCache
+
+CACHE_HINT_ATTRIBUTE = "_graphene_asgi_max_age"
+
+
+def cache_hint(max_age: float):
+    """Declare for how many seconds the value of a field may be cached::
+
+        @cache_hint(60)
+        def resolve_exchange_rates(root, info):
+            ...
+    """
+
+    def decorator(resolver):
+        setattr(resolver, CACHE_HINT_ATTRIBUTE, max_age)
+        return resolver
+
+    return decorator
+
+
+def etag(body: bytes) -> bytes:
+    return b'"' + blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def encoded_etag(tag: bytes, encoding: Optional[str]) -> bytes:
+    """The strong validator `tag` of a body sent with content-coding `encoding`."""
+    if encoding is None:
+        return tag
+    return tag[:-1] + b"-" + encoding.encode() + b'"'
+
+
+class CachedExecutionResult(ExecutionResult):
+    """An ExecutionResult stored in the response cache.
+
+    `body` and `etag` keep the encoded HTTP response once it has been built,
+    so cache hits are neither executed nor serialized again.
+    """
+
+    def __new__(cls, data, errors, expires: float):
+        result = super().__new__(cls, data, errors)
+        result.expires = expires
+        result.body = None
+        result.etag = None
+        return result
+
+
+class ResponseCache:
+    """Caches results of queries whose fields all have a positive max age.
+
+    The max age of a query is the minimum over its selected fields. A field
+    without a hint in `field_max_ages` (keyed `"Type.field"`) or from the
+    `cache_hint` resolver decorator inherits the max age of its parent field;
+    root fields default to `default_max_age`.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        default_max_age: float = 0,
+        field_max_ages: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.entries = LRUCache(maxsize)
+        self.max_ages = LRUCache(maxsize)
+        self.default_max_age = default_max_age
+        self.field_max_ages = dict(field_max_ages or {})
+        self.clock = clock
+
+    def get(self, key) -> Optional[CachedExecutionResult]:
+        result = self.entries.get(key)
+        if result is not None and result.expires <= self.clock():
+            self.entries.pop(key)
+            return None
+        return result
+
+    def set(self, key, result: ExecutionResult, max_age: float):
+        cached = CachedExecutionResult(
+            result.data, result.errors, self.clock() + max_age
+        )
+        self.entries.set(key, cached)
+        return cached
+
+    def ttl(self, result: CachedExecutionResult) -> float:
+        return max(result.expires - self.clock(), 0)
+
+    def get_max_age(
+        self,
+        schema: GraphQLSchema,
+        document: DocumentNode,
+        operation: OperationDefinitionNode,
+        key: Any = None,
+    ) -> float:
+        max_age = self.max_ages.get(key) if key is not None else None
+        if max_age is None:
+            fragments = {
+                d.name.value: d
+                for d in document.definitions
+                if isinstance(d, FragmentDefinitionNode)
+            }
+            max_age = self._min_max_age(
+                operation.selection_set,
+                get_operation_root_type(schema, operation),
+                self.default_max_age,
+                fragments,
+                schema,
+            )
+            if key is not None:
+                self.max_ages.set(key, max_age)
+        return max_age
+
+    def _min_max_age(
+        self,
+        selection_set: SelectionSetNode,
+        parent_type,
+        inherited: float,
+        fragments,
+        schema,
+    ) -> float:
+        result = None
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                name = selection.name.value
+                field = getattr(parent_type, "fields", {}).get(name)
+                if field is None:
+                    continue
+                max_age = self.field_max_ages.get(
+                    "{}.{}".format(parent_type.name, name)
+                )
+                if max_age is None:
+                    max_age = getattr(field.resolve, CACHE_HINT_ATTRIBUTE, inherited)
+                if selection.selection_set:
+                    max_age = min(
+                        max_age,
+                        self._min_max_age(
+                            selection.selection_set,
+                            get_named_type(field.type),
+                            max_age,
+                            fragments,
+                            schema,
+                        ),
+                    )
+            else:
+                if isinstance(selection, FragmentSpreadNode):
+                    fragment = fragments[selection.name.value]
+                else:
+                    fragment = selection
+                type_condition = fragment.type_condition
+                max_age = self._min_max_age(
+                    fragment.selection_set,
+                    schema.get_type(type_condition.name.value)
+                    if type_condition
+                    else parent_type,
+                    inherited,
+                    fragments,
+                    schema,
+                )
+            result = max_age if result is None else min(result, max_age)
+        return inherited if result is None else result
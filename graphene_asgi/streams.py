@@ -0,0 +1,150 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from .metrics import Metrics
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+LATEST = "latest"
+
+POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST, LATEST)
+
+
+class SubscriptionBuffer:
+    """Bounded buffer between a subscription source and a slow consumer.
+
+    What happens when the buffer is full depends on the policy:
+
+    - `block` waits for the consumer, applying backpressure to the source
+    - `drop_oldest` discards the oldest buffered event
+    - `drop_newest` discards the incoming event
+    - `latest` keeps only the most recent event, coalescing rapid updates
+    """
+
+    __slots__ = (
+        "maxsize",
+        "policy",
+        "metrics",
+        "dropped",
+        "closed",
+        "_items",
+        "_readable",
+        "_writable",
+    )
+
+    def __init__(
+        self, maxsize: int = 1, policy: str = BLOCK, metrics: Optional[Metrics] = None
+    ):
+        if policy not in POLICIES:
+            raise ValueError("Unknown buffer policy {!r}".format(policy))
+        self.maxsize = 1 if policy == LATEST else max(maxsize, 1)
+        self.policy = policy
+        self.metrics = metrics
+        self.dropped = 0
+        self.closed = False
+        # created when needed and released when drained, idle buffers are small
+        self._items: Optional[deque] = None
+        # created when first waited on, buffers read with get_nowait need none
+        self._readable: Optional[asyncio.Event] = None
+        self._writable: Optional[asyncio.Event] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._items) if self._items else 0
+
+    async def put(self, item):
+        if self.policy == BLOCK:
+            while self.depth >= self.maxsize:
+                if self._writable is None:
+                    self._writable = asyncio.Event()
+                self._writable.clear()
+                await self._writable.wait()
+        self.put_nowait(item)
+
+    def put_nowait(self, item):
+        """Add an item without waiting, raises `asyncio.QueueFull` with `block`."""
+        if self._items is None:
+            self._items = deque()
+        elif len(self._items) >= self.maxsize:
+            if self.policy == BLOCK:
+                raise asyncio.QueueFull
+            elif self.policy == DROP_NEWEST:
+                self._drop()
+                return
+            else:
+                self._items.popleft()
+                self._adjust_depth(-1)
+                self._drop()
+        self._items.append(item)
+        self._adjust_depth(1)
+        if self._readable is not None:
+            self._readable.set()
+
+    def get_nowait(self):
+        """The oldest item, raises `asyncio.QueueEmpty` if there is none."""
+        if not self._items:
+            raise asyncio.QueueEmpty
+        item = self._items.popleft()
+        if not self._items:
+            self._items = None
+        self._adjust_depth(-1)
+        if self._writable is not None:
+            self._writable.set()
+        return item
+
+    def close(self):
+        self.closed = True
+        if self._readable is not None:
+            self._readable.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._items:
+            if self.closed:
+                raise StopAsyncIteration
+            if self._readable is None:
+                self._readable = asyncio.Event()
+            self._readable.clear()
+            await self._readable.wait()
+        return self.get_nowait()
+
+    def discard(self):
+        """Forget buffered events, e.g. when the subscription is stopped."""
+        self._adjust_depth(-self.depth)
+        self._items = None
+
+    def _drop(self):
+        self.dropped += 1
+        if self.metrics is not None:
+            self.metrics.incr("subscription_events_dropped")
+
+    def _adjust_depth(self, delta):
+        if self.metrics is not None:
+            self.metrics.adjust("subscription_events_buffered", delta)
+
+
+async def buffered(
+    stream: AsyncIterator, buffer: SubscriptionBuffer
+) -> AsyncIterator:
+    """Read `stream` into `buffer` in a separate task and iterate the buffer."""
+
+    async def pump():
+        try:
+            async for item in stream:
+                await buffer.put(item)
+        finally:
+            buffer.close()
+
+    task = asyncio.ensure_future(pump())
+    try:
+        async for item in buffer:
+            yield item
+        # surface errors raised by the source
+        await task
+    finally:
+        task.cancel()
+        buffer.discard()
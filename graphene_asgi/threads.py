@@ -0,0 +1,106 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from inspect import isasyncgenfunction, isawaitable, iscoroutinefunction
+from typing import Dict, Optional, Sequence, Tuple
+
+from graphene.types import resolver as graphene_resolver
+
+from .metrics import Metrics
+
+DEFAULT_RESOLVERS = (
+    graphene_resolver.attr_resolver,
+    graphene_resolver.dict_resolver,
+    graphene_resolver.dict_or_attr_resolver,
+)
+
+
+def is_default_resolver(resolve) -> bool:
+    if resolve is None:
+        return True
+    if isinstance(resolve, partial):
+        resolve = resolve.func
+    return resolve in DEFAULT_RESOLVERS or resolve is (
+        graphene_resolver.get_default_resolver()
+    )
+
+
+class ThreadPoolMiddleware:
+    """Execution middleware running synchronous resolvers in a thread pool.
+
+    At most `max_workers` resolvers run at once; further calls wait in the
+    pool's queue, whose depth is the `resolver_thread_queue_depth` gauge.
+    Coroutine resolvers, introspection and graphene's default attribute and
+    dict resolvers always run on the event loop.
+
+    `include` and `exclude` take type names or `"Type.field"` names. When
+    `include` is given, only the synchronous resolvers it names are offloaded.
+    Default resolvers are only offloaded when their `"Type.field"` is
+    included, naming the type is not enough. `exclude` takes precedence.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.max_workers = max_workers
+        self.include = frozenset(include) if include is not None else None
+        self.exclude = frozenset(exclude or ())
+        self.metrics = metrics
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="graphene-asgi-resolver"
+        )
+        self._offloaded: Dict[Tuple[str, str], bool] = {}
+
+    def resolve(self, next_, root, info, **args):
+        if not self.offloads(info):
+            return next_(root, info, **args)
+        return self.run(partial(next_, root, info, **args))
+
+    def offloads(self, info) -> bool:
+        key = (info.parent_type.name, info.field_name)
+        offloaded = self._offloaded.get(key)
+        if offloaded is None:
+            field = info.parent_type.fields.get(info.field_name)
+            offloaded = self._offloads(key[0], key[1], getattr(field, "resolve", None))
+            self._offloaded[key] = offloaded
+        return offloaded
+
+    def _offloads(self, type_name: str, field_name: str, resolve) -> bool:
+        if type_name.startswith("__") or field_name.startswith("__"):
+            return False
+        if iscoroutinefunction(resolve) or isasyncgenfunction(resolve):
+            return False
+        name = "{}.{}".format(type_name, field_name)
+        if name in self.exclude or type_name in self.exclude:
+            return False
+        if is_default_resolver(resolve):
+            return self.include is not None and name in self.include
+        if self.include is not None:
+            return name in self.include or type_name in self.include
+        return True
+
+    async def run(self, call):
+        loop = asyncio.get_event_loop()
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.incr("resolver_thread_calls")
+            metrics.adjust("resolver_thread_queue_depth", 1)
+
+        def started():
+            if metrics is not None:
+                loop.call_soon_threadsafe(
+                    metrics.adjust, "resolver_thread_queue_depth", -1
+                )
+            return call()
+
+        result = await loop.run_in_executor(self.executor, started)
+        if isawaitable(result):
+            result = await result
+        return result
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait)
@@ -0,0 +1,38 @@
+from time import perf_counter
+from typing import Dict, Optional
+
+PHASES = ("body", "parse", "validate", "queue", "execute", "encode", "send")
+
+
+class Timings:
+    """Seconds spent in each phase of one operation.
+
+    Phases are `body` (reading the HTTP request body), `parse`, `validate`
+    (both skipped on document cache hits, except for the cost analysis),
+    `queue` (waiting for admission), `execute`, `encode` and `send`.
+    """
+
+    __slots__ = ("phases", "operation_name", "operation_type", "_start")
+
+    clock = staticmethod(perf_counter)
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.operation_name: Optional[str] = None
+        self.operation_type: Optional[str] = None
+        self._start = 0.0
+
+    def start(self):
+        self._start = self.clock()
+
+    def stop(self, phase: str):
+        """Add the time since `start` to `phase` and restart the clock."""
+        now = self.clock()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._start
+        self._start = now
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            "{};dur={:.3f}".format(phase, seconds * 1000)
+            for phase, seconds in self.phases.items()
+        )
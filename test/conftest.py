@@ -1,4 +1,5 @@
 import asyncio
+import json
 
 import graphene
 import pytest
@@ -13,6 +14,7 @@ class Query(graphene.ObjectType):
         graphene.Int, required=True, num=graphene.Int(required=True)
     )
     get_context = graphene.JSONString()
+    a_slow_num = graphene.Int(seconds=graphene.Float(required=True))
 
     def resolve_a_num(self, info):
         return 1
@@ -23,6 +25,10 @@ class Query(graphene.ObjectType):
     def resolve_get_context(self, info):
         return info.context
 
+    async def resolve_a_slow_num(self, info, seconds):
+        await asyncio.sleep(seconds)
+        return 2
+
 
 class Subscription(graphene.ObjectType):
     count = graphene.Float(up_to=graphene.Float())
@@ -49,3 +55,52 @@ def default_schema():
 @pytest.fixture
 def default_application(default_schema):
     return Application(default_schema)
+
+
+async def asgi_post(
+    application,
+    query=None,
+    chunks=None,
+    headers=(),
+    disconnect="response",
+    received=None,
+):
+    """POST `query` (or the raw body `chunks`) to `application` over fake ASGI.
+
+    Once the body is read, `receive` disconnects as soon as the complete
+    response is sent (`disconnect="response"`), `disconnect` seconds later
+    (a number), or never (`disconnect="never"`). The messages read by the
+    application are appended to `received` and the sent messages returned.
+    """
+    if chunks is None:
+        chunks = [json.dumps({"query": query}).encode()]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": list(headers)}
+    responded = asyncio.Event()
+    sent = []
+
+    async def receive():
+        if messages:
+            message = messages.pop(0)
+        else:
+            if disconnect == "response":
+                await responded.wait()
+            elif disconnect == "never":
+                await asyncio.Event().wait()
+            else:
+                await asyncio.sleep(disconnect)
+            message = {"type": "http.disconnect"}
+        if received is not None:
+            received.append(message)
+        return message
+
+    async def send(message):
+        sent.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            responded.set()
+
+    await application(scope, receive, send)
+    return sent
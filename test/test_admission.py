@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+
+import pytest
+from starlette.testclient import WebSocketTestSession
+
+from graphene_asgi import Application
+from graphene_asgi.admission import AdmissionController
+from graphene_asgi.cost import QueryCostAnalyzer
+from graphene_asgi.errors import Overloaded, TooManyOperations
+
+from .conftest import asgi_post
+
+
+@pytest.mark.asyncio
+async def test_queue_and_rejection():
+    controller = AdmissionController(max_concurrent=1, max_queue=1)
+    await controller.acquire()
+    waiting = asyncio.ensure_future(controller.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded):
+        await controller.acquire()
+    assert not waiting.done()
+    controller.release()
+    await waiting
+    assert controller.active == 1
+    assert controller.queued == 0
+    controller.release()
+    assert controller.active == 0
+
+
+@pytest.mark.asyncio
+async def test_higher_priority_replaces_queued_operation():
+    controller = AdmissionController(max_concurrent=1, max_queue=1)
+    await controller.acquire()
+    low = asyncio.ensure_future(controller.acquire(priority=1))
+    await asyncio.sleep(0)
+    high = asyncio.ensure_future(controller.acquire(priority=0))
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded):
+        await low
+    controller.release()
+    await high
+    assert controller.active == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout():
+    controller = AdmissionController(max_concurrent=1, queue_timeout=0.01)
+    await controller.acquire()
+    with pytest.raises(Overloaded):
+        await controller.acquire()
+    assert controller.queued == 0
+    controller.release()
+    assert controller.active == 0
+
+
+@pytest.mark.asyncio
+async def test_per_connection_limit():
+    controller = AdmissionController(max_per_connection=1)
+    await controller.acquire(connection="a")
+    with pytest.raises(TooManyOperations):
+        await controller.acquire(connection="a")
+    await controller.acquire(connection="b")
+    controller.release("a")
+    await controller.acquire(connection="a")
+    assert controller.connections == {"a": 1, "b": 1}
+
+
+@pytest.mark.asyncio
+async def test_queued_operations_count_per_connection():
+    controller = AdmissionController(
+        max_concurrent=1, max_per_connection=2, queue_timeout=0.01
+    )
+    await controller.acquire(connection="b")
+    first = asyncio.ensure_future(controller.acquire(connection="a"))
+    second = asyncio.ensure_future(controller.acquire(connection="a"))
+    await asyncio.sleep(0)
+    with pytest.raises(TooManyOperations):
+        await controller.acquire(connection="a")
+    # timed out operations give their reservation back
+    for waiting in (first, second):
+        with pytest.raises(Overloaded):
+            await waiting
+    assert controller.connections == {"b": 1}
+    cancelled = asyncio.ensure_future(controller.acquire(connection="a"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    assert controller.connections == {"b": 1}
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_sheds_low_priority():
+    controller = AdmissionController(max_loop_lag=0.01, lag_interval=0.01)
+    await controller.acquire()
+    controller.release()
+    await asyncio.sleep(0)
+    time.sleep(0.05)
+    await asyncio.sleep(0.001)
+    with pytest.raises(Overloaded):
+        await controller.acquire(priority=1)
+    await controller.acquire(priority=0)
+    controller.close()
+
+
+@pytest.mark.asyncio
+async def test_http_overloaded(default_schema):
+    application = Application(
+        default_schema, admission=AdmissionController(max_concurrent=1, max_queue=0)
+    )
+    slow, fast = await asyncio.gather(
+        asgi_post(application, "{ aSlowNum(seconds: 0.05) }"),
+        asgi_post(application, "{ aNum }"),
+    )
+    assert slow[0]["status"] == 200
+    assert fast[0]["status"] == 503
+    assert dict(fast[0]["headers"])[b"retry-after"] == b"1"
+    assert json.loads(fast[1]["body"])["errors"][0]["extensions"] == {
+        "code": "OVERLOADED",
+        "retryAfter": 1,
+    }
+    assert application.metrics.counters["admission_rejected_queue"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cost_checked_before_admission(default_schema):
+    admission = AdmissionController(max_concurrent=1, max_queue=0)
+    application = Application(
+        default_schema,
+        admission=admission,
+        cost_analyzer=QueryCostAnalyzer(max_depth=0),
+    )
+    await admission.acquire()
+    res = await application.execute(source="{ aNum }")
+    assert res.errors[0].extensions == {"code": "QUERY_TOO_COMPLEX"}
+    assert "admission_rejected_queue" not in application.metrics.counters
+
+
+def test_graphql_ws_error(default_schema):
+    application = Application(
+        default_schema, admission=AdmissionController(max_per_connection=1)
+    )
+    with WebSocketTestSession(
+        application,
+        {"type": "websocket", "headers": [], "subprotocols": ["graphql-ws"]},
+    ) as session:
+        session.send_text(json.dumps({"type": "connection_init", "payload": {}}))
+        assert session.receive_json()["type"] == "connection_ack"
+        for id, query in (("1", "{ aSlowNum(seconds: 0.1) }"), ("2", "{ aNum }")):
+            session.send_text(
+                json.dumps({"id": id, "type": "start", "payload": {"query": query}})
+            )
+        assert session.receive_json() == {
+            "type": "error",
+            "id": "2",
+            "payload": [
+                {"message": "Too many concurrent operations on this connection"}
+            ],
+        }
+        assert session.receive_json()["id"] == "1"
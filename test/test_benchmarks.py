@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import graphene
+import pytest
+
+from benchmarks.asgi import http_post
+from benchmarks.encoding import measure_encoding
+from benchmarks.harness import Result, compare, run_scenario
+from benchmarks.idle import measure_idle_memory
+from benchmarks.scenarios import SCENARIOS
+from graphene_asgi import Application
+
+
+@pytest.mark.parametrize("factory", SCENARIOS, ids=lambda f: f.name)
+def test_scenarios_run(factory):
+    result = run_scenario(factory, iterations=2, warmup=0)
+    assert result.name == factory.name
+    assert result.ops_per_sec > 0
+    assert result.peak_kib > 0
+
+
+def test_compare():
+    baseline = {"a": {"ops_per_sec": 100, "p50_ms": 1.0, "peak_kib": 10}}
+    ok = Result("a", ops_per_sec=95, p50_ms=1.05, p99_ms=0, peak_kib=10)
+    assert compare([ok], baseline, threshold=0.1) == []
+    slow = Result("a", ops_per_sec=80, p50_ms=1.5, p99_ms=0, peak_kib=10)
+    regressions = compare([slow], baseline, threshold=0.1)
+    assert [r.split(":")[0] for r in regressions] == ["a ops_per_sec", "a p50_ms"]
+    assert compare([slow], baseline, 0.1, metrics=["peak_kib"]) == []
+
+
+def test_idle_memory():
+    memory = measure_idle_memory(20)
+    assert memory.connection_bytes > 0
+    # shared subscriptions are fed without a task of their own
+    assert 0 < memory.shared_subscription_bytes < memory.subscription_bytes
+
+
+def test_encoding():
+    results = measure_encoding(iterations=2)
+    sizes = {(r.payload, r.codec): r.size for r in results}
+    assert sizes["rows_200", "msgpack_pure_python"] < sizes["rows_200", "json"]
+    assert all(r.encode_us > 0 for r in results)
+
+
+def test_http_post_stays_connected_until_the_response():
+    class Query(graphene.ObjectType):
+        slow = graphene.Int()
+
+        async def resolve_slow(self, info):
+            await asyncio.sleep(0.001)
+            return 1
+
+    app = Application(graphene.Schema(query=Query))
+    body = json.dumps({"query": "{ slow }"}).encode()
+    loop = asyncio.new_event_loop()
+    try:
+        status, response = loop.run_until_complete(http_post(app, body))
+    finally:
+        loop.close()
+    assert (status, json.loads(response)) == (200, {"data": {"slow": 1}})
+    assert "operations_cancelled" not in app.metrics.counters
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from starlette.testclient import WebSocketTestSession
+
+from graphene_asgi import Application
+from graphene_asgi.codec import MsgpackCodec
+from graphene_asgi.protocols import GraphqlWSHandler
+
+codec = MsgpackCodec()
+
+
+def session(application, subprotocols):
+    return WebSocketTestSession(
+        application,
+        {"type": "websocket", "headers": [], "subprotocols": subprotocols},
+    )
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_graphql_ws_msgpack(default_schema, shared):
+    application = Application(default_schema, shared_subscriptions=shared)
+    with session(application, ["graphql-ws.msgpack", "graphql-ws"]) as ws:
+        assert ws.accepted_subprotocol == "graphql-ws.msgpack"
+        ws.send_bytes(codec.dumps({"type": "connection_init", "payload": {}}))
+        assert codec.loads(ws.receive_bytes()) == {"type": "connection_ack"}
+        query = "subscription { count(upTo: 2) }"
+        ws.send_bytes(
+            codec.dumps({"id": "1", "type": "start", "payload": {"query": query}})
+        )
+        messages = [codec.loads(ws.receive_bytes()) for _ in range(4)]
+        assert [m["payload"] for m in messages[:-1]] == [
+            {"data": {"count": 0.0}},
+            {"data": {"count": 1.0}},
+            {"data": {"count": 2.0}},
+        ]
+        assert messages[0]["type"] == "data"
+        assert messages[-1] == {"type": "complete", "id": "1"}
+
+
+def test_client_preference_wins(default_application):
+    with session(default_application, ["graphql-ws", "graphql-ws.msgpack"]) as ws:
+        assert ws.accepted_subprotocol == "graphql-ws"
+        ws.send_text(json.dumps({"type": "connection_init", "payload": {}}))
+        assert ws.receive_json() == {"type": "connection_ack"}
+
+
+def test_unknown_binary_codec(default_schema):
+    application = Application(default_schema, binary_codecs={})
+    assert application.negotiate_subprotocol(
+        {"subprotocols": ["graphql-ws.msgpack", "graphql-ws"]}
+    ) == ("graphql-ws", application.codec)
+
+
+def test_websocket_msgpack(default_application):
+    with session(default_application, ["msgpack"]) as ws:
+        assert ws.accepted_subprotocol == "msgpack"
+        ws.send_bytes(codec.dumps({"query": "{ aNum }", "id": "foo"}))
+        assert codec.loads(ws.receive_bytes()) == {"data": {"aNum": 1}, "id": "foo"}
+
+
+@pytest.mark.asyncio
+async def test_graphql_ws_handler_closes_without_subprotocol(default_application):
+    sent = []
+
+    async def receive():
+        return {"type": "websocket.connect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "websocket", "headers": [], "subprotocols": ["graphql-ws.cbor"]}
+    handler = GraphqlWSHandler(scope, receive, send, default_application)
+    await handler.run()
+    assert sent == [{"type": "websocket.close"}]
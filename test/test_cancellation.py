@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+import pytest
+from starlette.testclient import WebSocketTestSession
+
+from graphene_asgi import Application
+
+from .conftest import asgi_post
+
+
+@pytest.mark.asyncio
+async def test_http_disconnect_cancels_execution(default_application):
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    sent = await asgi_post(
+        default_application, "{ aSlowNum(seconds: 5) }", disconnect=0.05
+    )
+    assert loop.time() - start < 1
+    assert sent == []
+    assert default_application.metrics.counters["operations_cancelled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_http_completes_without_disconnect(default_application):
+    sent = await asgi_post(
+        default_application, "{ aSlowNum(seconds: 0.01) }", disconnect="never"
+    )
+    assert json.loads(sent[1]["body"]) == {"data": {"aSlowNum": 2}}
+    assert default_application.metrics.counters["operations_cancelled"] == 0
+
+
+@pytest.mark.asyncio
+async def test_operation_timeout(default_schema):
+    application = Application(default_schema, operation_timeout=0.05)
+    sent = await asgi_post(application, "{ aSlowNum(seconds: 5) }")
+    assert sent[0]["status"] == 504
+    assert json.loads(sent[1]["body"])["errors"][0]["extensions"] == {
+        "code": "TIMEOUT"
+    }
+    assert application.metrics.counters["operations_timed_out"] == 1
+    sent = await asgi_post(application, "{ aNum }")
+    assert sent[0]["status"] == 200
+
+
+def test_websocket_disconnect_cancels_operations(default_application):
+    with WebSocketTestSession(
+        default_application, {"type": "websocket", "headers": [], "subprotocols": []}
+    ) as session:
+        session.send_text(json.dumps({"query": "{ aSlowNum(seconds: 5) }"}))
+        session.send_text(json.dumps({"query": "{ aNum }"}))
+        assert session.receive_json()["data"] == {"aNum": 1}
+    assert default_application.metrics.counters["operations_cancelled"] == 1
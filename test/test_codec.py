@@ -0,0 +1,108 @@
+import pytest
+from graphql.language import SourceLocation
+from starlette.testclient import TestClient
+
+from graphene_asgi import Application
+from graphene_asgi import msgpack_fallback
+from graphene_asgi.codec import (
+    JSONCodec,
+    MsgpackCodec,
+    OrjsonCodec,
+    SharedPayload,
+    msgpack,
+    orjson,
+)
+
+codecs = [JSONCodec]
+if orjson is not None:
+    codecs.append(OrjsonCodec)
+
+
+@pytest.mark.parametrize("codec_class", codecs)
+def test_codec_round_trip(codec_class):
+    codec = codec_class()
+    obj = {"data": {"a": [1, 2.5, None, "x"]}, "locations": [SourceLocation(1, 2)]}
+    encoded = codec.dumps(obj)
+    assert isinstance(encoded, bytes)
+    assert isinstance(codec.dumps_str(obj), str)
+    assert codec.loads(encoded) == {
+        "data": {"a": [1, 2.5, None, "x"]},
+        "locations": [[1, 2]],
+    }
+    assert codec.loads(codec.dumps_str(obj)) == codec.loads(encoded)
+
+
+@pytest.mark.parametrize("codec_class", codecs)
+def test_http_with_codec(default_schema, codec_class):
+    client = TestClient(Application(default_schema, codec=codec_class()))
+    resp = client.post("/", json={"query": "{ aNum }"})
+    assert resp.status_code == 200
+    assert resp.json() == {"data": {"aNum": 1}}
+    assert int(resp.headers["content-length"]) == len(resp.content)
+
+
+@pytest.mark.parametrize("codec_class", codecs)
+def test_iter_dumps(codec_class):
+    codec = codec_class()
+    obj = {"data": {"rows": [{"id": i} for i in range(100)], "empty": [], "e": {}}}
+    chunks = list(codec.iter_dumps(obj, chunk_size=64))
+    assert len(chunks) > 1
+    assert all(len(chunk) < 128 for chunk in chunks)
+    assert codec.loads(b"".join(chunks)) == obj
+
+
+@pytest.mark.parametrize("codec_class", codecs)
+def test_iter_dumps_nested_lists(codec_class):
+    codec = codec_class()
+    rows = [{"id": i, "tags": ["a", "b"]} for i in range(1000)]
+    obj = {"data": {"users": [{"posts": rows}, [[1, 2], []]]}}
+    chunks = list(codec.iter_dumps(obj, chunk_size=256))
+    assert max(len(chunk) for chunk in chunks) < 512
+    assert codec.loads(b"".join(chunks)) == obj
+
+
+def test_msgpack_fallback():
+    codec = MsgpackCodec(pure_python=True)
+    assert codec.dumps({"a": [1, None, True]}) == b"\x81\xa1a\x93\x01\xc0\xc3"
+    obj = {
+        "data": {"rows": [{"id": i, "name": "é" * i} for i in range(300)]},
+        "ints": [-1, -33, -200, -40000, -(2 ** 40), 200, 40000, 2 ** 40],
+        "floats": [2.5, -0.0],
+        "bytes": b"\x00" * 300,
+        "locations": [SourceLocation(1, 2)],
+    }
+    decoded = codec.loads(codec.dumps(obj))
+    assert decoded == {**obj, "locations": [[1, 2]]}
+    with pytest.raises(TypeError):
+        codec.dumps(object())
+    with pytest.raises(ValueError):
+        codec.loads(b"\x92\x01")
+
+
+@pytest.mark.skipif(msgpack is None, reason="msgpack is not installed")
+def test_msgpack_fallback_matches_msgpack():
+    obj = {"a": [1, -1, 300, -300, 2 ** 33, 2.5, None, "x" * 40, b"y"], "b": {}}
+    packed = msgpack.packb(obj, use_bin_type=True)
+    assert msgpack_fallback.packb(obj) == packed
+    assert msgpack_fallback.unpackb(packed) == msgpack.unpackb(packed, raw=False)
+
+
+@pytest.mark.parametrize("codec_class", codecs + [MsgpackCodec])
+def test_envelope(codec_class):
+    codec = codec_class()
+    prefix, suffix = codec.envelope({"type": "data", "id": "1"}, "payload")
+    frame = prefix + codec.dumps_frame({"data": {"a": 1}}) + suffix
+    assert codec.loads(frame) == {
+        "type": "data",
+        "id": "1",
+        "payload": {"data": {"a": 1}},
+    }
+
+
+def test_shared_payload_encoded_once_per_codec():
+    json_codec, msgpack_codec = JSONCodec(), MsgpackCodec()
+    payload = SharedPayload({"data": {"a": 1}})
+    assert payload.frame(json_codec) is payload.frame(json_codec)
+    assert isinstance(payload.frame(json_codec), str)
+    assert payload.frame(msgpack_codec) is payload.frame(msgpack_codec)
+    assert isinstance(payload.frame(msgpack_codec), bytes)
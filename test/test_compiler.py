@@ -0,0 +1,110 @@
+import asyncio
+
+import graphene
+import pytest
+
+from graphene_asgi import Application
+from graphene_asgi.compiler import CompiledOperation
+
+
+class Pet(graphene.ObjectType):
+    name = graphene.String()
+    age = graphene.Int(required=True)
+    tags = graphene.List(graphene.NonNull(graphene.String))
+
+    async def resolve_name(self, info):
+        await asyncio.sleep(0)
+        return self.name
+
+
+class Person(graphene.ObjectType):
+    id = graphene.ID()
+    name = graphene.String()
+    pets = graphene.List(Pet)
+    greeting = graphene.String(greeting=graphene.String(default_value="Hello"))
+
+    def resolve_greeting(self, info, greeting):
+        return "{} {}".format(greeting, self.name)
+
+
+def make_pets(index):
+    return [
+        Pet(name="pet {}".format(i), age=i, tags=["a", "b"] if i else ["a", None])
+        for i in range(index)
+    ]
+
+
+class Query(graphene.ObjectType):
+    people = graphene.List(Person, count=graphene.Int(required=True))
+    broken = graphene.Field(Pet)
+    failing = graphene.String()
+    rows = graphene.List(graphene.Int)
+
+    def resolve_people(self, info, count):
+        return [
+            Person(id=i, name="person {}".format(i), pets=make_pets(i))
+            for i in range(count)
+        ]
+
+    def resolve_broken(self, info):
+        return Pet(name="no age", age=None)
+
+    def resolve_failing(self, info):
+        raise ValueError("failed")
+
+    def resolve_rows(self, info):
+        return [1, "x", 3]
+
+
+schema = graphene.Schema(query=Query)
+
+QUERIES = [
+    ("{ people(count: 3) { id name pets { name age } } }", None),
+    (
+        "query($n: Int!, $g: String) { people(count: $n) { ...P hi: greeting(greeting: $g) } }"  # noqa: E501
+        " fragment P on Person { name greeting pets { ... on Pet { age } } }",
+        {"n": 2, "g": "Hi"},
+    ),
+    ("{ people(count: 2) { pets { tags } } }", None),
+    ("{ broken { name age } failing __typename }", None),
+    ("{ rows }", None),
+    ("query($n: Int!) { people(count: $n) { id } }", {"n": "x"}),
+]
+
+
+@pytest.mark.parametrize("query,variables", QUERIES)
+@pytest.mark.asyncio
+async def test_compiled_results_match_standard_executor(query, variables):
+    standard = await Application(schema).execute(
+        source=query, variable_values=variables
+    )
+    application = Application(schema, compile_operations=True)
+    compiled = await application.execute(source=query, variable_values=variables)
+    assert compiled.data == standard.data
+    assert [e.formatted for e in compiled.errors or ()] == [
+        e.formatted for e in standard.errors or ()
+    ]
+
+
+@pytest.mark.parametrize(
+    "query,compiled",
+    [
+        ("{ people(count: 1) { name } }", True),
+        ("{ people(count: 1) @include(if: true) { name } }", False),
+        ("{ __schema { queryType { name } } }", False),
+    ],
+)
+def test_unsupported_constructs_fall_back(query, compiled):
+    application = Application(schema, compile_operations=True)
+    cached = application.get_document(query)
+    op = next(iter(cached.operation_defs.values()))
+    plan = application.compiler.get(schema.graphql_schema, cached.document, op)
+    assert isinstance(plan, CompiledOperation) is compiled
+    assert application.compiler.get(schema.graphql_schema, cached.document, op) is plan
+
+
+@pytest.mark.asyncio
+async def test_fallback_executes(default_schema):
+    application = Application(default_schema, compile_operations=True)
+    res = await application.execute(source="{ aNum @skip(if: false) }")
+    assert res.data == {"aNum": 1}
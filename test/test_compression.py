@@ -0,0 +1,103 @@
+import json
+import zlib
+
+import graphene
+import pytest
+
+from graphene_asgi import Application
+from graphene_asgi.compression import ResponseCompressor, parse_accept_encoding
+
+from .conftest import asgi_post
+
+
+class Query(graphene.ObjectType):
+    blob = graphene.String(size=graphene.Int(required=True))
+
+    def resolve_blob(self, info, size):
+        return "x" * size
+
+
+schema = graphene.Schema(query=Query)
+
+
+async def post(application, query, accept_encoding=None, if_none_match=None):
+    headers = [(b"content-type", b"application/json")]
+    if if_none_match:
+        headers.append((b"if-none-match", if_none_match))
+    if accept_encoding:
+        headers.append((b"accept-encoding", accept_encoding.encode()))
+    sent = await asgi_post(application, query, headers=headers)
+    return dict(sent[0]["headers"]), [m["body"] for m in sent[1:]]
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip, deflate;q=0.5, br;q=0") == {
+        "gzip": 1.0,
+        "deflate": 0.5,
+        "br": 0.0,
+    }
+
+
+def test_negotiate():
+    compressor = ResponseCompressor(encodings=["br", "gzip", "deflate"])
+    assert compressor.negotiate("gzip, deflate, br") == "br"
+    assert compressor.negotiate("gzip;q=0.5, deflate") == "deflate"
+    assert compressor.negotiate("br;q=0, *;q=0.1") == "gzip"
+    assert compressor.negotiate("identity") is None
+    assert compressor.negotiate(None) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "encoding, wbits", [("gzip", 16 + zlib.MAX_WBITS), ("deflate", zlib.MAX_WBITS)]
+)
+async def test_compressed_response(encoding, wbits):
+    application = Application(
+        schema, compression=ResponseCompressor(encodings=["gzip", "deflate"])
+    )
+    headers, bodies = await post(application, "{ blob(size: 5000) }", encoding)
+    assert headers[b"content-encoding"] == encoding.encode()
+    assert int(headers[b"content-length"]) == len(bodies[0])
+    assert len(bodies[0]) < 5000
+    data = json.loads(zlib.decompress(bodies[0], wbits))
+    assert data == {"data": {"blob": "x" * 5000}}
+
+
+@pytest.mark.asyncio
+async def test_small_response_not_compressed():
+    application = Application(schema, compression=ResponseCompressor(min_size=1024))
+    headers, bodies = await post(application, "{ blob(size: 10) }", "gzip")
+    assert b"content-encoding" not in headers
+    assert json.loads(bodies[0]) == {"data": {"blob": "x" * 10}}
+
+
+@pytest.mark.asyncio
+async def test_streamed_compressed_response():
+    application = Application(
+        schema, compression=ResponseCompressor(encodings=["gzip"], chunk_size=1000)
+    )
+    headers, bodies = await post(application, "{ blob(size: 100000) }", "gzip")
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    assert len(bodies) > 2
+    assert bodies[-1] == b""
+    data = json.loads(zlib.decompress(b"".join(bodies), 16 + zlib.MAX_WBITS))
+    assert data == {"data": {"blob": "x" * 100000}}
+
+
+@pytest.mark.asyncio
+async def test_etag_depends_on_content_coding():
+    application = Application(
+        schema, compression=ResponseCompressor(encodings=["gzip", "deflate"])
+    )
+    query = "{ blob(size: 5000) }"
+    tags = {}
+    for encoding in ("gzip", "deflate", None):
+        headers, _ = await post(application, query, encoding, b'"unknown"')
+        tags[encoding] = headers[b"etag"]
+    assert len(set(tags.values())) == 3
+    headers, bodies = await post(application, query, "gzip", tags["gzip"])
+    assert headers[b"vary"] == b"accept-encoding"
+    assert bodies == [b""]
+    headers, bodies = await post(application, query, "deflate", tags["gzip"])
+    assert headers[b"content-encoding"] == b"deflate"
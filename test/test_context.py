@@ -0,0 +1,35 @@
+import pytest
+
+from graphene_asgi.context import ConnectionContext
+
+
+def test_connection_context_is_lazy():
+    scope = {"type": "websocket", "headers": [(b"foo", b"bar")], "query_string": b"a=1"}
+    connection = ConnectionContext(scope)
+    assert dict(connection) == scope
+    assert connection._headers is None
+    assert connection.headers == {"foo": "bar"}
+    assert connection.headers is connection.headers
+    assert connection.query_string == "a=1"
+
+
+def test_new_context():
+    connection = ConnectionContext({"type": "websocket", "headers": [(b"foo", b"bar")]})
+    first = connection.new_context()
+    first["user"] = "alice"
+    first["headers"]["foo"] = "changed"
+    second = connection.new_context()
+    assert first["headers"] is not second["headers"]
+    assert second == {
+        "type": "websocket",
+        "headers": {"foo": "bar"},
+        "query_string": "",
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_context_accepts_scope(default_application):
+    context = await default_application.get_context(
+        {"type": "http", "headers": [(b"foo", b"bar")]}, b""
+    )
+    assert context["headers"] == {"foo": "bar"}
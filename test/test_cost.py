@@ -0,0 +1,129 @@
+import graphene
+from graphql.language import parse
+from starlette.testclient import TestClient
+
+from graphene_asgi import Application
+from graphene_asgi.cost import QueryCostAnalyzer, cost
+
+
+class Item(graphene.ObjectType):
+    name = graphene.String()
+    children = graphene.List(lambda: Item, first=graphene.Int())
+
+    def resolve_name(self, info):
+        return "item"
+
+    def resolve_children(self, info, first=1):
+        return [Item() for _ in range(first)]
+
+
+class Query(graphene.ObjectType):
+    items = graphene.List(Item, first=graphene.Int())
+    paged = graphene.List(Item, first=graphene.Int(default_value=100))
+    expensive = graphene.Int()
+
+    def resolve_items(self, info, first=1):
+        return [Item() for _ in range(first)]
+
+    def resolve_paged(self, info, first):
+        return [Item() for _ in range(first)]
+
+    @cost(50)
+    def resolve_expensive(self, info):
+        return 1
+
+
+schema = graphene.Schema(query=Query)
+
+
+def analyze(analyzer, query, variables=None, key=None):
+    document = parse(query)
+    return analyzer.get_cost(
+        schema.graphql_schema, document, document.definitions[0], variables, key
+    )
+
+
+def test_cost():
+    analyzer = QueryCostAnalyzer(field_costs={"Item.name": 2})
+    query_cost = analyze(
+        analyzer,
+        """
+        query {
+            expensive
+            items(first: 10) {
+                ...itemFields
+                children(first: 5) { name }
+            }
+        }
+        fragment itemFields on Item { name __typename }
+        """,
+    )
+    assert query_cost.depth == 3
+    assert query_cost.fields == 5
+    # 50 + (1 + 10 * (2 + 1 + 5 * 2))
+    assert query_cost.cost == 181
+
+
+def test_cost_cached_per_list_size_variables():
+    analyzer = QueryCostAnalyzer()
+    query = "query($n: Int, $other: Int) { items(first: $n) { name } }"
+    assert analyze(analyzer, query, {"n": 3}, key="q").cost == 4
+    assert analyze(analyzer, query, {"n": 3, "other": 1}, key="q").cost == 4
+    assert analyzer.cache.get("q").variables == ("n",)
+    assert analyzer.cache.get("q").costs.hits == 1
+    assert analyze(analyzer, query, {"n": 30}, key="q").cost == 31
+
+
+def test_cost_uses_variable_default_values():
+    analyzer = QueryCostAnalyzer()
+    query = "query($n: Int = 5000) { items(first: $n) { name } }"
+    assert analyze(analyzer, query, key="q").cost == 5001
+    assert analyze(analyzer, query, {"n": 2}, key="q").cost == 3
+    assert analyze(analyzer, query, key="q").cost == 5001
+
+
+def test_cost_uses_argument_default_values():
+    analyzer = QueryCostAnalyzer()
+    assert analyze(analyzer, "{ paged { name } }").cost == 101
+    query = "query($n: Int) { paged(first: $n) { name } }"
+    assert analyze(analyzer, query).cost == 101
+    assert analyze(analyzer, query, {"n": 3}).cost == 4
+
+
+def test_application_rejects_defaulted_list_sizes():
+    client = TestClient(
+        Application(schema, cost_analyzer=QueryCostAnalyzer(max_cost=100))
+    )
+    for query in (
+        "query($n: Int = 5000) { items(first: $n) { name } }",
+        "{ paged { name } }",
+    ):
+        resp = client.post("/", json={"query": query})
+        assert resp.status_code == 400
+        assert resp.json()["errors"][0]["extensions"]["code"] == "QUERY_TOO_COMPLEX"
+
+
+def test_application_rejects_costly_queries():
+    application = Application(
+        schema, cost_analyzer=QueryCostAnalyzer(max_cost=20, max_depth=2)
+    )
+    client = TestClient(application)
+    resp = client.post("/", json={"query": "{ items(first: 5) { name } }"})
+    assert resp.status_code == 200
+    assert len(resp.json()["data"]["items"]) == 5
+    resp = client.post("/", json={"query": "{ items(first: 50) { name } }"})
+    assert resp.status_code == 400
+    assert resp.json()["errors"] == [
+        {
+            "message": "Query cost 51.0 exceeds the maximum of 20",
+            "locations": None,
+            "path": None,
+            "extensions": {"code": "QUERY_TOO_COMPLEX"},
+        }
+    ]
+    resp = client.post(
+        "/", json={"query": "{ items { children { children { name } } } }"}
+    )
+    assert resp.json()["errors"][0]["message"] == (
+        "Query depth 4 exceeds the maximum of 2"
+    )
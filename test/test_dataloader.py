@@ -0,0 +1,124 @@
+import asyncio
+
+import graphene
+import pytest
+
+from graphene_asgi import Application
+from graphene_asgi.dataloader import DataLoader
+from graphene_asgi.threads import ThreadPoolMiddleware
+
+batches = []
+
+
+class SquareLoader(DataLoader):
+    async def batch_load(self, keys):
+        batches.append(list(keys))
+        return [ValueError("negative") if key < 0 else key * key for key in keys]
+
+
+class Item(graphene.ObjectType):
+    id = graphene.Int()
+    square = graphene.Int()
+    sync_square = graphene.Int()
+    neighbours = graphene.List(graphene.Int)
+
+    async def resolve_square(self, info):
+        return await info.context["loaders"]["square"].load(self.id)
+
+    def resolve_sync_square(self, info):
+        return info.context["loaders"]["square"].load(self.id)
+
+    def resolve_neighbours(self, info):
+        return info.context["loaders"]["square"].load_many([self.id - 1, self.id + 1])
+
+
+class Query(graphene.ObjectType):
+    items = graphene.List(Item, ids=graphene.List(graphene.Int))
+
+    def resolve_items(self, info, ids):
+        return [Item(id=i) for i in ids]
+
+
+class Subscription(graphene.ObjectType):
+    square = graphene.Int()
+
+    async def resolve_square(self, info):
+        return await info.context["loaders"]["square"].load(2)
+
+    async def subscribe_square(self, info):
+        for i in range(2):
+            yield i
+
+
+schema = graphene.Schema(query=Query, subscription=Subscription)
+
+
+@pytest.fixture(autouse=True)
+def clear_batches():
+    batches.clear()
+
+
+@pytest.mark.asyncio
+async def test_batching_and_memoization():
+    loader = SquareLoader(max_batch_size=2)
+    results = await asyncio.gather(*(loader.load(k) for k in (1, 2, 3, 1)))
+    assert results == [1, 4, 9, 1]
+    assert batches == [[1, 2], [3]]
+    assert await loader.load(3) == 9
+    assert await loader.load_many([1, 4]) == [1, 16]
+    assert batches == [[1, 2], [3], [4]]
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_memoized():
+    loader = SquareLoader()
+    with pytest.raises(ValueError):
+        await loader.load(-1)
+    with pytest.raises(ValueError):
+        await loader.load(-1)
+    assert batches == [[-1], [-1]]
+
+
+@pytest.mark.asyncio
+async def test_loaders_are_request_scoped():
+    application = Application(schema, loaders={"square": SquareLoader})
+    query = "{ items(ids: [1, 2, 1, 3]) { square } }"
+    for _ in range(2):
+        context = await application.get_context({"headers": []}, None)
+        res = await application.execute(source=query, context_value=context)
+        assert res.data == {"items": [{"square": s} for s in (1, 4, 1, 9)]}
+    assert batches == [[1, 2, 3], [1, 2, 3]]
+
+
+@pytest.mark.asyncio
+async def test_subscription_loaders_are_cleared_per_event():
+    application = Application(schema, loaders={"square": SquareLoader})
+    stream = await application.execute(
+        source="subscription { square }",
+        context_value=await application.get_context({"headers": []}, None),
+    )
+    results = [res.data async for res in stream]
+    assert results == [{"square": 4}, {"square": 4}]
+    assert batches == [[2], [2]]
+
+
+@pytest.mark.asyncio
+async def test_loaders_in_thread_pool():
+    thread_pool = ThreadPoolMiddleware(max_workers=2)
+    application = Application(
+        schema, loaders={"square": SquareLoader}, thread_pool=thread_pool
+    )
+    context = await application.get_context({"headers": []}, None)
+    res = await application.execute(
+        source="{ items(ids: [1, 2]) { syncSquare neighbours } }",
+        context_value=context,
+    )
+    thread_pool.shutdown()
+    assert res.errors is None
+    assert res.data == {
+        "items": [
+            {"syncSquare": 1, "neighbours": [0, 4]},
+            {"syncSquare": 4, "neighbours": [1, 9]},
+        ]
+    }
+    assert sorted(key for batch in batches for key in batch) == [0, 1, 2, 3]
@@ -0,0 +1,51 @@
+from starlette.testclient import TestClient
+
+from graphene_asgi import Application
+from graphene_asgi.cache import LRUCache
+
+
+def test_lru_cache_eviction():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.stats == {
+        "size": 2,
+        "maxsize": 2,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_document_cache_reused(default_schema):
+    application = Application(default_schema, document_cache_size=8)
+    client = TestClient(application)
+    for _ in range(3):
+        resp = client.post("/", json={"query": "{ aNum }"})
+        assert resp.status_code == 200
+        assert resp.json()["data"]["aNum"] == 1
+    assert len(application.document_cache) == 1
+    assert application.document_cache.misses == 1
+    assert application.document_cache.hits == 2
+
+
+def test_document_cache_validation_errors(default_schema):
+    application = Application(default_schema)
+    client = TestClient(application)
+    for _ in range(2):
+        resp = client.post("/", json={"query": "{ noSuchField }"})
+        assert resp.status_code == 400
+        assert "noSuchField" in resp.json()["errors"][0]["message"]
+    assert application.document_cache.hits == 1
+
+
+def test_syntax_error_is_reported(default_application):
+    client = TestClient(default_application)
+    resp = client.post("/", json={"query": "{ aNum "})
+    assert resp.status_code == 400
+    assert resp.json()["errors"][0]["message"].startswith("Syntax Error")
+    assert len(default_application.document_cache) == 0
@@ -1,5 +1,7 @@
 from starlette.testclient import WebSocketTestSession
 
+from graphene_asgi.protocols import GraphqlWSHandler
+
 
 def test_query_through_ws(default_application):
     with WebSocketTestSession(
@@ -35,3 +37,11 @@ def test_query_through_ws(default_application):
         for i, msg in enumerate(id2_messages[:-1]):
             assert msg["payload"]["data"]["count"] == float(i)
         assert id2_messages[-1]["type"] == "complete"
+
+
+def test_connection_state_has_no_dict(default_application):
+    scope = {"type": "websocket", "headers": [], "subprotocols": ["graphql-ws"]}
+    handler = GraphqlWSHandler(scope, None, None, default_application)
+    assert not hasattr(handler, "__dict__")
+    assert not hasattr(handler.connection, "__dict__")
+    assert handler.scope is scope
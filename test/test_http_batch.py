@@ -0,0 +1,54 @@
+from starlette.testclient import TestClient
+
+from graphene_asgi import Application
+
+
+def test_http_batch(default_application):
+    client = TestClient(default_application)
+    resp = client.post(
+        "/",
+        json=[
+            {"query": "{ aNum }"},
+            {"query": "{ noSuchField }"},
+            {
+                "query": "query($n: Int!) { aNumWithArgs(num: $n) }",
+                "variables": {"n": 3},
+            },
+            "not an operation",
+        ],
+    )
+    assert resp.status_code == 200
+    res = resp.json()
+    assert len(res) == 4
+    assert res[0] == {"data": {"aNum": 1}}
+    assert "noSuchField" in res[1]["errors"][0]["message"]
+    assert res[2] == {"data": {"aNumWithArgs": 3}}
+    assert res[3]["data"] is None
+    assert res[3]["errors"][0]["message"] == "Batch items must be objects"
+
+
+def test_http_batch_items_must_be_objects(default_application):
+    client = TestClient(default_application)
+    resp = client.post("/", json=[["{ aNum }"], 1, None, {"query": "{ aNum }"}])
+    assert resp.status_code == 200
+    res = resp.json()
+    assert [r["errors"][0]["message"] for r in res[:3]] == [
+        "Batch items must be objects"
+    ] * 3
+    assert res[3] == {"data": {"aNum": 1}}
+
+
+def test_http_batch_too_large(default_schema):
+    client = TestClient(Application(default_schema, max_batch_size=2))
+    resp = client.post("/", json=[{"query": "{ aNum }"}] * 3)
+    assert resp.status_code == 400
+    assert resp.json()["errors"][0]["message"] == (
+        "Batch must contain between 1 and 2 operations"
+    )
+
+
+def test_http_batch_disabled(default_schema):
+    client = TestClient(Application(default_schema, max_batch_size=0))
+    resp = client.post("/", json=[{"query": "{ aNum }"}])
+    assert resp.status_code == 400
+    assert resp.json()["errors"][0]["message"] == "Batched operations are not supported"
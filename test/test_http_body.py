@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from graphene_asgi import Application
+
+from .conftest import asgi_post
+
+CHUNKED = [(b"transfer-encoding", b"chunked")]
+
+
+@pytest.mark.asyncio
+async def test_chunked_body(default_application):
+    body = json.dumps({"query": "{ aNum }"}).encode()
+    chunks = [body[:5], body[5:10], body[10:]]
+    sent = await asgi_post(default_application, chunks=chunks, headers=CHUNKED)
+    assert sent[0]["status"] == 200
+    assert json.loads(sent[1]["body"]) == {"data": {"aNum": 1}}
+
+
+@pytest.mark.asyncio
+async def test_declared_body_too_large(default_schema):
+    application = Application(default_schema, max_body_size=10)
+    received = []
+    sent = await asgi_post(
+        application,
+        chunks=[b"x" * 100],
+        headers=[(b"content-length", b"100")],
+        received=received,
+    )
+    assert sent[0]["status"] == 413
+    assert received == []
+
+
+@pytest.mark.asyncio
+async def test_chunked_body_too_large(default_schema):
+    application = Application(default_schema, max_body_size=10)
+    received = []
+    sent = await asgi_post(
+        application, chunks=[b"x" * 6] * 3, headers=CHUNKED, received=received
+    )
+    assert sent[0]["status"] == 413
+    assert len(received) == 2
@@ -0,0 +1,67 @@
+import json
+import zlib
+
+import graphene
+import pytest
+
+from graphene_asgi import Application
+from graphene_asgi.compression import ResponseCompressor
+
+from .conftest import asgi_post
+
+
+class Query(graphene.ObjectType):
+    rows = graphene.List(graphene.String, count=graphene.Int(required=True))
+
+    def resolve_rows(self, info, count):
+        return ["row {}".format(i) for i in range(count)]
+
+
+schema = graphene.Schema(query=Query)
+
+
+async def post(application, query, headers=()):
+    sent = await asgi_post(application, query, headers=headers)
+    return dict(sent[0]["headers"]), sent[1:]
+
+
+@pytest.mark.asyncio
+async def test_large_result_is_streamed():
+    application = Application(schema, stream_threshold=1024, stream_chunk_size=256)
+    headers, messages = await post(application, "{ rows(count: 1000) }")
+    assert b"content-length" not in headers
+    assert b"etag" not in headers
+    assert len(messages) > 2
+    assert all(m["more_body"] for m in messages[:-1])
+    assert not messages[-1]["more_body"]
+    body = b"".join(m["body"] for m in messages)
+    assert json.loads(body)["data"]["rows"][999] == "row 999"
+
+
+@pytest.mark.asyncio
+async def test_small_result_is_buffered():
+    application = Application(schema, stream_threshold=1024)
+    headers, messages = await post(application, "{ rows(count: 2) }")
+    assert int(headers[b"content-length"]) == len(messages[0]["body"])
+
+
+@pytest.mark.asyncio
+async def test_not_streamed_by_default():
+    headers, messages = await post(Application(schema), "{ rows(count: 1000) }")
+    assert int(headers[b"content-length"]) == len(messages[0]["body"])
+
+
+@pytest.mark.asyncio
+async def test_streamed_result_is_compressed():
+    application = Application(
+        schema,
+        stream_threshold=1024,
+        stream_chunk_size=256,
+        compression=ResponseCompressor(encodings=["gzip"]),
+    )
+    headers, messages = await post(
+        application, "{ rows(count: 1000) }", [(b"accept-encoding", b"gzip")]
+    )
+    assert headers[b"content-encoding"] == b"gzip"
+    body = zlib.decompress(b"".join(m["body"] for m in messages), 16 + zlib.MAX_WBITS)
+    assert len(json.loads(body)["data"]["rows"]) == 1000
@@ -0,0 +1,159 @@
+import asyncio
+import json
+
+import graphene
+import pytest
+from starlette.testclient import TestClient, WebSocketTestSession
+
+from graphene_asgi import Application
+from graphene_asgi.incremental import IncrementalExecutionResult
+
+
+class Query(graphene.ObjectType):
+    fast = graphene.Int()
+    slow = graphene.Int()
+    letters = graphene.List(graphene.String)
+    numbers = graphene.List(graphene.Int)
+
+    def resolve_fast(self, info):
+        return 1
+
+    async def resolve_slow(self, info):
+        await asyncio.sleep(0.05)
+        return 2
+
+    def resolve_letters(self, info):
+        return ["a", "b", "c"]
+
+    async def resolve_numbers(self, info):
+        async def numbers():
+            for i in range(3):
+                await asyncio.sleep(0.01)
+                yield i
+
+        return numbers()
+
+
+@pytest.fixture
+def application():
+    return Application(graphene.Schema(query=Query), incremental_delivery=True)
+
+
+@pytest.mark.asyncio
+async def test_schema_is_not_modified():
+    schema = graphene.Schema(query=Query)
+    directives = list(schema.graphql_schema.directives)
+    Application(schema, incremental_delivery=True)
+    assert schema.graphql_schema.directives == directives
+    res = await Application(schema).execute(source="{ fast ... @defer { slow } }")
+    assert res.errors[0].message == "Unknown directive 'defer'."
+
+
+async def collect(res):
+    payloads = [{**res.initial._asdict(), "hasNext": True}]
+    async for payload in res.subsequent:
+        payloads.append(payload)
+    return payloads
+
+
+@pytest.mark.asyncio
+async def test_defer(application):
+    res = await application.execute(
+        source="{ fast ... @defer(label: \"s\") { slow } }", incremental=True
+    )
+    assert isinstance(res, IncrementalExecutionResult)
+    assert await collect(res) == [
+        {"data": {"fast": 1}, "errors": None, "hasNext": True},
+        {
+            "incremental": [{"data": {"slow": 2}, "path": [], "label": "s"}],
+            "hasNext": False,
+        },
+    ]
+
+
+@pytest.mark.asyncio
+async def test_defer_if_false_and_not_requested(application):
+    query = "query($d: Boolean!) { fast ... @defer(if: $d) { slow } }"
+    res = await application.execute(
+        source=query, variable_values={"d": False}, incremental=True
+    )
+    assert res.data == {"fast": 1, "slow": 2}
+    res = await application.execute(source=query, variable_values={"d": True})
+    assert res.data == {"fast": 1, "slow": 2}
+
+
+@pytest.mark.asyncio
+async def test_stream(application):
+    res = await application.execute(
+        source="{ letters @stream(initialCount: 1) }", incremental=True
+    )
+    payloads = await collect(res)
+    assert payloads[0]["data"] == {"letters": ["a"]}
+    items = [
+        (patch["items"], patch["path"])
+        for payload in payloads[1:]
+        for patch in payload.get("incremental", ())
+    ]
+    assert items == [(["b"], ["letters", 1]), (["c"], ["letters", 2])]
+    assert payloads[-1]["hasNext"] is False
+
+
+@pytest.mark.asyncio
+async def test_stream_async_iterable(application):
+    res = await application.execute(
+        source="{ numbers @stream(initialCount: 2) }", incremental=True
+    )
+    payloads = await collect(res)
+    assert payloads[0]["data"] == {"numbers": [0, 1]}
+    assert payloads[1]["incremental"] == [{"items": [2], "path": ["numbers", 2]}]
+
+
+def test_http_multipart(application):
+    client = TestClient(application)
+    response = client.post(
+        "/",
+        json={"query": "{ fast ... @defer { slow } }"},
+        headers={"accept": "multipart/mixed"},
+    )
+    assert response.headers["content-type"].startswith("multipart/mixed")
+    parts = response.content.split(b"\r\n---")
+    assert parts[-1] == b"--\r\n"
+    bodies = [json.loads(part.split(b"\r\n\r\n", 1)[1]) for part in parts[1:-1]]
+    assert bodies == [
+        {"data": {"fast": 1}, "hasNext": True},
+        {"incremental": [{"data": {"slow": 2}, "path": []}], "hasNext": False},
+    ]
+
+
+def test_http_without_multipart_accept(application):
+    client = TestClient(application)
+    response = client.post("/", json={"query": "{ fast ... @defer { slow } }"})
+    assert response.json() == {"data": {"fast": 1, "slow": 2}}
+
+
+def test_graphql_ws(application):
+    with WebSocketTestSession(
+        application,
+        {"type": "websocket", "headers": [], "subprotocols": ["graphql-ws"]},
+    ) as session:
+        session.send_text(json.dumps({"type": "connection_init", "payload": {}}))
+        assert session.receive_json()["type"] == "connection_ack"
+        session.send_text(
+            json.dumps(
+                {
+                    "id": "1",
+                    "type": "start",
+                    "payload": {"query": "{ fast ... @defer { slow } }"},
+                }
+            )
+        )
+        assert session.receive_json() == {
+            "type": "data",
+            "id": "1",
+            "payload": {"data": {"fast": 1}, "hasNext": True},
+        }
+        assert session.receive_json()["payload"] == {
+            "incremental": [{"data": {"slow": 2}, "path": []}],
+            "hasNext": False,
+        }
+        assert session.receive_json() == {"type": "complete", "id": "1"}
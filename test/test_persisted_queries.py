@@ -0,0 +1,79 @@
+import json
+from hashlib import sha256
+
+from starlette.testclient import TestClient, WebSocketTestSession
+
+from graphene_asgi import Application
+
+QUERY = "{ aNum }"
+EXTENSIONS = {
+    "persistedQuery": {"version": 1, "sha256Hash": sha256(QUERY.encode()).hexdigest()}
+}
+
+
+def test_http_persisted_query(default_application):
+    client = TestClient(default_application)
+    resp = client.post("/", json={"extensions": EXTENSIONS})
+    assert resp.json()["errors"][0]["message"] == "PersistedQueryNotFound"
+    assert resp.json()["errors"][0]["extensions"] == {
+        "code": "PERSISTED_QUERY_NOT_FOUND"
+    }
+    resp = client.post("/", json={"query": QUERY, "extensions": EXTENSIONS})
+    assert resp.status_code == 200
+    assert resp.json()["data"]["aNum"] == 1
+    resp = client.post("/", json={"extensions": EXTENSIONS})
+    assert resp.status_code == 200
+    assert resp.json()["data"]["aNum"] == 1
+
+
+def test_http_persisted_query_hash_mismatch(default_application):
+    client = TestClient(default_application)
+    resp = client.post("/", json={"query": "{ aNum }", "extensions": EXTENSIONS})
+    assert resp.status_code == 200
+    resp = client.post(
+        "/", json={"query": "{ getContext }", "extensions": EXTENSIONS}
+    )
+    assert resp.status_code == 400
+    assert resp.json()["errors"][0]["message"] == "provided sha does not match query"
+
+
+def test_http_persisted_query_disabled(default_schema):
+    client = TestClient(Application(default_schema, persisted_queries=False))
+    resp = client.post("/", json={"query": QUERY, "extensions": EXTENSIONS})
+    assert resp.json()["errors"][0]["message"] == "PersistedQueryNotSupported"
+
+
+def test_graphql_ws_persisted_query(default_application):
+    with WebSocketTestSession(
+        default_application,
+        {"type": "websocket", "headers": [], "subprotocols": ["graphql-ws"]},
+    ) as session:
+        session.send_text(json.dumps({"type": "connection_init", "payload": {}}))
+        assert session.receive_json()["type"] == "connection_ack"
+        session.send_text(
+            json.dumps(
+                {"id": "1", "type": "start", "payload": {"extensions": EXTENSIONS}}
+            )
+        )
+        msg = session.receive_json()
+        assert msg["type"] == "error"
+        assert msg["payload"][0]["message"] == "PersistedQueryNotFound"
+        session.send_text(
+            json.dumps(
+                {
+                    "id": "2",
+                    "type": "start",
+                    "payload": {"query": QUERY, "extensions": EXTENSIONS},
+                }
+            )
+        )
+        msg = session.receive_json()
+        assert msg["payload"]["data"]["aNum"] == 1
+        session.send_text(
+            json.dumps(
+                {"id": "3", "type": "start", "payload": {"extensions": EXTENSIONS}}
+            )
+        )
+        msg = session.receive_json()
+        assert msg["id"] == "3"
+        assert msg["payload"]["data"]["aNum"] == 1
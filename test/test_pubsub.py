@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from graphene_asgi.pubsub import (
+    BrokerPubSub,
+    InMemoryPubSub,
+    PubSubServer,
+    SocketPubSub,
+)
+
+
+async def collect(pubsub, channel, n, received):
+    async for message in pubsub.subscribe(channel):
+        received.append(message)
+        if len(received) == n:
+            return received
+
+
+@pytest.mark.asyncio
+async def test_in_memory_pubsub():
+    pubsub = InMemoryPubSub()
+    first, second = [], []
+    tasks = [
+        asyncio.ensure_future(collect(pubsub, "prices", 2, first)),
+        asyncio.ensure_future(collect(pubsub, "prices", 2, second)),
+    ]
+    await asyncio.sleep(0)
+    await pubsub.publish("prices", {"price": 1})
+    await pubsub.publish("other", {"price": 0})
+    await pubsub.publish("prices", {"price": 2})
+    await asyncio.wait_for(asyncio.gather(*tasks), 1)
+    assert first == second == [{"price": 1}, {"price": 2}]
+    assert first[0] is second[0]
+    assert dict(pubsub.subscribers) == {}
+
+
+@pytest.mark.asyncio
+async def test_socket_pubsub():
+    server = PubSubServer()
+    await server.start(port=0)
+    publisher = SocketPubSub(port=server.port)
+    subscriber = SocketPubSub(port=server.port)
+    local, remote = [], []
+    tasks = [
+        asyncio.ensure_future(collect(publisher, "prices", 3, local)),
+        asyncio.ensure_future(collect(subscriber, "prices", 3, remote)),
+    ]
+    await asyncio.sleep(0.05)
+    for price in range(3):
+        await publisher.publish("prices", price)
+    await asyncio.wait_for(asyncio.gather(*tasks), 1)
+    assert local == remote == [0, 1, 2]
+    # messages published in the same loop iteration travel as one batch
+    assert server.batches == 1
+    await publisher.close()
+    await subscriber.close()
+    await server.close()
+
+
+class StalledWriter:
+    class transport:
+        @staticmethod
+        def get_write_buffer_size():
+            return 1024
+
+    def write(self, data):
+        raise AssertionError("nothing is written to a stalled client")
+
+    def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_server_drops_batches_of_stalled_clients():
+    server = PubSubServer(max_buffer_size=512)
+    await server.start(port=0)
+    server.writers.add(StalledWriter())
+    publisher = SocketPubSub(port=server.port)
+    subscriber = SocketPubSub(port=server.port)
+    received = []
+    task = asyncio.ensure_future(collect(subscriber, "prices", 1, received))
+    await asyncio.sleep(0.05)
+    await publisher.publish("prices", 1)
+    await asyncio.wait_for(task, 1)
+    assert received == [1]
+    assert server.dropped == 1
+    await publisher.close()
+    await subscriber.close()
+    await server.close()
+
+
+class FlakyPubSub(BrokerPubSub):
+    def __init__(self):
+        super().__init__()
+        self.attempts = 0
+
+    async def connect(self):
+        self.attempts += 1
+        if self.attempts == 1:
+            raise ConnectionRefusedError()
+
+    async def send_batch(self, payload):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_failed_connection_is_retried():
+    pubsub = FlakyPubSub()
+    with pytest.raises(ConnectionRefusedError):
+        await pubsub.publish("prices", 1)
+    await pubsub.publish("prices", 2)
+    assert pubsub.attempts == 2
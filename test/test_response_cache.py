@@ -0,0 +1,119 @@
+import graphene
+from starlette.testclient import TestClient
+
+from graphene_asgi import Application
+from graphene_asgi.response_cache import ResponseCache, cache_hint
+
+calls = []
+
+
+class Rate(graphene.ObjectType):
+    currency = graphene.String()
+    value = graphene.Float()
+
+    @cache_hint(10)
+    def resolve_value(self, info):
+        return 1.5
+
+
+class Query(graphene.ObjectType):
+    rates = graphene.List(Rate)
+    user = graphene.String()
+    now = graphene.Int()
+
+    @cache_hint(60)
+    def resolve_rates(self, info):
+        calls.append("rates")
+        return [Rate(currency="EUR")]
+
+    @cache_hint(60)
+    def resolve_user(self, info):
+        calls.append("user")
+        return info.context["headers"].get("user")
+
+    def resolve_now(self, info):
+        calls.append("now")
+        return len(calls)
+
+
+schema = graphene.Schema(query=Query)
+
+
+class Clock:
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class PartitionedApplication(Application):
+    def cache_partition(self, context):
+        return context["headers"].get("user")
+
+
+def test_max_age():
+    cache = ResponseCache()
+    application = Application(schema, response_cache=cache)
+    for query, max_age in (
+        ("{ rates { currency } }", 60),
+        ("{ rates { currency value } }", 10),
+        ("{ rates { currency } now }", 0),
+    ):
+        cached = application.get_document(query)
+        op = cached.document.definitions[0]
+        assert cache.get_max_age(schema.graphql_schema, cached.document, op) == max_age
+
+
+def test_response_cache_and_etag():
+    del calls[:]
+    clock = Clock()
+    application = Application(schema, response_cache=ResponseCache(clock=clock))
+    client = TestClient(application)
+    query = {"query": "{ rates { currency value } }"}
+    resp = client.post("/", json=query)
+    assert resp.status_code == 200
+    assert resp.json() == {"data": {"rates": [{"currency": "EUR", "value": 1.5}]}}
+    assert resp.headers["cache-control"] == "private, max-age=10"
+    tag = resp.headers["etag"]
+    resp = client.post("/", json={"query": "{\n  rates { currency value }\n}"})
+    assert resp.headers["etag"] == tag
+    resp = client.post("/", json=query, headers={"if-none-match": tag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert calls == ["rates"]
+    clock.now = 11
+    resp = client.post("/", json=query, headers={"if-none-match": tag})
+    assert resp.status_code == 304
+    assert calls == ["rates", "rates"]
+
+
+def test_uncacheable_query_gets_etag():
+    del calls[:]
+    application = Application(schema, response_cache=ResponseCache())
+    client = TestClient(application)
+    first = client.post("/", json={"query": "{ now }"})
+    second = client.post("/", json={"query": "{ now }"})
+    assert "cache-control" not in first.headers
+    assert first.headers["etag"] != second.headers["etag"]
+    assert calls == ["now", "now"]
+
+
+def test_response_cache_partition():
+    del calls[:]
+    application = PartitionedApplication(schema, response_cache=ResponseCache())
+    client = TestClient(application)
+    for user in ("alice", "bob", "alice"):
+        resp = client.post("/", json={"query": "{ user }"}, headers={"user": user})
+        assert resp.json()["data"]["user"] == user
+    assert calls == ["user", "user"]
+
+
+def test_etag_only_when_usable():
+    client = TestClient(Application(schema))
+    query = {"query": "{ rates { currency } }"}
+    assert "etag" not in client.post("/", json=query).headers
+    resp = client.post("/", json=query, headers={"if-none-match": '"other"'})
+    assert resp.status_code == 200
+    tag = resp.headers["etag"]
+    resp = client.post("/", json=query, headers={"if-none-match": tag})
+    assert resp.status_code == 304
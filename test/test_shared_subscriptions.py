@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+
+import graphene
+import pytest
+from starlette.testclient import WebSocketTestSession
+
+from graphene_asgi import Application
+from graphene_asgi.fanout import SubscriptionHub
+
+upstreams = []
+
+
+class Query(graphene.ObjectType):
+    a_num = graphene.Int()
+
+
+class Subscription(graphene.ObjectType):
+    ticks = graphene.Int(up_to=graphene.Int())
+
+    async def resolve_ticks(self, info, up_to):
+        return self
+
+    async def subscribe_ticks(self, info, up_to):
+        upstreams.append(up_to)
+        for i in range(up_to):
+            yield i
+            await asyncio.sleep(0.05)
+
+
+schema = graphene.Schema(query=Query, subscription=Subscription)
+
+
+def start(session, id, query):
+    session.send_text(
+        json.dumps({"id": id, "type": "start", "payload": {"query": query}})
+    )
+
+
+def test_shared_subscription():
+    del upstreams[:]
+    application = Application(schema, shared_subscriptions=True)
+    with WebSocketTestSession(
+        application,
+        {"type": "websocket", "headers": [], "subprotocols": ["graphql-ws"]},
+    ) as session:
+        session.send_text(json.dumps({"type": "connection_init", "payload": {}}))
+        assert session.receive_json()["type"] == "connection_ack"
+        start(session, "1", "subscription { ticks(upTo: 4) }")
+        assert session.receive_json() == {
+            "type": "data",
+            "id": "1",
+            "payload": {"data": {"ticks": 0}},
+        }
+        # differently formatted, same operation: joins the running upstream
+        # and first receives its latest event
+        start(session, "2", "subscription {\n  ticks(upTo: 4)\n}")
+        messages = {"1": [], "2": []}
+        while not all(m and m[-1]["type"] == "complete" for m in messages.values()):
+            msg = session.receive_json()
+            messages[msg["id"]].append(msg)
+        assert [m["payload"]["data"]["ticks"] for m in messages["1"][:-1]] == [
+            1,
+            2,
+            3,
+        ]
+        assert [m["payload"]["data"]["ticks"] for m in messages["2"][:-1]] == [
+            0,
+            1,
+            2,
+            3,
+        ]
+        assert upstreams == [4]
+        assert application.subscription_hub.streams == {}
+
+
+def test_shared_subscription_torn_down():
+    del upstreams[:]
+    application = Application(schema, shared_subscriptions=True)
+    with WebSocketTestSession(
+        application,
+        {"type": "websocket", "headers": [], "subprotocols": ["graphql-ws"]},
+    ) as session:
+        session.send_text(json.dumps({"type": "connection_init", "payload": {}}))
+        assert session.receive_json()["type"] == "connection_ack"
+        start(session, "1", "subscription { ticks(upTo: 100) }")
+        start(session, "2", "subscription { ticks(upTo: 100) }")
+        start(session, "3", "subscription { ticks(upTo: 50) }")
+        for _ in range(6):
+            session.receive_json()
+        assert sorted(upstreams) == [50, 100]
+        for id in ("1", "2", "3"):
+            session.send_text(json.dumps({"id": id, "type": "stop"}))
+        time.sleep(0.1)
+        assert application.subscription_hub.streams == {}
+        assert application.metrics.gauges["shared_subscription_upstreams"] == 0
+        assert application.metrics.gauges["shared_subscription_subscribers"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stalled_subscriber_does_not_block_others():
+    application = Application(
+        schema,
+        shared_subscriptions=True,
+        subscription_buffer_size=2,
+        subscription_buffer_policy="block",
+    )
+    hub = application.subscription_hub
+
+    async def start():
+        async def events():
+            for i in range(10):
+                yield i
+                await asyncio.sleep(0.01)
+
+        return events()
+
+    stalled = hub.subscribe("key", start, str)
+    assert await stalled.__anext__() == ("data", "0")
+    active = hub.subscribe("key", start, str)
+
+    async def receive_all():
+        return [event async for event in active]
+
+    received = await asyncio.wait_for(receive_all(), 1)
+    assert received[-1] == ("data", "9")
+    assert application.metrics.counters["subscription_events_dropped"] > 0
+    await stalled.aclose()
+    with pytest.raises(ValueError):
+        SubscriptionHub(buffer_policy="block")
+
+
+@pytest.mark.asyncio
+async def test_attached_subscribers_have_no_task():
+    hub = SubscriptionHub(buffer_size=10)
+    notified = []
+
+    async def start():
+        async def events():
+            for i in range(3):
+                await asyncio.sleep(0.01)
+                yield i
+
+        return events()
+
+    # asyncio.all_tasks is missing before python 3.7
+    all_tasks = getattr(asyncio, "all_tasks", None) or asyncio.Task.all_tasks
+    tasks = len(all_tasks())
+    subscriptions = [hub.attach("key", start, str, notified.append) for _ in range(5)]
+    # only the upstream runs as a task
+    assert len(all_tasks()) == tasks + 1
+    await hub.streams["key"].task
+    for subscription in subscriptions:
+        buffer = subscription.buffer
+        assert buffer.closed
+        events = [buffer.get_nowait() for _ in range(buffer.depth)]
+        assert events == [("data", "0"), ("data", "1"), ("data", "2")]
+    # three events and the end of the upstream
+    assert notified.count(subscriptions[0]) == 4
+    for subscription in subscriptions:
+        subscription.cancel()
+    assert hub.streams == {}
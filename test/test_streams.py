@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import pytest
+from starlette.testclient import WebSocketTestSession
+
+from graphene_asgi import Application
+from graphene_asgi.metrics import Metrics
+from graphene_asgi.streams import SubscriptionBuffer, buffered
+
+
+async def source(n):
+    for i in range(n):
+        yield i
+
+
+async def fill(policy, maxsize=2, n=5):
+    metrics = Metrics()
+    buffer = SubscriptionBuffer(maxsize, policy, metrics)
+    for i in range(n):
+        await buffer.put(i)
+    buffer.close()
+    return [i async for i in buffer], buffer, metrics
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest():
+    items, buffer, metrics = await fill("drop_oldest")
+    assert items == [3, 4]
+    assert buffer.dropped == 3
+    assert metrics.counters["subscription_events_dropped"] == 3
+    assert metrics.gauges["subscription_events_buffered"] == 0
+
+
+@pytest.mark.asyncio
+async def test_drop_newest():
+    items, buffer, _ = await fill("drop_newest")
+    assert items == [0, 1]
+    assert buffer.dropped == 3
+
+
+@pytest.mark.asyncio
+async def test_latest():
+    items, buffer, _ = await fill("latest")
+    assert items == [4]
+    assert buffer.dropped == 4
+
+
+@pytest.mark.asyncio
+async def test_block():
+    buffer = SubscriptionBuffer(2, "block")
+    received = []
+    async for item in buffered(source(5), buffer):
+        assert buffer.depth <= 2
+        received.append(item)
+        await asyncio.sleep(0)
+    assert received == [0, 1, 2, 3, 4]
+    assert buffer.dropped == 0
+
+
+def test_unknown_policy(default_schema):
+    with pytest.raises(ValueError):
+        Application(default_schema, subscription_buffer_policy="nope")
+
+
+def test_graphql_ws_buffered_subscription(default_schema):
+    application = Application(
+        default_schema, subscription_buffer_size=4, subscription_buffer_policy="block"
+    )
+    with WebSocketTestSession(
+        application,
+        {"type": "websocket", "headers": [], "subprotocols": ["graphql-ws"]},
+    ) as session:
+        session.send_text(json.dumps({"type": "connection_init", "payload": {}}))
+        assert session.receive_json()["type"] == "connection_ack"
+        session.send_text(
+            json.dumps(
+                {
+                    "id": "1",
+                    "type": "start",
+                    "payload": {"query": "subscription { count(upTo: 3) }"},
+                }
+            )
+        )
+        messages = [session.receive_json() for _ in range(5)]
+        assert [m["payload"]["data"]["count"] for m in messages[:-1]] == [0, 1, 2, 3]
+        assert messages[-1] == {"type": "complete", "id": "1"}
+
+
+def test_put_nowait():
+    buffer = SubscriptionBuffer(2, "block")
+    buffer.put_nowait(0)
+    buffer.put_nowait(1)
+    with pytest.raises(asyncio.QueueFull):
+        buffer.put_nowait(2)
+    assert buffer.get_nowait() == 0
+    assert buffer.get_nowait() == 1
+    # a drained buffer keeps no storage
+    assert buffer._items is None
+    with pytest.raises(asyncio.QueueEmpty):
+        buffer.get_nowait()
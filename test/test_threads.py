@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+import graphene
+import pytest
+
+from graphene_asgi import Application
+from graphene_asgi.threads import ThreadPoolMiddleware
+
+
+class Item(graphene.ObjectType):
+    name = graphene.String()
+    thread = graphene.String()
+
+    def resolve_thread(self, info):
+        return threading.current_thread().name
+
+
+class Query(graphene.ObjectType):
+    blocking = graphene.String()
+    async_thread = graphene.String()
+    item = graphene.Field(Item)
+
+    def resolve_blocking(self, info):
+        return threading.current_thread().name
+
+    async def resolve_async_thread(self, info):
+        return threading.current_thread().name
+
+    def resolve_item(self, info):
+        return Item(name="x")
+
+
+schema = graphene.Schema(query=Query)
+QUERY = "{ blocking asyncThread item { name thread } }"
+
+
+@pytest.mark.asyncio
+async def test_sync_resolvers_run_in_threads():
+    application = Application(schema, thread_pool=ThreadPoolMiddleware(2))
+    res = await application.execute(source=QUERY)
+    assert res.errors is None
+    main = threading.current_thread().name
+    assert res.data["blocking"].startswith("graphene-asgi-resolver")
+    assert res.data["asyncThread"] == main
+    assert res.data["item"]["thread"].startswith("graphene-asgi-resolver")
+    # the default resolver of Item.name runs inline
+    assert application.metrics.counters["resolver_thread_calls"] == 3
+    await asyncio.sleep(0)
+    assert application.metrics.gauges["resolver_thread_queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_include_and_exclude():
+    application = Application(
+        schema,
+        thread_pool=ThreadPoolMiddleware(include=["Query"], exclude=["Query.item"]),
+    )
+    res = await application.execute(source=QUERY)
+    main = threading.current_thread().name
+    assert res.data["blocking"].startswith("graphene-asgi-resolver")
+    assert res.data["item"]["thread"] == main
+
+
+@pytest.mark.asyncio
+async def test_included_type_keeps_default_resolvers_inline():
+    application = Application(
+        schema, thread_pool=ThreadPoolMiddleware(include=["Item"])
+    )
+    res = await application.execute(source="{ item { name thread } }")
+    assert res.data["item"]["thread"].startswith("graphene-asgi-resolver")
+    # Item.name has graphene's default resolver
+    assert application.metrics.counters["resolver_thread_calls"] == 1
+    application = Application(
+        schema, thread_pool=ThreadPoolMiddleware(include=["Item", "Item.name"])
+    )
+    await application.execute(source="{ item { name thread } }")
+    assert application.metrics.counters["resolver_thread_calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_caller_middleware_is_kept():
+    calls = []
+
+    def middleware(next_, root, info, **args):
+        calls.append(info.field_name)
+        return next_(root, info, **args)
+
+    application = Application(schema, thread_pool=ThreadPoolMiddleware())
+    res = await application.execute(source="{ blocking }", middleware=[middleware])
+    assert res.data["blocking"].startswith("graphene-asgi-resolver")
+    assert calls == ["blocking"]
+
+
+@pytest.mark.asyncio
+async def test_pool_is_bounded():
+    started = []
+    release = threading.Event()
+
+    class Blocking(graphene.ObjectType):
+        a = graphene.Int()
+        b = graphene.Int()
+
+        def resolve_a(self, info):
+            started.append("a")
+            release.wait(1)
+            return 1
+
+        def resolve_b(self, info):
+            started.append("b")
+            return 2
+
+    application = Application(
+        graphene.Schema(query=Blocking), thread_pool=ThreadPoolMiddleware(1)
+    )
+    task = asyncio.ensure_future(application.execute(source="{ a b }"))
+    await asyncio.sleep(0.05)
+    assert started == ["a"]
+    assert application.metrics.gauges["resolver_thread_queue_depth"] == 1
+    release.set()
+    res = await task
+    assert res.data == {"a": 1, "b": 2}
@@ -0,0 +1,84 @@
+import json
+
+from starlette.testclient import TestClient, WebSocketTestSession
+
+from graphene_asgi import Application
+from graphene_asgi.metrics import Metrics
+
+
+def test_server_timing_and_callbacks(default_schema):
+    recorded = []
+    application = Application(
+        default_schema, server_timing=True, timing_callbacks=[recorded.append]
+    )
+    client = TestClient(application)
+    resp = client.post("/", json={"query": "query Num { aNum }"})
+    assert resp.json() == {"data": {"aNum": 1}}
+    phases = [p.split(";")[0] for p in resp.headers["server-timing"].split(", ")]
+    assert phases == ["body", "parse", "validate", "execute", "encode"]
+    (timings,) = recorded
+    assert timings.operation_name == "Num"
+    assert timings.operation_type == "query"
+    assert set(timings.phases) == set(phases) | {"send"}
+    # cached documents are not parsed again
+    client.post("/", json={"query": "query Num { aNum }"})
+    assert "parse" not in recorded[1].phases
+
+
+def test_no_server_timing_by_default(default_application):
+    resp = TestClient(default_application).post("/", json={"query": "{ aNum }"})
+    assert "server-timing" not in resp.headers
+
+
+def test_metrics_endpoint(default_schema):
+    application = Application(default_schema, metrics_path="/metrics")
+    client = TestClient(application)
+    client.post("/", json={"query": "query Num { aNum }"})
+    with WebSocketTestSession(
+        application, {"type": "websocket", "headers": [], "subprotocols": []}
+    ) as session:
+        session.send_text(json.dumps({"query": "{ aNum }", "id": "1"}))
+        session.receive_json()
+    resp = client.get("/metrics")
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert "# TYPE graphql_phase_seconds histogram" in resp.text
+    assert (
+        'graphql_phase_seconds_count{phase="execute",operation_name="Num",'
+        'operation_type="query"} 1'
+    ) in resp.text
+    assert (
+        'graphql_phase_seconds_count{phase="send",operation_name="",'
+        'operation_type="query"} 1'
+    ) in resp.text
+
+
+def test_operation_name_labels_are_capped(default_schema):
+    application = Application(default_schema, max_metric_operation_names=2)
+    client = TestClient(application)
+    for name in ("A", "B", "C", "D", "A"):
+        client.post("/", json={"query": "query %s { aNum }" % name})
+    names = {
+        dict(labels)["operation_name"]
+        for labels in application.metrics.histograms["graphql_phase_seconds"]
+    }
+    assert names == {"A", "B", "other"}
+
+
+def test_prometheus_format():
+    metrics = Metrics(buckets=(0.1, 1))
+    metrics.incr("requests")
+    metrics.adjust("connections", 2)
+    metrics.observe("latency", 0.5, (("op", 'a"b'),))
+    metrics.observe("latency", 5, (("op", 'a"b'),))
+    assert metrics.prometheus().splitlines() == [
+        "# TYPE requests counter",
+        "requests 1",
+        "# TYPE connections gauge",
+        "connections 2",
+        "# TYPE latency histogram",
+        'latency_bucket{op="a\\"b",le="0.1"} 0',
+        'latency_bucket{op="a\\"b",le="1.0"} 1',
+        'latency_bucket{op="a\\"b",le="+Inf"} 2',
+        'latency_sum{op="a\\"b"} 5.5',
+        'latency_count{op="a\\"b"} 2',
+    ]
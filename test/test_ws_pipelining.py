@@ -0,0 +1,49 @@
+import json
+
+from starlette.testclient import WebSocketTestSession
+
+from graphene_asgi import Application
+
+
+def test_ws_operations_reply_out_of_order(default_application):
+    with WebSocketTestSession(
+        default_application, {"type": "websocket", "headers": [], "subprotocols": []}
+    ) as session:
+        session.send_text(
+            json.dumps({"query": "{ aSlowNum(seconds: 0.2) }", "id": "slow"})
+        )
+        session.send_text(json.dumps({"query": "{ aNum }", "id": "fast"}))
+        assert session.receive_json() == {"data": {"aNum": 1}, "id": "fast"}
+        assert session.receive_json() == {"data": {"aSlowNum": 2}, "id": "slow"}
+
+
+def test_ws_inflight_limit(default_schema):
+    application = Application(default_schema, max_inflight_operations=1)
+    with WebSocketTestSession(
+        application, {"type": "websocket", "headers": [], "subprotocols": []}
+    ) as session:
+        session.send_text(
+            json.dumps({"query": "{ aSlowNum(seconds: 0.1) }", "id": "slow"})
+        )
+        session.send_text(json.dumps({"query": "{ aNum }", "id": "fast"}))
+        assert session.receive_json()["id"] == "slow"
+        assert session.receive_json()["id"] == "fast"
+
+
+def test_graphql_ws_queries_reply_out_of_order(default_application):
+    with WebSocketTestSession(
+        default_application,
+        {"type": "websocket", "headers": [], "subprotocols": ["graphql-ws"]},
+    ) as session:
+        session.send_text(json.dumps({"type": "connection_init", "payload": {}}))
+        assert session.receive_json()["type"] == "connection_ack"
+        for id, query in (("1", "{ aSlowNum(seconds: 0.2) }"), ("2", "{ aNum }")):
+            session.send_text(
+                json.dumps({"id": id, "type": "start", "payload": {"query": query}})
+            )
+        assert session.receive_json() == {
+            "type": "data",
+            "id": "2",
+            "payload": {"data": {"aNum": 1}},
+        }
+        assert session.receive_json()["id"] == "1"